@@ -6,6 +6,9 @@ from datetime import timedelta
 from app.db.session import get_db
 from app.schemas.token import Token
 from app.services import user_service, security
+from app.services.token_revocation import revoke_token
+from app.models.user import User
+from app.utils.dependencies import get_current_user, oauth2_scheme
 from app.core.config import settings
 
 router = APIRouter()
@@ -33,4 +36,21 @@ def login_for_access_token(
         data={"sub": user.email}, expires_delta=access_token_expires
     )
     
-    return {"access_token": access_token, "token_type": "bearer"}
\ No newline at end of file
+    return {"access_token": access_token, "token_type": "bearer"}
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+def logout(
+    token: str = Depends(oauth2_scheme),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Revokes the access token used for this request.
+    """
+    token_data = security.decode_access_token(token)
+    if token_data is None or token_data.jti is None or token_data.expires_at is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="This token cannot be revoked; it expires on its own",
+        )
+    revoke_token(token_data.jti, current_user.id, token_data.expires_at)
+    return
@@ -0,0 +1,135 @@
+import asyncio
+import json
+from contextlib import AsyncExitStack
+from typing import List
+from urllib.parse import urlsplit
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy.orm import Session
+from starlette.exceptions import HTTPException as StarletteHTTPException
+from loguru import logger
+
+from app.core.config import settings
+from app.db.session import get_db
+from app.models.user import User
+from app.schemas.batch import BatchOperation, BatchRequest, BatchResult, BatchResponse
+from app.utils.dependencies import get_current_user
+
+router = APIRouter()
+
+# Sub-requests that cannot be answered with a single buffered response
+# (or would recurse into this endpoint)
+_EXCLUDED_PATHS = ("/batch", "/tasks/events")
+
+async def _dispatch(request: Request, op: BatchOperation, state: dict) -> BatchResult:
+    """
+    Runs one operation through the app's router in-process and
+    buffers its response.
+    """
+    url = urlsplit(op.path)
+    path = settings.API_V1_STR + "/" + url.path.lstrip("/")
+    if any(url.path.rstrip("/").endswith(excluded) for excluded in _EXCLUDED_PATHS):
+        return BatchResult(id=op.id, status=status.HTTP_400_BAD_REQUEST,
+                           body={"detail": "Operation not allowed in a batch"})
+
+    body = json.dumps(op.body).encode() if op.body is not None else b""
+    headers = [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+    if "authorization" in request.headers:
+        headers.append((b"authorization", request.headers["authorization"].encode()))
+
+    scope = {
+        **{key: value for key, value in request.scope.items()
+           if key in ("type", "asgi", "http_version", "scheme", "server", "client",
+                      "root_path", "app", "starlette.exception_handlers")},
+        "method": op.method,
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": url.query.encode(),
+        "headers": headers,
+        "state": state,
+    }
+
+    sent_body = False
+    async def receive():
+        nonlocal sent_body
+        if not sent_body:
+            sent_body = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return {"type": "http.disconnect"}
+
+    response = {"status": 500, "chunks": []}
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+        elif message["type"] == "http.response.body":
+            response["chunks"].append(message.get("body", b""))
+
+    try:
+        # Normally provided by FastAPI's outermost middleware, which
+        # in-process sub-requests bypass
+        async with AsyncExitStack() as stack:
+            scope["fastapi_middleware_astack"] = stack
+            await request.app.router(scope, receive, send)
+    except StarletteHTTPException as e:
+        # Raised by the router itself, e.g. for unknown paths
+        return BatchResult(id=op.id, status=e.status_code, body={"detail": e.detail})
+    except Exception as e:
+        logger.error(f"Batch operation {op.method} {op.path} failed: {e}")
+        return BatchResult(id=op.id, status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                           body={"detail": "Internal Server Error"})
+
+    raw = b"".join(response["chunks"])
+    try:
+        payload = json.loads(raw) if raw else None
+    except ValueError:
+        payload = raw.decode(errors="replace")
+    return BatchResult(id=op.id, status=response["status"], body=payload)
+
+@router.post("/", response_model=BatchResponse)
+async def run_batch(
+    request: Request,
+    batch: BatchRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Run several API operations in one HTTP round trip.
+    - The caller is authenticated once for the whole batch.
+    - Consecutive GETs run concurrently, each on its own session.
+    - Writes run one at a time, in order, on one shared session.
+    Each operation reports its own status; one failure does not abort the rest.
+    """
+    if len(batch.operations) > settings.BATCH_MAX_OPERATIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"A batch may contain at most {settings.BATCH_MAX_OPERATIONS} operations",
+        )
+
+    # Detach the user so commits on the shared session can't expire it
+    # while concurrent sub-requests read it from other threads.
+    db.expunge(current_user)
+    base_state = {**request.scope.get("state", {}), "batch_user": current_user}
+    write_state = {**base_state, "batch_db": db}
+    limiter = asyncio.Semaphore(settings.BATCH_MAX_CONCURRENCY)
+
+    async def run_read(op: BatchOperation) -> BatchResult:
+        async with limiter:
+            return await _dispatch(request, op, dict(base_state))
+
+    results: List[BatchResult] = []
+    pending_reads: List[BatchOperation] = []
+
+    async def flush_reads():
+        if pending_reads:
+            results.extend(await asyncio.gather(*(run_read(op) for op in pending_reads)))
+            pending_reads.clear()
+
+    for op in batch.operations:
+        if op.method == "GET":
+            pending_reads.append(op)
+            continue
+        # Preserve ordering: earlier reads complete before a write starts
+        await flush_reads()
+        results.append(await _dispatch(request, op, write_state))
+    await flush_reads()
+
+    return BatchResponse(results=results)
@@ -1,11 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.orm import Session
-from typing import Optional
+from typing import List, Optional
+from datetime import date, datetime
 
-from app.db.session import get_db
-from app.schemas.task import Task, TaskCreate, TaskUpdate
+from app.core.config import settings
+from app.db.session import get_db, statement_timeout
+from app.schemas.task import Task, TaskCreate, TaskUpdate, TaskLabelCount
 from app.schemas.pagination import PaginatedResponse
-from app.services import task_service
+from app.schemas.task_stats import TaskStats, TaskDayCount
+from app.schemas.task_changes import TaskChanges
+from app.services import task_service, task_stats_service, task_events
 from app.models.user import User
 from app.utils.dependencies import get_current_user
 
@@ -19,10 +24,17 @@ def create_task(
 ):
     """
     Create a new task.
+    Returns 409 if the title is already taken.
     """
-    return task_service.create_task(db=db, task_in=task_in, owner_id=current_user.id)
+    try:
+        if settings.TASK_GROUP_COMMIT:
+            return task_service.create_task_grouped(db=db, task_in=task_in, owner_id=current_user.id)
+        return task_service.create_task(db=db, task_in=task_in, owner_id=current_user.id)
+    except task_service.DuplicateTaskTitle as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
 
 @router.get("/", response_model=PaginatedResponse[Task])
+@statement_timeout(settings.TASK_LIST_STATEMENT_TIMEOUT_MS)
 def read_tasks(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
@@ -30,22 +42,140 @@ def read_tasks(
     offset: int = Query(0, ge=0),
     sort_by: str = Query("created_at", alias="sortBy"),
     sort_order: str = Query("desc", alias="sortOrder", pattern="^(asc|desc)$"),
-    filter_query: Optional[str] = Query(None, alias="filter")
+    filter_query: Optional[str] = Query(None, alias="filter"),
+    include_archived: bool = Query(False, alias="includeArchived"),
+    sort: Optional[str] = Query(None, max_length=100),
+    created_after: Optional[datetime] = Query(None, alias="createdAfter"),
+    created_before: Optional[datetime] = Query(None, alias="createdBefore"),
+    title: Optional[str] = Query(None, max_length=100),
+    label: Optional[List[str]] = Query(None, max_length=20),
+    label_match: str = Query("all", alias="labelMatch", pattern="^(any|all)$")
 ):
     """
     Retrieve all tasks for the current user with pagination, sorting, and filtering.
+    Archived tasks are only included when `includeArchived=true`.
+    - `sort` is a comma-separated list of fields, `-` for descending,
+      e.g. `sort=-created_at,title` (overrides sortBy/sortOrder).
+    - `createdAfter` / `createdBefore` filter on a created_at range,
+      `title` on an exact title.
+    - `label=a&label=b` keeps tasks with all of the labels
+      (`labelMatch=any`: with any of them).
+    The default first page is served from an in-memory, pre-serialized copy.
     """
-    total, tasks = task_service.get_all_tasks(
-        db=db,
-        owner_id=current_user.id,
+    filters = dict(
         limit=limit,
         offset=offset,
         sort_by=sort_by,
         sort_order=sort_order,
-        filter_query=filter_query
+        filter_query=filter_query,
+        include_archived=include_archived,
+        sort=sort,
+        created_after=created_after,
+        created_before=created_before,
+        title=title,
+        labels=label,
+        label_match=label_match
     )
+    try:
+        body = task_service.read_first_page(db=db, owner=current_user, **filters)
+        if body is not None:
+            return Response(content=body, media_type="application/json")
+        total, tasks = task_service.read_tasks(db=db, owner_id=current_user.id, **filters)
+    except task_service.InvalidTaskQuery as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     return PaginatedResponse(total=total, limit=limit, offset=offset, data=tasks)
 
+@router.post("/claim", response_model=List[Task])
+def claim_tasks(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    n: int = Query(1, ge=1, le=settings.TASK_CLAIM_MAX_BATCH),
+    worker_id: str = Query(..., alias="workerId", min_length=1, max_length=100),
+    lease_seconds: int = Query(settings.TASK_LEASE_SECONDS, alias="leaseSeconds", ge=1, le=86400)
+):
+    """
+    Claim up to `n` of the current user's oldest pending tasks for a worker.
+    Claims are leased: a task whose lease expires without being renewed
+    or completed can be claimed by another worker. Returns an empty
+    list when there is nothing to do.
+    """
+    return task_service.claim_tasks(
+        db=db, owner_id=current_user.id, worker_id=worker_id,
+        n=n, lease_seconds=lease_seconds
+    )
+
+@router.get("/changes", response_model=TaskChanges)
+def read_task_changes(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    since: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=settings.TASK_CHANGES_MAX_LIMIT)
+):
+    """
+    Retrieve the tasks created, updated or archived and the IDs of the
+    tasks deleted since the `since` token (0 for a full sync).
+    Pass the returned `next_since` on the next call; repeat while `has_more`.
+    """
+    changed, deleted, next_since, has_more = task_service.get_task_changes(
+        db=db, owner_id=current_user.id, since=since, limit=limit
+    )
+    return TaskChanges(changed=changed, deleted=deleted, next_since=next_since, has_more=has_more)
+
+@router.get("/labels", response_model=List[TaskLabelCount])
+def read_task_labels(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Retrieve the current user's labels with the number of live tasks carrying each.
+    """
+    return [
+        TaskLabelCount(label=label, count=count)
+        for label, count in task_service.get_label_counts(db=db, owner_id=current_user.id)
+    ]
+
+@router.get("/stats", response_model=TaskStats)
+def read_task_stats(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    start: Optional[date] = Query(None),
+    end: Optional[date] = Query(None)
+):
+    """
+    Retrieve task totals and per-day creation counts for the current user.
+    Served from the incrementally maintained rollup table.
+    """
+    total, days = task_stats_service.get_task_stats(
+        db=db, owner_id=current_user.id, start=start, end=end
+    )
+    return TaskStats(
+        total=total,
+        days=[TaskDayCount(day=row.day, count=row.task_count) for row in days]
+    )
+
+@router.get("/events")
+def stream_task_events(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Stream task changes for the current user as Server-Sent Events.
+    Emits `task` events for create/update/delete, a `resync` event when
+    the client fell too far behind, and periodic heartbeat comments.
+    """
+    owner_id = current_user.id
+    # Release the pooled connection used for authentication; the
+    # stream itself is fed by the worker's shared LISTEN connection.
+    db.close()
+    return StreamingResponse(
+        task_events.stream_task_events(owner_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @router.get("/{task_id}", response_model=Task)
 def read_task(
     task_id: int,
@@ -55,7 +185,57 @@ def read_task(
     """
     Retrieve a single task by its ID.
     """
-    db_task = task_service.get_task_by_id(db=db, task_id=task_id, owner_id=current_user.id)
+    db_task = task_service.read_task(db=db, task_id=task_id, owner_id=current_user.id)
+    if db_task is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Task not found"
+        )
+    return db_task
+
+@router.post("/{task_id}/lease", response_model=Task)
+def renew_task_lease(
+    task_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    worker_id: str = Query(..., alias="workerId", min_length=1, max_length=100),
+    lease_seconds: int = Query(settings.TASK_LEASE_SECONDS, alias="leaseSeconds", ge=1, le=86400)
+):
+    """
+    Extend the worker's lease on a claimed task.
+    Returns 409 if the task is no longer claimed by this worker.
+    """
+    try:
+        db_task = task_service.renew_task_lease(
+            db=db, task_id=task_id, owner_id=current_user.id,
+            worker_id=worker_id, lease_seconds=lease_seconds
+        )
+    except task_service.TaskLeaseLost as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    if db_task is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Task not found"
+        )
+    return db_task
+
+@router.post("/{task_id}/complete", response_model=Task)
+def complete_task(
+    task_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    worker_id: str = Query(..., alias="workerId", min_length=1, max_length=100)
+):
+    """
+    Mark a claimed task as done.
+    Returns 409 if the task is no longer claimed by this worker.
+    """
+    try:
+        db_task = task_service.complete_task(
+            db=db, task_id=task_id, owner_id=current_user.id, worker_id=worker_id
+        )
+    except task_service.TaskLeaseLost as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
     if db_task is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -5,6 +5,8 @@ from loguru import logger
 from app.db.session import get_db
 from app.schemas.user import User, UserCreate
 from app.services import user_service
+from app.models.user import User as UserModel
+from app.utils.dependencies import get_current_admin
 
 router = APIRouter()
 
@@ -25,4 +27,24 @@ def create_new_user(
         )
         
     user = user_service.create_user(db=db, user_in=user_in)
-    return user
\ No newline at end of file
+    return user
+
+@router.post("/{user_id}/revoke-tokens", status_code=status.HTTP_204_NO_CONTENT)
+def revoke_user_tokens(
+    user_id: int,
+    db: Session = Depends(get_db),
+    admin: UserModel = Depends(get_current_admin)
+):
+    """
+    Revokes every token issued to a user so far (admin only).
+    The user has to log in again.
+    """
+    user = user_service.get_user_by_id(db, user_id=user_id)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found",
+        )
+    user_service.revoke_all_tokens(db, user)
+    logger.info(f"Admin {admin.email} revoked all tokens of user {user_id}")
+    return
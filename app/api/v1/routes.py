@@ -1,11 +1,12 @@
 from fastapi import APIRouter
 
 # Import endpoint modules
-from app.api.v1.endpoints import auth, users, tasks
+from app.api.v1.endpoints import auth, users, tasks, batch
 
 api_router = APIRouter()
 
 # Include routers
 api_router.include_router(auth.router, prefix="/auth", tags=["Authentication"])
 api_router.include_router(users.router, prefix="/users", tags=["Users"])
-api_router.include_router(tasks.router, prefix="/tasks", tags=["Tasks"])
\ No newline at end of file
+api_router.include_router(tasks.router, prefix="/tasks", tags=["Tasks"])
+api_router.include_router(batch.router, prefix="/batch", tags=["Batch"])
\ No newline at end of file
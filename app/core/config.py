@@ -1,15 +1,68 @@
 import os
 from pydantic_settings import BaseSettings
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 class Settings(BaseSettings):
     PROJECT_NAME: str = "FastAPI Task Service"
     API_V1_STR: str = "/api/v1"
     
-    # Database URLs (Postgres-only)
+    # Database URLs: Postgres, or sqlite:///path/to/tasks.db for the
+    # single-node backend (no database server; see app/db/sqlite.py)
     DATABASE_URL: str
     TEST_DATABASE_URL: Optional[str] = None
     
+    # Horizontal sharding: shard id -> database URL (JSON object).
+    # Empty disables sharding; DATABASE_URL then hosts the user directory.
+    SHARD_URLS: Dict[str, str] = {}
+    TEST_SHARD_URLS: Dict[str, str] = {}
+    SHARD_RING_VNODES: int = 64
+    SHARD_DIRECTORY_CACHE_SIZE: int = 100000
+
+    # Connection pool (per worker process)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+
+    # Longest wait for a pooled connection before answering 503
+    DB_POOL_TIMEOUT_SECONDS: float = 5.0
+
+    # Default per-statement limit (endpoints can override it)
+    DB_STATEMENT_TIMEOUT_MS: int = 10000
+    # Task listing (free-text filters, deep offsets)
+    TASK_LIST_STATEMENT_TIMEOUT_MS: int = 3000
+
+    # Admission control (per worker). Default lane limit: DB_POOL_SIZE +
+    # DB_MAX_OVERFLOW; ADMISSION_ROUTE_LIMITS gives path prefixes their
+    # own, smaller lanes (JSON object)
+    ADMISSION_CONTROL_ENABLED: bool = True
+    ADMISSION_MAX_CONCURRENCY: Optional[int] = None
+    ADMISSION_ROUTE_LIMITS: Dict[str, int] = {
+        "/api/v1/auth/login": 4,
+        "/api/v1/users": 4,
+        "/api/v1/batch": 4,
+    }
+    ADMISSION_QUEUE_SIZE: int = 100
+    ADMISSION_QUEUE_PER_OWNER: int = 10
+    ADMISSION_QUEUE_TIMEOUT_SECONDS: float = 2.0
+    ADMISSION_RETRY_AFTER_SECONDS: int = 1
+    # Cheap or long-lived (SSE) endpoints that bypass admission
+    ADMISSION_EXEMPT_PATHS: List[str] = ["/health", "/metrics", "/api/v1/tasks/events"]
+
+    # SQLite backend tuning
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_CACHE_SIZE_KB: int = 65536
+    SQLITE_MMAP_SIZE: int = 268435456
+    # NORMAL is durable across application crashes in WAL mode; a power
+    # loss can drop the last commits. FULL syncs every commit.
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+
+    # Statement caching
+    DB_COMPILED_CACHE_SIZE: int = 1200
+    # psycopg (v3) only: prepare server-side after N executions per connection
+    DB_PREPARE_THRESHOLD: Optional[int] = None
+
+    # Migrations: longest wait for a table lock before DDL gives up (ms)
+    MIGRATION_LOCK_TIMEOUT_MS: int = 5000
+
     # Environment state (dev, prod, test)
     ENV_STATE: str = "dev"
 
@@ -18,8 +71,65 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
 
+    # Token revocation: how often workers pick up revocations made by
+    # other workers, and how often expired revocations are deleted
+    TOKEN_REVOCATION_REFRESH_SECONDS: float = 5.0
+    TOKEN_REVOCATION_PURGE_SECONDS: float = 3600.0
+
+    # Accounts allowed to use operator features (JSON list of emails)
+    ADMIN_EMAILS: List[str] = []
+    # Bearer token for metrics scrapers; admins can always read /metrics
+    METRICS_TOKEN: Optional[str] = None
+
     # Rate Limiting
     RATE_LIMIT_PER_MINUTE: str = "20/minute"
+
+    # Task change feed (Server-Sent Events)
+    TASK_EVENTS_HEARTBEAT_SECONDS: float = 15.0
+    TASK_EVENTS_QUEUE_SIZE: int = 100
+
+    # Batch endpoint
+    BATCH_MAX_OPERATIONS: int = 20
+    BATCH_MAX_CONCURRENCY: int = 4
+
+    # Task listing: largest result set we'll sort without a supporting index
+    TASK_UNINDEXED_SORT_MAX_ROWS: int = 10000
+
+    # Delta sync: most changes returned per call
+    TASK_CHANGES_MAX_LIMIT: int = 1000
+
+    # Share one query between identical concurrent task reads (per worker)
+    TASK_READ_COALESCING: bool = True
+
+    # Keep each owner's default first page (newest live tasks) serialized
+    # in memory, patched on writes (per worker; least recently used owners
+    # are evicted beyond the memory budget)
+    TASK_FIRST_PAGE_CACHE: bool = True
+    TASK_FIRST_PAGE_ROWS: int = 100
+    TASK_FIRST_PAGE_CACHE_MB: float = 64.0
+
+    # Group commit for task creation (per worker): concurrent creates that
+    # arrive within the window share one INSERT and one commit. Adds up to
+    # the window to each create's latency in exchange for fewer commits
+    TASK_GROUP_COMMIT: bool = False
+    TASK_GROUP_COMMIT_WINDOW_MS: float = 2.0
+    TASK_GROUP_COMMIT_MAX_BATCH: int = 100
+
+    # Work-queue claims
+    TASK_LEASE_SECONDS: int = 300
+    TASK_CLAIM_MAX_BATCH: int = 100
+
+    # Cold archival of old tasks
+    TASK_ARCHIVE_AFTER_DAYS: int = 365
+    TASK_ARCHIVE_BATCH_SIZE: int = 1000
+
+    # Request profiling: admins send `X-Profile: 1`, or a random
+    # fraction of requests is profiled (0 disables sampling)
+    PROFILE_SAMPLE_RATE: float = 0.0
+    PROFILE_DIR: str = "/tmp/task-service-profiles"
+    PROFILE_MAX_FILES: int = 50
+    PROFILE_INTERVAL_SECONDS: float = 0.005
+    PROFILE_MAX_SECONDS: float = 30.0
     
     def get_database_url(self) -> str:
         """
@@ -29,6 +139,20 @@ class Settings(BaseSettings):
             return self.TEST_DATABASE_URL
         return self.DATABASE_URL
 
+    def is_sqlite(self) -> bool:
+        """
+        True when the app runs on the single-node SQLite backend.
+        """
+        return self.get_database_url().startswith("sqlite")
+
+    def get_shard_urls(self) -> Dict[str, str]:
+        """
+        Returns the shard map for the current environment.
+        """
+        if self.ENV_STATE == "test":
+            return self.TEST_SHARD_URLS
+        return self.SHARD_URLS
+
     class Config:
         case_sensitive = True
         env_file = ".env"
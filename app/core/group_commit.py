@@ -0,0 +1,83 @@
+import threading
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence
+from app.core.metrics import metrics, ratio
+
+class _Batch:
+    """
+    Items collected for one flush, and their per-item outcomes.
+    """
+    def __init__(self):
+        self.items: List[Any] = []
+        self.full = threading.Event()
+        self.done = threading.Event()
+        self.outcomes: Sequence[Any] = ()
+        self.error: Optional[BaseException] = None
+
+class GroupCommitter:
+    """
+    Combines concurrent submissions within a worker process into
+    batches: the first submitter for a key (the leader) waits up to
+    `window` seconds or until `max_batch` items have joined, then runs
+    flush(items) in its own thread, once for the whole batch.
+
+    flush returns one outcome per item, in order; an outcome that is an
+    exception is raised in that item's submitter only. An exception
+    raised by flush itself fails the whole batch.
+
+    Outcomes are handed to other threads, so they must be immutable
+    snapshots, never session-bound ORM objects.
+    """
+    def __init__(self, name: str, window: float, max_batch: int,
+                 share_error: Callable[[BaseException], bool] = lambda e: True):
+        self.name = name
+        self.window = window
+        self.max_batch = max_batch
+        # Errors specific to the leader's request (e.g. its client went
+        # away) aren't passed on; followers resubmit instead
+        self.share_error = share_error
+        self._open: Dict[Hashable, _Batch] = {}
+        self._lock = threading.Lock()
+        metrics.register_gauge(f"{name}.avg_batch_size", ratio(f"{name}.items", f"{name}.batches"))
+
+    def submit(self, key: Hashable, item: Any, flush: Callable[[List[Any]], Sequence[Any]]) -> Any:
+        with self._lock:
+            batch = self._open.get(key)
+            is_leader = batch is None
+            if is_leader:
+                batch = self._open[key] = _Batch()
+            index = len(batch.items)
+            batch.items.append(item)
+            if len(batch.items) >= self.max_batch:
+                # Closed: later submitters start a new batch
+                del self._open[key]
+                batch.full.set()
+        metrics.inc(f"{self.name}.items")
+
+        if not is_leader:
+            batch.done.wait()
+            if batch.error is not None:
+                if not self.share_error(batch.error):
+                    return self.submit(key, item, flush)
+                raise batch.error
+            return self._outcome(batch, index)
+
+        batch.full.wait(self.window)
+        with self._lock:
+            if self._open.get(key) is batch:
+                del self._open[key]
+        metrics.inc(f"{self.name}.batches")
+        try:
+            batch.outcomes = flush(batch.items)
+        except BaseException as e:
+            batch.error = e
+            raise
+        finally:
+            batch.done.set()
+        return self._outcome(batch, index)
+
+    @staticmethod
+    def _outcome(batch: _Batch, index: int) -> Any:
+        outcome = batch.outcomes[index]
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
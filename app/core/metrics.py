@@ -0,0 +1,45 @@
+import threading
+from collections import defaultdict
+from typing import Callable, Dict
+
+class Metrics:
+    """
+    Minimal in-process metrics registry (counters and computed gauges).
+    Values are per worker process; GET /metrics returns a snapshot.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._gauges: Dict[str, Callable[[], float]] = {}
+
+    def inc(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self._counters[name] += value
+
+    def get(self, name: str) -> float:
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def register_gauge(self, name: str, func: Callable[[], float]) -> None:
+        """
+        Registers a value computed on every snapshot (e.g. a ratio).
+        """
+        self._gauges[name] = func
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            values = dict(self._counters)
+        for name, func in self._gauges.items():
+            values[name] = func()
+        return values
+
+def ratio(numerator: str, denominator: str) -> Callable[[], float]:
+    """
+    Gauge helper: numerator / denominator of two counters (0 when empty).
+    """
+    def compute() -> float:
+        total = metrics.get(denominator)
+        return round(metrics.get(numerator) / total, 4) if total else 0.0
+    return compute
+
+metrics = Metrics()
@@ -0,0 +1,70 @@
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+from app.core.metrics import metrics, ratio
+
+class _Call:
+    """
+    One in-flight execution that followers wait on.
+    """
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls within a worker process: the
+    first caller for a key (the leader) runs the function, callers that
+    arrive while it is running wait and receive the same result (or
+    exception). Nothing is cached once the call returns.
+
+    Results are shared between threads, so they must be immutable
+    snapshots, never session-bound ORM objects.
+    """
+    def __init__(self, name: str, share_error: Callable[[BaseException], bool] = lambda e: True):
+        self.name = name
+        # Errors that are specific to the leader's request (e.g. its client
+        # went away) aren't passed on; followers retry instead
+        self.share_error = share_error
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        metrics.register_gauge(f"{name}.coalesced_ratio", ratio(f"{name}.coalesced", f"{name}.calls"))
+
+    def do(self, key: Hashable, func: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = self._calls[key] = _Call()
+        metrics.inc(f"{self.name}.calls")
+
+        if not is_leader:
+            metrics.inc(f"{self.name}.coalesced")
+            call.done.wait()
+            if call.error is not None:
+                if not self.share_error(call.error):
+                    return self.do(key, func)
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+            call.done.set()
+
+    def forget(self, predicate: Callable[[Hashable], bool]) -> None:
+        """
+        Stops new callers from joining matching in-flight calls (e.g.
+        after a write, so later reads don't get pre-write results).
+        Callers already waiting still get the in-flight result.
+        """
+        with self._lock:
+            for key in [key for key in self._calls if predicate(key)]:
+                del self._calls[key]
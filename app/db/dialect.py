@@ -0,0 +1,39 @@
+"""
+Switches between the Postgres and the single-node SQLite backend for
+the few constructs the two spell differently. The backend is chosen by
+the scheme of the database URL.
+"""
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import Date, cast, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from app.core.config import settings
+
+IS_SQLITE = settings.is_sqlite()
+
+# INSERT supporting .on_conflict_do_nothing() / .on_conflict_do_update()
+upsert = sqlite_insert if IS_SQLITE else pg_insert
+
+def now_plus(seconds: float):
+    """
+    The database's current time plus `seconds`, as an SQL expression.
+    """
+    if IS_SQLITE:
+        return func.datetime("now", f"+{seconds} seconds")
+    return func.now() + timedelta(seconds=seconds)
+
+def utc_date(column):
+    """
+    The UTC calendar day of a timestamp column.
+    """
+    if IS_SQLITE:
+        # Timestamps are stored as UTC text
+        return func.date(column)
+    return cast(func.timezone("UTC", column), Date)
+
+def as_utc(value: datetime) -> datetime:
+    """
+    SQLite hands back naive datetimes; they are stored in UTC.
+    """
+    return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
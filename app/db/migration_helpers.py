@@ -0,0 +1,149 @@
+"""
+Helpers for migrations that must not block traffic on large tables.
+
+    from app.db.migration_helpers import create_index_concurrently, run_in_batches
+
+Every migration already runs with a short lock_timeout (see env.py), so
+DDL that can't get its lock quickly fails instead of queueing every
+query behind it; the runner (app.scripts.migrate) retries it. These
+helpers commit on their own and need online mode (not `--sql`).
+"""
+import time
+from typing import List, Optional
+import sqlalchemy as sa
+from alembic import op
+from loguru import logger
+
+# Postgres identifiers are truncated past this length
+_MAX_IDENTIFIER = 63
+
+def _partitions(table_name: str) -> List[str]:
+    return list(op.get_bind().execute(sa.text(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+        "WHERE parent.relname = :table ORDER BY child.relname"
+    ), {"table": table_name}).scalars())
+
+def _drop_if_invalid(index_name: str) -> None:
+    """
+    A failed CREATE INDEX CONCURRENTLY leaves an invalid index behind,
+    which IF NOT EXISTS would then silently keep.
+    """
+    invalid = op.get_bind().execute(sa.text(
+        "SELECT 1 FROM pg_class JOIN pg_index ON pg_index.indexrelid = pg_class.oid "
+        "WHERE pg_class.relname = :name AND pg_class.relkind = 'i' AND NOT pg_index.indisvalid"
+    ), {"name": index_name}).first()
+    if invalid:
+        logger.warning(f"Dropping invalid index {index_name} left by an earlier attempt")
+        op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}")
+
+def _is_attached(index_name: str, parent_index: str) -> bool:
+    return op.get_bind().execute(sa.text(
+        "SELECT 1 FROM pg_inherits "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+        "WHERE child.relname = :child AND parent.relname = :parent"
+    ), {"child": index_name, "parent": parent_index}).first() is not None
+
+def _child_index(index_name: str, table_name: str, partition: str) -> str:
+    """
+    The name create_index_concurrently gives a partition's index.
+    """
+    if table_name in index_name:
+        child = index_name.replace(table_name, partition, 1)
+    else:
+        child = f"{partition}_{index_name}"
+    return child[:_MAX_IDENTIFIER]
+
+def create_index_concurrently(
+    index_name: str,
+    table_name: str,
+    columns: List[str],
+    unique: bool = False,
+    where: Optional[str] = None,
+    using: Optional[str] = None
+) -> None:
+    """
+    Builds an index without blocking writes. Safe to re-run.
+
+    Partitioned tables can't be indexed concurrently, so the parent
+    index is created ON ONLY the parent (a catalog-only change), each
+    partition is indexed concurrently and then attached; the parent
+    index becomes valid once every partition is attached.
+    """
+    unique_sql = "UNIQUE " if unique else ""
+    columns_sql = ", ".join(columns)
+    using_sql = f"USING {using} " if using else ""
+    where_sql = f" WHERE {where}" if where else ""
+    partitions = _partitions(table_name)
+
+    with op.get_context().autocommit_block():
+        if not partitions:
+            _drop_if_invalid(index_name)
+            op.execute(
+                f"CREATE {unique_sql}INDEX CONCURRENTLY IF NOT EXISTS {index_name} "
+                f"ON {table_name} {using_sql}({columns_sql}){where_sql}"
+            )
+            return
+
+        op.execute(
+            f"CREATE {unique_sql}INDEX IF NOT EXISTS {index_name} "
+            f"ON ONLY {table_name} {using_sql}({columns_sql}){where_sql}"
+        )
+        for partition in partitions:
+            child = _child_index(index_name, table_name, partition)
+            _drop_if_invalid(child)
+            op.execute(
+                f"CREATE {unique_sql}INDEX CONCURRENTLY IF NOT EXISTS {child} "
+                f"ON {partition} {using_sql}({columns_sql}){where_sql}"
+            )
+            if not _is_attached(child, index_name):
+                op.execute(f"ALTER INDEX {index_name} ATTACH PARTITION {child}")
+
+def drop_index_concurrently(index_name: str, table_name: str) -> None:
+    """
+    Drops an index without blocking reads and writes where Postgres
+    allows it. Indexes on partitioned tables are dropped normally
+    (a brief lock, bounded by lock_timeout).
+    """
+    with op.get_context().autocommit_block():
+        if _partitions(table_name):
+            op.execute(f"DROP INDEX IF EXISTS {index_name}")
+        else:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}")
+
+def rename_index(index_name: str, new_name: str, table_name: str) -> None:
+    """
+    Renames an index and, on a partitioned table, each partition's index
+    (a catalog-only change). With create_index_concurrently and
+    drop_index_concurrently this replaces an index without a window in
+    which queries have none: build the new one under a temporary name,
+    drop the old one, rename.
+    """
+    for partition in _partitions(table_name):
+        op.execute(
+            f"ALTER INDEX IF EXISTS {_child_index(index_name, table_name, partition)} "
+            f"RENAME TO {_child_index(new_name, table_name, partition)}"
+        )
+    op.execute(f"ALTER INDEX {index_name} RENAME TO {new_name}")
+
+def run_in_batches(statement: str, batch_size: int = 1000, pause: float = 0.1, **params) -> int:
+    """
+    Runs a backfill statement repeatedly, each run in its own committed
+    transaction, until it affects no rows. The statement must touch at
+    most :batch_size rows per run and skip rows it already handled
+    (e.g. `WHERE new_column IS NULL`). Sleeping `pause` seconds between
+    batches leaves room for regular traffic and replication.
+    Returns the total number of affected rows.
+    """
+    total = 0
+    with op.get_context().autocommit_block():
+        while True:
+            result = op.get_bind().execute(sa.text(statement), {"batch_size": batch_size, **params})
+            if result.rowcount <= 0:
+                break
+            total += result.rowcount
+            logger.info(f"Backfill progress: {total} rows")
+            time.sleep(pause)
+    return total
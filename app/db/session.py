@@ -1,27 +1,237 @@
-from sqlalchemy import create_engine
+import threading
+from fastapi import Request
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.engine.default import CACHE_HIT, CACHE_MISS
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.horizontal_shard import ShardedSession
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import Pool
+from typing import Callable, Iterator, List
+from loguru import logger
 from app.core.config import settings
+from app.core.metrics import metrics, ratio
+from app.db import sqlite
+from app.db.dialect import IS_SQLITE
+from app.db.sharding import ShardRouter
+
+def _connect_args() -> dict:
+    """
+    Driver-specific connection arguments.
+    - Every connection starts with the default statement_timeout.
+    - psycopg (v3) can switch to server-side prepared statements after a
+      statement has run N times on a connection; psycopg2 has no support.
+    """
+    if IS_SQLITE:
+        return sqlite.connect_args()
+    args = {"options": f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"}
+    if settings.DB_PREPARE_THRESHOLD is None:
+        return args
+    driver = make_url(settings.get_database_url()).get_driver_name()
+    if driver == "psycopg":
+        args["prepare_threshold"] = settings.DB_PREPARE_THRESHOLD
+    else:
+        logger.warning(f"DB_PREPARE_THRESHOLD ignored: driver '{driver}' has no server-side prepared statements")
+    return args
+
+def _create_engine(url: str) -> Engine:
+    created = create_engine(
+        url,
+        pool_pre_ping=True,
+        # Per process: total connections = workers * (pool_size + max_overflow)
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        # Fail fast (503) rather than queue when every connection is busy
+        pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+        # LRU of compiled SQL strings, keyed by statement cache key
+        query_cache_size=settings.DB_COMPILED_CACHE_SIZE,
+        connect_args=_connect_args()
+    )
+    if IS_SQLITE:
+        sqlite.configure_engine(created)
+    return created
 
 # Create the SQLAlchemy engine
-engine = create_engine(
-    settings.get_database_url(), # Use the dynamic URL getter
-    pool_pre_ping=True
+# (with sharding enabled this is the user directory database)
+engine = _create_engine(settings.get_database_url()) # Use the dynamic URL getter
+
+# Horizontal sharding: disabled (single database) unless shards are configured
+shard_router = ShardRouter(
+    {shard_id: _create_engine(url) for shard_id, url in settings.get_shard_urls().items()},
+    directory_engine=engine,
+    vnodes=settings.SHARD_RING_VNODES,
+    cache_size=settings.SHARD_DIRECTORY_CACHE_SIZE,
 )
 
-# Create a configured "Session" class
-SessionLocal = sessionmaker(
-    autocommit=False,
-    autoflush=False,
-    bind=engine
+def all_engines() -> List[Engine]:
+    """
+    Every engine this process may open connections with.
+    """
+    return [engine, *shard_router.engines.values()]
+
+def data_engines() -> List[Engine]:
+    """
+    Engines holding users and tasks (one per shard, or the single database).
+    """
+    return list(shard_router.engines.values()) if shard_router.enabled else [engine]
+
+def dispose_engines(close: bool = True) -> None:
+    """
+    Disposes every connection pool. Use close=False right after a fork
+    so the child doesn't close sockets still owned by the parent.
+    """
+    for each in all_engines():
+        each.dispose(close=close)
+
+def _count_compiled_cache_use(conn, cursor, statement, parameters, context, executemany):
+    """
+    Tracks how often statements are served from the compiled cache.
+    """
+    if context is None:
+        return
+    if context.cache_hit == CACHE_HIT:
+        metrics.inc("db.compiled_cache.hits")
+    elif context.cache_hit == CACHE_MISS:
+        metrics.inc("db.compiled_cache.misses")
+    else:
+        metrics.inc("db.compiled_cache.uncached")
+    metrics.inc("db.statements")
+
+for each in all_engines():
+    event.listen(each, "after_cursor_execute", _count_compiled_cache_use)
+
+metrics.register_gauge(
+    "db.compiled_cache.hit_rate", ratio("db.compiled_cache.hits", "db.statements")
 )
 
-def get_db() -> Session:
+# Create a configured "Session" class
+if shard_router.enabled:
+    SessionLocal = sessionmaker(
+        class_=ShardedSession,
+        autocommit=False,
+        autoflush=False,
+        shards=shard_router.engines,
+        shard_chooser=shard_router.shard_chooser,
+        identity_chooser=shard_router.identity_chooser,
+        execute_chooser=shard_router.execute_chooser
+    )
+else:
+    SessionLocal = sessionmaker(
+        autocommit=False,
+        autoflush=False,
+        bind=engine
+    )
+
+class QueryCancelled(Exception):
+    """
+    Raised in place of the driver error when a session's statement was
+    cancelled because the client went away (see cancel_session_queries).
+    """
+    pass
+
+# Guards the per-session sets of DBAPI connections used for cancellation
+_connections_lock = threading.Lock()
+
+@event.listens_for(Session, "after_begin")
+def _on_connection_begin(session, transaction, connection):
+    """
+    Remembers the session's connections so their statements can be
+    cancelled, and applies a per-session statement_timeout override
+    (SET LOCAL semantics: it ends with the transaction).
+    """
+    with _connections_lock:
+        connections = session.info.setdefault("dbapi_connections", set())
+        connections.add(connection.connection.dbapi_connection)
+        # Per checkout: _on_checkin forgets it (see there)
+        connection.connection.info["cancellable_in"] = connections
+    timeout_ms = session.info.get("statement_timeout_ms")
+    if timeout_ms is not None and not IS_SQLITE:
+        connection.execute(
+            text("SELECT set_config('statement_timeout', :timeout, true)"),
+            {"timeout": str(timeout_ms)}
+        )
+
+@event.listens_for(Pool, "checkin")
+def _on_checkin(dbapi_connection, connection_record):
+    """
+    Forgets a connection as it goes back to the pool, before another
+    request can check it out, so a late cancel can't reach that request.
+    (The session's after_transaction_end only fires after the checkin.)
+    """
+    with _connections_lock:
+        connections = connection_record.info.pop("cancellable_in", None)
+        if connections is not None:
+            connections.discard(dbapi_connection)
+
+def cancel_session_queries(db: Session) -> None:
+    """
+    Cancels whatever the session's connections are executing. Safe to
+    call from another thread. The session's connections are discarded
+    instead of being returned to the pool (see get_db), so a late
+    cancel can never hit another request's query.
+    """
+    with _connections_lock:
+        db.info["cancelled"] = True
+        for dbapi_connection in db.info.get("dbapi_connections", ()):
+            try:
+                # sqlite3 connections are interrupted instead
+                cancel = getattr(dbapi_connection, "cancel", None) or dbapi_connection.interrupt
+                cancel()
+            except Exception as e:
+                logger.warning(f"Could not cancel query: {e}")
+
+def statement_timeout(timeout_ms: int) -> Callable:
+    """
+    Endpoint decorator overriding DB_STATEMENT_TIMEOUT_MS for the
+    sessions get_db hands to that endpoint. Place it below the route
+    decorator.
+    """
+    def decorator(endpoint: Callable) -> Callable:
+        endpoint.statement_timeout_ms = timeout_ms
+        return endpoint
+    return decorator
+
+def iter_shard_sessions() -> Iterator[Session]:
+    """
+    Yields one plain session per data database, for maintenance jobs
+    that work across all owners (stats rebuilds, archival).
+    These run without a statement timeout.
+    """
+    for each in data_engines():
+        db = Session(bind=each, autoflush=False)
+        db.info["statement_timeout_ms"] = 0
+        try:
+            yield db
+        finally:
+            db.close()
+
+def get_db(request: Request) -> Session:
     """
     FastAPI dependency to get a database session.
     Yields a session and ensures it's closed afterward.
+    Write operations inside a batch reuse the batch's session,
+    which is owned (and closed) by the batch request.
+    - Applies the endpoint's @statement_timeout, if any.
+    - Registers the session so its queries are cancelled if the client
+      disconnects; a cancelled session's connections are discarded.
     """
+    shared = getattr(request.state, "batch_db", None)
+    if shared is not None:
+        yield shared
+        return
+
     db = SessionLocal()
+    endpoint = getattr(request.scope.get("route"), "endpoint", None)
+    timeout_ms = getattr(endpoint, "statement_timeout_ms", None)
+    if timeout_ms is not None:
+        db.info["statement_timeout_ms"] = timeout_ms
+    canceller = getattr(request.state, "query_canceller", None)
+    if canceller is not None:
+        canceller.register(db)
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        if db.info.get("cancelled"):
+            db.invalidate()
+        else:
+            db.close()
\ No newline at end of file
@@ -0,0 +1,190 @@
+import bisect
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.engine import Engine
+from loguru import logger
+
+from app.models.user import User
+from app.models.user_directory import UserDirectoryEntry
+
+class HashRing:
+    """
+    Consistent-hash ring over shard IDs. Adding or removing a shard only
+    remaps the keys of the neighbouring ring segments.
+    """
+    def __init__(self, shard_ids: Iterable[str], vnodes: int = 64):
+        self._points: List[Tuple[int, str]] = sorted(
+            (self._hash(f"{shard_id}#{replica}"), shard_id)
+            for shard_id in shard_ids
+            for replica in range(vnodes)
+        )
+        self._keys = [point for point, _ in self._points]
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        return int.from_bytes(hashlib.md5(value.encode()).digest()[:8], "big")
+
+    def shard_for(self, key: int) -> str:
+        if not self._points:
+            raise ValueError("Hash ring has no shards")
+        index = bisect.bisect(self._keys, self._hash(str(key))) % len(self._points)
+        return self._points[index][1]
+
+class _LRU:
+    """
+    Small thread-safe LRU map for directory lookups.
+    """
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key, value) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+class ShardRouter:
+    """
+    Routes owner-scoped work to the shard holding the owner's data.
+
+    The directory database (DATABASE_URL) is the source of truth for
+    placement; the hash ring only decides where *new* users go and where
+    users should live after shards are added (see the rebalance command).
+    Lookups are cached in-process; get_current_user revalidates the
+    cached shard on every request because the user row must be found there.
+
+    With no shards configured the router is disabled and every helper
+    degrades to the single-database behaviour.
+    """
+    def __init__(self, shard_engines: Dict[str, Engine], directory_engine: Engine,
+                 vnodes: int = 64, cache_size: int = 100_000):
+        self.engines = shard_engines
+        self.directory_engine = directory_engine
+        self.ring = HashRing(shard_engines, vnodes=vnodes)
+        self._owners = _LRU(cache_size)
+        self._emails = _LRU(cache_size)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.engines)
+
+    # --- Lookups ---
+
+    def shard_for_owner(self, owner_id: int, refresh: bool = False) -> str:
+        shard_id = None if refresh else self._owners.get(owner_id)
+        if shard_id is None:
+            with self.directory_engine.connect() as conn:
+                shard_id = conn.execute(
+                    select(UserDirectoryEntry.shard_id)
+                    .where(UserDirectoryEntry.user_id == owner_id)
+                ).scalar_one_or_none()
+            if shard_id is None:
+                # Unknown owner: fall back to its ring placement
+                return self.ring.shard_for(owner_id)
+            self._owners.put(owner_id, shard_id)
+        return shard_id
+
+    def shard_for_email(self, email: str, refresh: bool = False) -> Optional[str]:
+        entry = None if refresh else self._emails.get(email)
+        if entry is None:
+            with self.directory_engine.connect() as conn:
+                row = conn.execute(
+                    select(UserDirectoryEntry.user_id, UserDirectoryEntry.shard_id)
+                    .where(UserDirectoryEntry.email == email)
+                ).first()
+            if row is None:
+                return None
+            entry = (row.user_id, row.shard_id)
+            self._emails.put(email, entry)
+            self._owners.put(row.user_id, row.shard_id)
+        return entry[1]
+
+    def forget(self, owner_id: Optional[int] = None, email: Optional[str] = None) -> None:
+        if owner_id is not None:
+            self._owners.pop(owner_id)
+        if email is not None:
+            self._emails.pop(email)
+
+    def bind_args(self, owner_id: int) -> dict:
+        """
+        bind_arguments for Session.execute() targeting the owner's shard
+        (empty when sharding is disabled).
+        """
+        if not self.enabled:
+            return {}
+        return {"shard_id": self.shard_for_owner(owner_id)}
+
+    # --- Directory writes ---
+
+    def register_user(self, email: str) -> Tuple[int, str]:
+        """
+        Allocates a globally unique user ID and places the new user on
+        the shard chosen by the ring. Returns (user_id, shard_id).
+        """
+        with self.directory_engine.begin() as conn:
+            user_id = conn.execute(
+                select(func.nextval("user_directory_user_id_seq"))
+            ).scalar_one()
+            shard_id = self.ring.shard_for(user_id)
+            conn.execute(
+                insert(UserDirectoryEntry)
+                .values(user_id=user_id, email=email, shard_id=shard_id)
+            )
+        self._owners.put(user_id, shard_id)
+        self._emails.put(email, (user_id, shard_id))
+        logger.info(f"Placed user {user_id} on shard '{shard_id}'")
+        return user_id, shard_id
+
+    def unregister_user(self, user_id: int, email: str) -> None:
+        with self.directory_engine.begin() as conn:
+            conn.execute(delete(UserDirectoryEntry).where(UserDirectoryEntry.user_id == user_id))
+        self.forget(owner_id=user_id, email=email)
+
+    # --- ShardedSession hooks ---
+
+    def shard_chooser(self, mapper, instance, clause=None, **kw) -> str:
+        """
+        Picks the shard for flushing a new object.
+        """
+        if isinstance(instance, User):
+            return self.shard_for_owner(instance.id)
+        owner_id = getattr(instance, "owner_id", None)
+        if owner_id is not None:
+            return self.shard_for_owner(owner_id)
+        raise ValueError(
+            f"Cannot choose a shard for {instance!r}; pass bind_arguments={{'shard_id': ...}}"
+        )
+
+    def identity_chooser(self, mapper, primary_key, *, lazy_loaded_from=None, **kw) -> List[str]:
+        """
+        Picks the shards to search for an object by primary key
+        (e.g. lazy-loading Task.owner).
+        """
+        if lazy_loaded_from is not None and lazy_loaded_from.identity_token is not None:
+            return [lazy_loaded_from.identity_token]
+        if mapper.class_ is User:
+            return [self.shard_for_owner(primary_key[0])]
+        return list(self.engines)
+
+    def execute_chooser(self, orm_context) -> List[str]:
+        """
+        Statements without a shard hint run on every shard.
+        """
+        return list(self.engines)
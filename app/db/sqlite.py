@@ -0,0 +1,180 @@
+"""
+Single-node SQLite backend: connection tuning, writer serialization and
+schema creation (the Alembic migrations are Postgres DDL).
+
+SQLite allows one writer at a time, and a transaction that has read
+cannot start writing once another writer has committed after its reads
+began (it fails with "database is locked" at once, whatever the busy
+timeout). So transactions begin as plain (deferred) read transactions,
+which under WAL never wait; the first write takes a process-wide writer
+lock and restarts the transaction as BEGIN IMMEDIATE. Writers queue on
+the lock in order, and every write sees the latest data. As on Postgres
+(read committed), rows read before the first write may have changed.
+"""
+import sqlite3
+import threading
+from sqlalchemy import DefaultClause, MetaData, event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+from loguru import logger
+
+from app.core.config import settings
+from app.db.base import Base
+# Registers every table on Base.metadata
+from app.models import revoked_token, task, task_stats, task_tombstone, user  # noqa: F401
+
+# Statements that need the write lock (SAVEPOINT too: restarting the
+# transaction later would discard it)
+_WRITES = ("INSERT", "UPDATE", "DELETE", "REPLACE", "SAVEPOINT", "CREATE", "DROP", "ALTER")
+
+_writer_lock = threading.Lock()
+
+def connect_args() -> dict:
+    return {
+        # Pooled connections are used from the threadpool
+        "check_same_thread": False,
+        "timeout": settings.SQLITE_BUSY_TIMEOUT_MS / 1000,
+        # Transactions are begun explicitly (see _on_begin)
+        "isolation_level": None,
+    }
+
+def _release_writer(info: dict) -> None:
+    if info.pop("sqlite_writer", False):
+        _writer_lock.release()
+
+def configure_engine(engine: Engine) -> None:
+    """
+    Applies the pragmas and transaction handling to a SQLite engine.
+    """
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in (
+            "journal_mode = WAL",
+            f"synchronous = {settings.SQLITE_SYNCHRONOUS}",
+            f"busy_timeout = {settings.SQLITE_BUSY_TIMEOUT_MS}",
+            f"cache_size = -{settings.SQLITE_CACHE_SIZE_KB}",
+            f"mmap_size = {settings.SQLITE_MMAP_SIZE}",
+            "temp_store = MEMORY",
+            "foreign_keys = ON",
+        ):
+            cursor.execute(f"PRAGMA {pragma}")
+        cursor.close()
+
+    @event.listens_for(engine, "begin")
+    def _on_begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _on_execute(conn, cursor, statement, parameters, context, executemany):
+        if conn.info.get("sqlite_writer") or not conn.in_transaction():
+            return
+        if not statement.lstrip()[:9].upper().startswith(_WRITES):
+            return
+        if not _writer_lock.acquire(timeout=settings.SQLITE_BUSY_TIMEOUT_MS / 1000):
+            raise OperationalError(
+                statement, parameters, sqlite3.OperationalError("database is locked (writer queue)")
+            )
+        conn.info["sqlite_writer"] = True
+        try:
+            # Nothing has been written yet, so only the read snapshot is dropped
+            dbapi_connection = conn.connection.dbapi_connection
+            dbapi_connection.execute("ROLLBACK")
+            dbapi_connection.execute("BEGIN IMMEDIATE")
+        except Exception:
+            _release_writer(conn.info)
+            raise
+        conn.info["sqlite_writer_unused"] = True
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _on_executed(conn, cursor, statement, parameters, context, executemany):
+        conn.info.pop("sqlite_writer_unused", None)
+
+    @event.listens_for(engine, "handle_error")
+    def _on_error(exception_context):
+        # The write that took the lock failed, so the transaction still
+        # holds nothing: back to a read transaction, and the next writer
+        # need not wait for this one to roll back
+        conn = exception_context.connection
+        if conn is None or not conn.info.pop("sqlite_writer_unused", False):
+            return
+        dbapi_connection = conn.connection.dbapi_connection
+        try:
+            dbapi_connection.execute("ROLLBACK")
+            dbapi_connection.execute("BEGIN")
+        finally:
+            _release_writer(conn.info)
+
+    @event.listens_for(engine, "commit")
+    def _on_commit(conn):
+        _release_writer(conn.info)
+
+    @event.listens_for(engine, "rollback")
+    def _on_rollback(conn):
+        _release_writer(conn.info)
+
+    # Safety nets: a connection discarded mid-transaction must not keep
+    # the writer lock
+    @event.listens_for(engine.pool, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        _release_writer(connection_record.info)
+
+    @event.listens_for(engine.pool, "invalidate")
+    def _on_invalidate(dbapi_connection, connection_record, exception):
+        _release_writer(connection_record.info)
+
+# Full-text index for the task filter. The trigram tokenizer matches any
+# substring of three or more characters, case-insensitively, like the
+# ILIKE filter it replaces.
+_FTS_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5(
+        title, description, content='tasks', content_rowid='id', tokenize='trigram'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS tasks_fts_insert AFTER INSERT ON tasks BEGIN
+        INSERT INTO tasks_fts (rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS tasks_fts_delete AFTER DELETE ON tasks BEGIN
+        INSERT INTO tasks_fts (tasks_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS tasks_fts_update AFTER UPDATE OF title, description ON tasks BEGIN
+        INSERT INTO tasks_fts (tasks_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO tasks_fts (rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+]
+
+# The current UTC time with milliseconds, in SQLAlchemy's DateTime format
+_NOW_MS = text("(strftime('%Y-%m-%d %H:%M:%f', 'now'))")
+
+def _schema() -> MetaData:
+    """
+    The models' tables, adjusted where the Postgres DDL doesn't carry over.
+    """
+    metadata = MetaData()
+    for table in Base.metadata.sorted_tables:
+        table.to_metadata(metadata)
+    # Labels are a JSON list here; '{}' is Postgres' empty array
+    metadata.tables["tasks"].c.labels.server_default = DefaultClause("[]")
+    # now() becomes CURRENT_TIMESTAMP, which only has whole seconds
+    for table in metadata.tables.values():
+        for each in table.columns:
+            default = each.server_default
+            if isinstance(default, DefaultClause) and getattr(default.arg, "name", None) == "now":
+                each.server_default = DefaultClause(_NOW_MS)
+    return metadata
+
+def create_schema(engine: Engine) -> None:
+    """
+    Creates any missing tables, indexes and the full-text index.
+    """
+    with engine.begin() as conn:
+        _schema().create_all(conn)
+        for statement in _FTS_DDL:
+            conn.execute(text(statement))
+    logger.info("SQLite schema is up to date")
+
+def drop_schema(engine: Engine) -> None:
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS tasks_fts"))
+        _schema().drop_all(conn)
@@ -1,12 +1,24 @@
-from fastapi import FastAPI, Request
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, Request
 from fastapi.responses import JSONResponse
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
+from sqlalchemy.exc import OperationalError, TimeoutError as PoolTimeoutError
 
 from app.api.v1.routes import api_router
 from app.core.config import settings
 from app.core.logging import setup_logging
-from app.utils.dependencies import get_rate_limit_key
+from app.core.metrics import metrics
+from app.db.session import QueryCancelled, dispose_engines
+from app.services.task_events import broadcaster
+from app.services.token_revocation import revocations
+from app.utils.dependencies import get_rate_limit_key, require_metrics_access
+from app.utils.profiling import ProfilingMiddleware
+from app.utils.admission import AdmissionControlMiddleware
+from app.utils.cancellation import (
+    CancelOnDisconnectMiddleware, db_operational_error_handler,
+    db_pool_timeout_handler, query_cancelled_handler
+)
 
 # Setup custom logging
 setup_logging()
@@ -14,8 +26,21 @@ setup_logging()
 # Setup rate limiting
 limiter = Limiter(key_func=get_rate_limit_key)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Application startup/shutdown hooks.
+    """
+    yield
+    # Close the worker's LISTEN connection for the task change feed
+    broadcaster.stop()
+    revocations.stop()
+    # In-flight requests have drained by now; close pooled connections
+    dispose_engines()
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
+    lifespan=lifespan,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     docs_url="/docs",
     redoc_url="/redoc"
@@ -25,6 +50,19 @@ app = FastAPI(
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
+# Map statement timeouts, pool exhaustion and cancelled queries to 504/503
+app.add_exception_handler(OperationalError, db_operational_error_handler)
+app.add_exception_handler(PoolTimeoutError, db_pool_timeout_handler)
+app.add_exception_handler(QueryCancelled, query_cancelled_handler)
+
+# On-demand / sampled request profiling
+app.add_middleware(ProfilingMiddleware)
+# Cancel a request's queries when its client disconnects
+app.add_middleware(CancelOnDisconnectMiddleware)
+# Outermost: shed load before requests reach the threadpool / DB pool
+if settings.ADMISSION_CONTROL_ENABLED:
+    app.add_middleware(AdmissionControlMiddleware)
+
 # Include the main API router
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
@@ -33,4 +71,12 @@ def health_check():
     """
     Simple health check endpoint.
     """
-    return {"status": "ok"}
\ No newline at end of file
+    return {"status": "ok"}
+
+@app.get("/metrics", tags=["Monitoring"], dependencies=[Depends(require_metrics_access)])
+def read_metrics():
+    """
+    In-process counters for this worker (statement cache, etc.).
+    Requires METRICS_TOKEN or an admin's token.
+    """
+    return metrics.snapshot()
\ No newline at end of file
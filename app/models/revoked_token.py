@@ -0,0 +1,18 @@
+from sqlalchemy import Column, BigInteger, Integer, String, DateTime
+from sqlalchemy.sql import func
+from app.db.base import Base
+
+class RevokedToken(Base):
+    """
+    An access token revoked before its expiry (e.g. by logging out).
+    Rows are only needed until the token would have expired anyway.
+    Lives in the directory database when sharding is enabled.
+    """
+    __tablename__ = "revoked_tokens"
+
+    # SQLite only autoincrements an INTEGER primary key (the rowid)
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    jti = Column(String(64), unique=True, nullable=False)
+    user_id = Column(Integer, nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    revoked_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
@@ -1,19 +1,64 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
-from sqlalchemy.sql import func
+from sqlalchemy import Column, Integer, BigInteger, String, Text, DateTime, ForeignKey, Boolean, Index, JSON
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.sql import func, false, text
 from sqlalchemy.orm import relationship
 from app.db.base import Base
 
 class Task(Base):
     __tablename__ = "tasks"
 
+    # In Postgres the table is list-partitioned on `archived` into a hot
+    # (tasks_hot) and a cold (tasks_cold) partition; see the
+    # partition_tasks_by_archived migration. The physical primary key is
+    # (id, archived) and title uniqueness is enforced on the hot partition.
+    __table_args__ = (
+        # Owner-scoped listing indexes, one per whitelisted sort field
+        # (see task_service.SORTABLE_FIELDS); id breaks created_at ties
+        Index("ix_tasks_owner_id_created_at", "owner_id", "created_at", "id"),
+        Index("ix_tasks_owner_id_title", "owner_id", "title"),
+        Index("ix_tasks_owner_id_id", "owner_id", "id"),
+        # Delta sync: an owner's changes after a given sequence number
+        Index("ix_tasks_owner_id_change_seq", "owner_id", "change_seq"),
+        # Work-queue claims: only unfinished tasks are indexed, so the
+        # index stays small however many tasks have been completed
+        Index(
+            "ix_tasks_owner_id_claimable", "owner_id", "created_at", "id",
+            postgresql_where=text("status IN ('pending', 'claimed')"),
+            sqlite_where=text("status IN ('pending', 'claimed')"),
+        ),
+        # Label filters (@> / &&) are GIN lookups
+        Index("ix_tasks_labels", "labels", postgresql_using="gin"),
+        {"postgresql_partition_by": "LIST (archived)"},
+    )
+
     id = Column(Integer, primary_key=True, index=True)
     
     title = Column(String(100), unique=True, index=True, nullable=False)
     description = Column(Text, nullable=True)
+    # A JSON list on SQLite
+    labels = Column(
+        ARRAY(Text).with_variant(JSON(), "sqlite"), nullable=False, default=list, server_default="{}"
+    )
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # Archived tasks live in the cold partition and are hidden by default
+    archived = Column(Boolean, nullable=False, default=False, server_default=false())
     
+    # Owner's change sequence at the last create/update (see User.change_seq)
+    change_seq = Column(BigInteger, nullable=False, default=0, server_default="0")
+
+    # Work-queue state: pending -> claimed (leased to a worker) -> done.
+    # A claimed task whose lease has expired can be claimed again.
+    status = Column(String(16), nullable=False, default="pending", server_default="pending")
+    claimed_by = Column(String(100), nullable=True)
+    lease_expires_at = Column(DateTime(timezone=True), nullable=True)
+
     # Foreign key to link to the user
     owner_id = Column(Integer, ForeignKey("users.id"))
 
     # Relationship to user
-    owner = relationship("User", back_populates="tasks")
\ No newline at end of file
+    owner = relationship("User", back_populates="tasks")
+
+    # Fetch created_at via RETURNING on insert so the write path
+    # can update the stats rollup without an extra round trip
+    __mapper_args__ = {"eager_defaults": True}
\ No newline at end of file
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, Date, ForeignKey
+from app.db.base import Base
+
+class TaskDailyStat(Base):
+    """
+    Rollup of task counts per owner and per (UTC) creation day.
+    Maintained incrementally by the task write paths.
+    """
+    __tablename__ = "task_daily_stats"
+
+    owner_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+
+    # Number of existing tasks created on this day
+    task_count = Column(Integer, nullable=False, default=0)
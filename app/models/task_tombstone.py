@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, BigInteger, DateTime, ForeignKey
+from sqlalchemy.sql import func
+from app.db.base import Base
+
+class TaskTombstone(Base):
+    """
+    Records a deleted task so delta-sync clients learn about the delete.
+    Keyed by the owner's change sequence, like live tasks.
+    """
+    __tablename__ = "task_tombstones"
+
+    owner_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    change_seq = Column(BigInteger, primary_key=True)
+    task_id = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime(timezone=True), server_default=func.now())
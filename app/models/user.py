@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime
 from sqlalchemy.orm import relationship
 from app.db.base import Base
 
@@ -9,5 +9,13 @@ class User(Base):
     email = Column(String, unique=True, index=True, nullable=False)
     hashed_password = Column(String, nullable=False)
 
+    # Last change sequence handed out to this user's tasks (delta sync).
+    # Bumping it row-locks the user, so an owner's changes commit in
+    # sequence order.
+    change_seq = Column(BigInteger, nullable=False, default=0, server_default="0")
+
+    # Tokens issued before this instant are rejected (revoke-all)
+    tokens_valid_after = Column(DateTime(timezone=True), nullable=True)
+
     # Relationship to tasks
     tasks = relationship("Task", back_populates="owner", cascade="all, delete-orphan")
\ No newline at end of file
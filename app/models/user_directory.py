@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, String
+from app.db.base import Base
+
+class UserDirectoryEntry(Base):
+    """
+    Maps every user to the shard holding their data.
+    Only consulted in the directory database (DATABASE_URL) when
+    sharding is enabled; its sequence also allocates user IDs so
+    they stay unique across shards.
+    """
+    __tablename__ = "user_directory"
+
+    user_id = Column(Integer, primary_key=True)
+    email = Column(String, unique=True, index=True, nullable=False)
+    shard_id = Column(String(64), nullable=False)
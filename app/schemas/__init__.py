@@ -1,4 +1,7 @@
-from .task import Task, TaskCreate, TaskUpdate, TaskBase
+from .task import Task, TaskCreate, TaskUpdate, TaskBase, TaskLabelCount
 from .user import User, UserCreate, UserBase
 from .token import Token, TokenData
-from .pagination import PaginatedResponse
\ No newline at end of file
+from .pagination import PaginatedResponse
+from .task_stats import TaskStats, TaskDayCount
+from .task_changes import TaskChanges
+from .batch import BatchOperation, BatchRequest, BatchResult, BatchResponse
@@ -0,0 +1,33 @@
+from pydantic import BaseModel, Field
+from typing import Any, List, Literal, Optional
+
+class BatchOperation(BaseModel):
+    """
+    A single API call inside a batch.
+    `path` is relative to the v1 API prefix and may include a query string,
+    e.g. "/tasks/?limit=20" or "/tasks/42".
+    """
+    id: Optional[str] = None
+    method: Literal["GET", "POST", "PUT", "PATCH", "DELETE"] = "GET"
+    path: str
+    body: Optional[Any] = None
+
+class BatchRequest(BaseModel):
+    """
+    Schema for the batch request body.
+    """
+    operations: List[BatchOperation] = Field(..., min_length=1)
+
+class BatchResult(BaseModel):
+    """
+    Outcome of one operation, in request order.
+    """
+    id: Optional[str] = None
+    status: int
+    body: Optional[Any] = None
+
+class BatchResponse(BaseModel):
+    """
+    Schema for the batch response.
+    """
+    results: List[BatchResult]
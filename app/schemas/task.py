@@ -1,14 +1,26 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field, StringConstraints, field_validator
+from typing import Annotated, List, Optional
 from datetime import datetime
 from .user import User
 
+MAX_LABELS = 20
+
+# Labels are case-insensitive; stored trimmed and lowercased
+Label = Annotated[str, StringConstraints(strip_whitespace=True, to_lower=True, min_length=1, max_length=50)]
+
+def _unique_labels(labels: Optional[List[str]]) -> List[str]:
+    # An explicit null clears the labels on update
+    return list(dict.fromkeys(labels or []))
+
 class TaskBase(BaseModel):
     """
     Base schema for Task.
     """
     title: str
     description: Optional[str] = None
+    labels: List[Label] = Field(default_factory=list, max_length=MAX_LABELS)
+
+    _unique_labels = field_validator("labels")(_unique_labels)
 
 class TaskCreate(TaskBase):
     """
@@ -24,6 +36,9 @@ class TaskUpdate(BaseModel):
     """
     title: Optional[str] = None
     description: Optional[str] = None
+    labels: Optional[List[Label]] = Field(None, max_length=MAX_LABELS)
+
+    _unique_labels = field_validator("labels")(_unique_labels)
 
 class Task(TaskBase):
     """
@@ -33,7 +48,18 @@ class Task(TaskBase):
     id: int
     created_at: datetime
     owner_id: int
+    archived: bool = False
+    status: str = "pending"
+    change_seq: int = 0
+    claimed_by: Optional[str] = None
+    lease_expires_at: Optional[datetime] = None
     owner: User
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+class TaskLabelCount(BaseModel):
+    """
+    Number of live tasks carrying a label.
+    """
+    label: str
+    count: int
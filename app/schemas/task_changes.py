@@ -0,0 +1,14 @@
+from pydantic import BaseModel
+from typing import List
+from .task import Task
+
+class TaskChanges(BaseModel):
+    """
+    Schema for a delta-sync response.
+    Pass `next_since` as `since` on the next call; keep calling while
+    `has_more` is true.
+    """
+    changed: List[Task]
+    deleted: List[int]
+    next_since: int
+    has_more: bool
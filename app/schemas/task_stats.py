@@ -0,0 +1,17 @@
+from pydantic import BaseModel
+from typing import List
+from datetime import date
+
+class TaskDayCount(BaseModel):
+    """
+    Number of tasks created on a single (UTC) day.
+    """
+    day: date
+    count: int
+
+class TaskStats(BaseModel):
+    """
+    Schema for the per-user task statistics response.
+    """
+    total: int
+    days: List[TaskDayCount]
@@ -1,5 +1,6 @@
 from pydantic import BaseModel
 from typing import Optional
+from datetime import datetime
 
 class Token(BaseModel):
     """
@@ -12,4 +13,9 @@ class TokenData(BaseModel):
     """
     Schema for the data encoded within the JWT.
     """
-    email: Optional[str] = None
\ No newline at end of file
+    email: Optional[str] = None
+    # Token ID, used for revocation (absent in tokens issued before logout existed)
+    jti: Optional[str] = None
+    # Issue time as a (fractional) Unix timestamp
+    issued_at: Optional[float] = None
+    expires_at: Optional[datetime] = None
\ No newline at end of file
@@ -0,0 +1,34 @@
+"""
+Moves old tasks to the cold partition.
+
+Usage:
+    python -m app.scripts.archive_tasks [--older-than-days N] [--batch-size N]
+"""
+import argparse
+from datetime import datetime, timedelta, timezone
+
+from app.core.config import settings
+from app.core.logging import setup_logging
+from app.db.session import iter_shard_sessions
+from app.models.user import User  # noqa: F401 (registers the User mapper)
+from app.services import task_service
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Archive old tasks.")
+    parser.add_argument(
+        "--older-than-days", type=int, default=settings.TASK_ARCHIVE_AFTER_DAYS,
+        help="Archive tasks created more than this many days ago.",
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=settings.TASK_ARCHIVE_BATCH_SIZE,
+        help="Number of tasks moved per transaction.",
+    )
+    args = parser.parse_args()
+
+    setup_logging()
+    cutoff = datetime.now(timezone.utc) - timedelta(days=args.older_than_days)
+    for db in iter_shard_sessions():
+        task_service.archive_tasks(db, older_than=cutoff, batch_size=args.batch_size)
+
+if __name__ == "__main__":
+    main()
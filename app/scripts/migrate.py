@@ -0,0 +1,93 @@
+"""
+Applies database migrations. Run it as a separate step (the `migrate`
+service in docker-compose, a release job, ...) rather than from every
+app container, so app startup never waits on DDL.
+
+- An advisory lock ensures only one runner migrates a database at a time.
+- Migrations that hit lock_timeout (MIGRATION_LOCK_TIMEOUT_MS) are
+  retried with backoff instead of blocking traffic while they wait.
+- A SQLite database gets its schema created from the models instead
+  (the migrations are Postgres DDL).
+
+Usage:
+    python -m app.scripts.migrate [--revision head] [--retries 5]
+"""
+import argparse
+import os
+import time
+from typing import Optional
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, make_url, text
+from sqlalchemy.exc import OperationalError
+from loguru import logger
+
+from app.core.config import settings
+from app.core.logging import setup_logging
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Arbitrary application-wide key for pg_advisory_lock
+MIGRATION_LOCK_ID = 7_318_202_611
+
+# SQLSTATE lock_not_available
+_LOCK_NOT_AVAILABLE = "55P03"
+
+def _is_lock_timeout(error: OperationalError) -> bool:
+    orig = error.orig
+    return _LOCK_NOT_AVAILABLE in (getattr(orig, "pgcode", None), getattr(orig, "sqlstate", None))
+
+def upgrade(url: Optional[str] = None, revision: str = "head", retries: int = 5) -> None:
+    """
+    Upgrades one database (default: the app database) to `revision`.
+    """
+    url = url or settings.get_database_url()
+    if make_url(url).get_backend_name() == "sqlite":
+        from app.db import session, sqlite
+        sqlite.create_schema(session.engine)
+        return
+
+    config = Config(os.path.join(ROOT, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(ROOT, "migrations"))
+    config.cmd_opts = argparse.Namespace(x=[f"db_url={url}"])
+
+    # The lock is session-level; outside a transaction the connection holds
+    # no snapshot, which CREATE INDEX CONCURRENTLY would wait for
+    lock_engine = create_engine(url, isolation_level="AUTOCOMMIT")
+    try:
+        with lock_engine.connect() as lock:
+            logger.info("Waiting for the migration lock...")
+            lock.execute(text("SELECT pg_advisory_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+            try:
+                for attempt in range(1, retries + 1):
+                    try:
+                        command.upgrade(config, revision)
+                        break
+                    except OperationalError as e:
+                        if not _is_lock_timeout(e) or attempt == retries:
+                            raise
+                        delay = min(2 ** attempt, 60)
+                        logger.warning(
+                            f"Migration timed out waiting for a lock (attempt {attempt}/{retries}); "
+                            f"retrying in {delay}s"
+                        )
+                        time.sleep(delay)
+            finally:
+                lock.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": MIGRATION_LOCK_ID})
+    finally:
+        lock_engine.dispose()
+    logger.info(f"Database is at revision '{revision}'")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Apply database migrations.")
+    parser.add_argument("--revision", default="head")
+    parser.add_argument("--retries", type=int, default=5,
+                        help="Attempts per run when a migration hits lock_timeout.")
+    args = parser.parse_args()
+
+    setup_logging()
+    upgrade(revision=args.revision, retries=args.retries)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+"""
+Rebuilds the task statistics rollup table from the tasks table.
+
+Usage:
+    python -m app.scripts.rebuild_task_stats [--owner-id ID]
+"""
+import argparse
+
+from app.core.logging import setup_logging
+from app.db.session import iter_shard_sessions
+from app.models.user import User  # noqa: F401 (registers the User mapper)
+from app.services import task_stats_service
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rebuild the task stats rollup.")
+    parser.add_argument(
+        "--owner-id", type=int, default=None,
+        help="Only rebuild the rollup for this owner (default: everyone).",
+    )
+    args = parser.parse_args()
+
+    setup_logging()
+    for db in iter_shard_sessions():
+        task_stats_service.rebuild_task_stats(db, owner_id=args.owner_id)
+
+if __name__ == "__main__":
+    main()
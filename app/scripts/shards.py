@@ -0,0 +1,65 @@
+"""
+Shard administration.
+
+Usage:
+    python -m app.scripts.shards migrate
+    python -m app.scripts.shards prepare --shard SHARD --offset N
+    python -m app.scripts.shards init-directory --shard SHARD
+    python -m app.scripts.shards move --owner-id ID --to SHARD
+    python -m app.scripts.shards rebalance [--dry-run]
+"""
+import argparse
+
+from app.core.config import settings
+from app.core.logging import setup_logging
+from app.db.session import shard_router
+from app.scripts import migrate
+from app.services import shard_service
+
+def _migrate() -> None:
+    """
+    Upgrades the directory and every shard to the latest revision.
+    """
+    urls = {"directory": settings.get_database_url(), **settings.get_shard_urls()}
+    for name, url in urls.items():
+        print(f"Migrating {name}...")
+        migrate.upgrade(url)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Shard administration.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("migrate", help="Apply migrations to the directory and every shard.")
+    prepare = commands.add_parser("prepare", help="Interleave a shard's task ID sequence.")
+    prepare.add_argument("--shard", required=True)
+    prepare.add_argument("--offset", type=int, required=True)
+    init = commands.add_parser("init-directory", help="Register a shard's existing users.")
+    init.add_argument("--shard", required=True)
+    move = commands.add_parser("move", help="Move one user to another shard.")
+    move.add_argument("--owner-id", type=int, required=True)
+    move.add_argument("--to", required=True)
+    rebalance = commands.add_parser("rebalance", help="Move users to their ring shard.")
+    rebalance.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    setup_logging()
+    if args.command == "migrate":
+        _migrate()
+        return
+    if not shard_router.enabled:
+        parser.error("Sharding is disabled; set SHARD_URLS first")
+
+    if args.command == "prepare":
+        shard_service.prepare_shard(args.shard, args.offset)
+    elif args.command == "init-directory":
+        shard_service.init_directory(args.shard)
+    elif args.command == "move":
+        shard_service.move_owner(args.owner_id, args.to)
+    elif args.command == "rebalance":
+        if args.dry_run:
+            for user_id, current, target in shard_service.plan_rebalance():
+                print(f"user {user_id}: {current} -> {target}")
+        else:
+            shard_service.rebalance()
+
+if __name__ == "__main__":
+    main()
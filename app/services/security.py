@@ -1,4 +1,6 @@
-from datetime import datetime, timedelta
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
@@ -27,7 +29,8 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """
-    Creates a new JWT access token.
+    Creates a new JWT access token with a unique ID (jti) so it can
+    be revoked, and a sub-second issue time (iat) for revoke-all.
     """
     to_encode = data.copy()
     if expires_delta:
@@ -35,7 +38,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     else:
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex, "iat": time.time()})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
@@ -51,7 +54,13 @@ def decode_access_token(token: str) -> Optional[TokenData]:
             logger.warning("JWT token is missing 'sub' (email) claim.")
             return None
         
-        token_data = TokenData(email=email)
+        exp = payload.get("exp")
+        token_data = TokenData(
+            email=email,
+            jti=payload.get("jti"),
+            issued_at=payload.get("iat"),
+            expires_at=datetime.fromtimestamp(exp, timezone.utc) if exp is not None else None,
+        )
         return token_data
     except JWTError as e:
         logger.warning(f"JWT decoding error: {e}")
@@ -0,0 +1,168 @@
+from typing import Dict, List, Tuple
+from sqlalchemy import delete, func, insert, select, text, update
+from loguru import logger
+
+from app.db.session import shard_router
+from app.models.task import Task
+from app.models.task_stats import TaskDailyStat
+from app.models.task_tombstone import TaskTombstone
+from app.models.user import User
+from app.models.user_directory import UserDirectoryEntry
+
+# Tables holding an owner's data, copied parent-first and deleted child-first
+OWNER_SCOPED_TABLES = [
+    (Task.__table__, Task.__table__.c.owner_id),
+    (TaskDailyStat.__table__, TaskDailyStat.__table__.c.owner_id),
+    (TaskTombstone.__table__, TaskTombstone.__table__.c.owner_id),
+]
+
+# Task IDs come from a per-shard sequence. Interleaving the sequences
+# (shard N hands out N, N + stride, N + 2*stride, ...) keeps them unique
+# across shards, so an owner's tasks keep their IDs when moved.
+TASK_ID_STRIDE = 1000
+
+class ShardMoveError(RuntimeError):
+    """
+    Raised when an owner can't be moved between shards.
+    """
+    pass
+
+def prepare_shard(shard_id: str, offset: int) -> None:
+    """
+    Interleaves a shard's task ID sequence with the other shards'.
+    Each shard needs a distinct offset in [1, TASK_ID_STRIDE).
+    """
+    if not 0 < offset < TASK_ID_STRIDE:
+        raise ValueError(f"Offset must be between 1 and {TASK_ID_STRIDE - 1}")
+    with shard_router.engines[shard_id].begin() as conn:
+        current = conn.execute(select(func.coalesce(func.max(Task.id), 0))).scalar_one()
+        start = (current // TASK_ID_STRIDE + 1) * TASK_ID_STRIDE + offset
+        conn.execute(text(
+            f"ALTER SEQUENCE tasks_id_seq INCREMENT BY {TASK_ID_STRIDE} RESTART WITH {start}"
+        ))
+    logger.info(f"Shard '{shard_id}' task IDs now start at {start} (stride {TASK_ID_STRIDE})")
+
+def init_directory(shard_id: str) -> int:
+    """
+    Registers the users already stored on a shard (e.g. the former
+    single database) in the directory. Returns the number registered.
+    """
+    with shard_router.engines[shard_id].connect() as conn:
+        users = conn.execute(select(User.id, User.email)).all()
+
+    with shard_router.directory_engine.begin() as conn:
+        known = set(conn.execute(select(UserDirectoryEntry.user_id)).scalars())
+        rows = [
+            {"user_id": user_id, "email": email, "shard_id": shard_id}
+            for user_id, email in users if user_id not in known
+        ]
+        if rows:
+            conn.execute(insert(UserDirectoryEntry), rows)
+        # New IDs must not collide with the imported ones
+        conn.execute(text(
+            "SELECT setval('user_directory_user_id_seq', "
+            "GREATEST((SELECT COALESCE(MAX(user_id), 0) FROM user_directory), 1))"
+        ))
+    logger.info(f"Registered {len(rows)} users from shard '{shard_id}' in the directory")
+    return len(rows)
+
+def move_owner(owner_id: int, target: str) -> bool:
+    """
+    Moves a user and all of their data to another shard.
+
+    The source rows stay locked (FOR UPDATE) for the whole move, so the
+    owner's writes wait and then fail instead of being lost; reads keep
+    being served from the source until the directory flips.
+    Returns False if the owner already lives on `target`.
+    """
+    source = shard_router.shard_for_owner(owner_id, refresh=True)
+    if source == target:
+        return False
+    if target not in shard_router.engines:
+        raise ShardMoveError(f"Unknown shard '{target}'")
+
+    users = User.__table__
+    with shard_router.engines[source].begin() as src:
+        user = src.execute(
+            select(users).where(users.c.id == owner_id).with_for_update()
+        ).mappings().first()
+        if user is None:
+            raise ShardMoveError(f"User {owner_id} not found on shard '{source}'")
+
+        rows: Dict[str, List[dict]] = {}
+        for table, owner_column in OWNER_SCOPED_TABLES:
+            rows[table.name] = [
+                dict(row) for row in src.execute(
+                    select(table).where(owner_column == owner_id).with_for_update()
+                ).mappings()
+            ]
+
+        task_ids = [row["id"] for row in rows[Task.__tablename__]]
+        with shard_router.engines[target].begin() as dst:
+            if task_ids and dst.execute(
+                select(func.count()).select_from(Task).where(Task.id.in_(task_ids))
+            ).scalar_one():
+                raise ShardMoveError(
+                    f"Task ID collision on shard '{target}'; run 'prepare' on every shard first"
+                )
+            dst.execute(insert(users), [dict(user)])
+            for table, _ in OWNER_SCOPED_TABLES:
+                if rows[table.name]:
+                    dst.execute(insert(table), rows[table.name])
+
+        try:
+            with shard_router.directory_engine.begin() as directory:
+                directory.execute(
+                    update(UserDirectoryEntry)
+                    .where(UserDirectoryEntry.user_id == owner_id)
+                    .values(shard_id=target)
+                )
+        except Exception:
+            logger.error(f"Directory update failed; removing copied data of user {owner_id}")
+            _delete_owner(shard_router.engines[target], owner_id)
+            raise
+
+        for table, owner_column in reversed(OWNER_SCOPED_TABLES):
+            src.execute(delete(table).where(owner_column == owner_id))
+        src.execute(delete(users).where(users.c.id == owner_id))
+
+    shard_router.forget(owner_id=owner_id, email=user["email"])
+    logger.info(
+        f"Moved user {owner_id} ({len(task_ids)} tasks) from shard '{source}' to '{target}'"
+    )
+    return True
+
+def _delete_owner(engine, owner_id: int) -> None:
+    users = User.__table__
+    with engine.begin() as conn:
+        for table, owner_column in reversed(OWNER_SCOPED_TABLES):
+            conn.execute(delete(table).where(owner_column == owner_id))
+        conn.execute(delete(users).where(users.c.id == owner_id))
+
+def plan_rebalance() -> List[Tuple[int, str, str]]:
+    """
+    Lists the users whose shard differs from their hash ring placement,
+    as (user_id, current shard, ring shard).
+    """
+    with shard_router.directory_engine.connect() as conn:
+        entries = conn.execute(
+            select(UserDirectoryEntry.user_id, UserDirectoryEntry.shard_id)
+        ).all()
+    return [
+        (user_id, shard_id, shard_router.ring.shard_for(user_id))
+        for user_id, shard_id in entries
+        if shard_router.ring.shard_for(user_id) != shard_id
+    ]
+
+def rebalance(dry_run: bool = False) -> int:
+    """
+    Moves every misplaced user to its ring shard, one user at a time.
+    Run after adding shards to SHARD_URLS. Returns the number of moves.
+    """
+    moves = plan_rebalance()
+    logger.info(f"Rebalance: {len(moves)} users to move")
+    if dry_run:
+        return len(moves)
+    for user_id, _, target in moves:
+        move_owner(user_id, target)
+    return len(moves)
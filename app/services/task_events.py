@@ -0,0 +1,245 @@
+import asyncio
+import json
+import select
+import threading
+from collections import defaultdict
+from typing import Callable, Dict, List, Set
+from sqlalchemy import event, func
+from sqlalchemy import select as sa_select
+from sqlalchemy.orm import Session
+from loguru import logger
+
+from app.core.config import settings
+from app.db.dialect import IS_SQLITE
+from app.db.session import data_engines, shard_router
+
+CHANNEL = "task_events"
+
+# Sent to a subscriber whose queue overflowed; the client should refetch
+RESYNC_EVENT = {"action": "resync"}
+
+def publish_task_event(db: Session, owner_id: int, task_id: int, action: str) -> None:
+    """
+    Queues a NOTIFY for a task change inside the caller's transaction.
+    Postgres only delivers it when the transaction commits, so
+    rolled-back writes never reach subscribers.
+    """
+    payload = json.dumps({"owner_id": owner_id, "task_id": task_id, "action": action})
+    if IS_SQLITE:
+        # No NOTIFY: delivered in-process on commit (see _deliver_on_commit)
+        db.info.setdefault("pending_task_events", []).append(payload)
+        return
+    db.execute(
+        sa_select(func.pg_notify(CHANNEL, payload)),
+        bind_arguments=shard_router.bind_args(owner_id)
+    )
+
+@event.listens_for(Session, "after_commit")
+def _deliver_on_commit(session):
+    for payload in session.info.pop("pending_task_events", ()):
+        broadcaster.dispatch(payload)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session):
+    session.info.pop("pending_task_events", None)
+
+class Subscription:
+    """
+    A single SSE client's bounded event queue.
+    """
+    def __init__(self, owner_id: int, loop: asyncio.AbstractEventLoop):
+        self.owner_id = owner_id
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=settings.TASK_EVENTS_QUEUE_SIZE)
+
+    def push(self, event: dict) -> None:
+        """
+        Enqueues an event. Applies backpressure to slow consumers by
+        dropping their backlog and asking them to resync instead of
+        buffering without bound. Must run on the subscriber's loop.
+        """
+        if self.queue.full():
+            logger.warning(f"Task event queue full for user {self.owner_id}; forcing resync")
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            event = RESYNC_EVENT
+        self.queue.put_nowait(event)
+
+class TaskEventBroadcaster:
+    """
+    Holds one LISTEN connection per worker process (per shard when
+    sharding is enabled) and fans the notifications out to every
+    subscriber of the affected owner. Listener threads start with the
+    first subscriber. On SQLite there is nothing to listen to: commits
+    dispatch directly, so only this process's writes are seen.
+    """
+    def __init__(self, channel: str = CHANNEL, engines: Callable[[], list] = data_engines):
+        self.channel = channel
+        self.engines = engines
+        self._subscribers: Dict[int, Set[Subscription]] = defaultdict(set)
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+        self._stop = threading.Event()
+        self._connected = 0
+        self._watchers: List[tuple] = []
+
+    def subscribe(self, owner_id: int) -> Subscription:
+        subscription = Subscription(owner_id, asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers[owner_id].add(subscription)
+        self._ensure_listener()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.owner_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.owner_id]
+
+    def watch(self, on_event: Callable[[dict], None], on_reset: Callable[[], None]) -> None:
+        """
+        Registers callbacks for every owner's events and for listener
+        (re)connects, after which events may have been missed. Both are
+        called from the listener threads.
+        """
+        self._watchers.append((on_event, on_reset))
+
+    def ensure_listening(self) -> bool:
+        """
+        Starts the listener threads if needed. Returns whether events
+        from every worker are currently being received.
+        """
+        if IS_SQLITE:
+            return True
+        self._ensure_listener()
+        with self._lock:
+            return self._connected == len(self._threads)
+
+    def dispatch(self, payload: str) -> None:
+        """
+        Routes a raw NOTIFY payload to the owner's subscribers.
+        Safe to call from any thread.
+        """
+        try:
+            event = json.loads(payload)
+            owner_id = int(event["owner_id"])
+        except (ValueError, KeyError, TypeError):
+            logger.warning(f"Ignoring malformed task event payload: {payload!r}")
+            return
+
+        for on_event, _ in self._watchers:
+            on_event(event)
+        with self._lock:
+            subscribers = list(self._subscribers.get(owner_id, ()))
+        for subscription in subscribers:
+            subscription.loop.call_soon_threadsafe(subscription.push, event)
+
+    def stop(self) -> None:
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+
+    def _ensure_listener(self) -> None:
+        if IS_SQLITE:
+            return
+        with self._lock:
+            if self._threads and all(thread.is_alive() for thread in self._threads):
+                return
+            self._stop.clear()
+            self._threads = [
+                threading.Thread(
+                    target=self._listen_forever, args=(each,),
+                    name=f"task-events-listener-{index}", daemon=True
+                )
+                for index, each in enumerate(self.engines())
+            ]
+            for thread in self._threads:
+                thread.start()
+
+    def _listen_forever(self, engine) -> None:
+        backoff = 1
+        while not self._stop.is_set():
+            try:
+                self._listen(engine)
+                backoff = 1
+            except Exception as e:
+                logger.error(f"Task event listener failed, reconnecting in {backoff}s: {e}")
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, 30)
+
+    def _listen(self, engine) -> None:
+        # A dedicated connection, detached so it never returns to the pool
+        connection = engine.raw_connection()
+        connection.detach()
+        dbapi_connection = connection.dbapi_connection
+        connected = False
+        try:
+            dbapi_connection.autocommit = True
+            cursor = dbapi_connection.cursor()
+            cursor.execute(f'LISTEN "{self.channel}"')
+            logger.info(f"Listening for task events on channel '{self.channel}'")
+            self._set_connected(1)
+            connected = True
+
+            # Both wait at most a second at a time to notice stop requests
+            if engine.dialect.driver == "psycopg2":
+                self._receive_psycopg2(dbapi_connection)
+            else:
+                self._receive_psycopg(dbapi_connection)
+        finally:
+            if connected:
+                self._set_connected(-1)
+            dbapi_connection.close()
+
+    def _receive_psycopg2(self, dbapi_connection) -> None:
+        while not self._stop.is_set():
+            if select.select([dbapi_connection], [], [], 1.0) == ([], [], []):
+                continue
+            dbapi_connection.poll()
+            while dbapi_connection.notifies:
+                notify = dbapi_connection.notifies.pop(0)
+                self.dispatch(notify.payload)
+
+    def _receive_psycopg(self, dbapi_connection) -> None:
+        # psycopg (v3): the generator ends when the timeout passes quietly
+        while not self._stop.is_set():
+            for notify in dbapi_connection.notifies(timeout=1.0):
+                self.dispatch(notify.payload)
+
+    def _set_connected(self, delta: int) -> None:
+        with self._lock:
+            self._connected += delta
+        for _, on_reset in self._watchers:
+            on_reset()
+
+broadcaster = TaskEventBroadcaster()
+
+def format_sse(event: dict, event_type: str = "task") -> str:
+    """
+    Serializes an event in the Server-Sent Events wire format.
+    """
+    return f"event: {event_type}\ndata: {json.dumps(event)}\n\n"
+
+async def stream_task_events(owner_id: int):
+    """
+    Async generator yielding SSE frames for one subscriber, with
+    comment heartbeats to keep idle connections and proxies alive.
+    """
+    subscription = broadcaster.subscribe(owner_id)
+    try:
+        yield ": connected\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(
+                    subscription.queue.get(),
+                    timeout=settings.TASK_EVENTS_HEARTBEAT_SECONDS,
+                )
+            except asyncio.TimeoutError:
+                yield ": heartbeat\n\n"
+                continue
+            yield format_sse(event, "resync" if event is RESYNC_EVENT else "task")
+    finally:
+        broadcaster.unsubscribe(subscription)
@@ -0,0 +1,223 @@
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Callable, Dict, Sequence, Set, Tuple
+
+from app.core.metrics import metrics, ratio
+from app.schemas.task import Task as TaskSnapshot
+
+# Changes that advance the owner's change_seq. A page is only served for
+# the change_seq it reflects, so these never need an event to invalidate it
+_SEQUENCED_ACTIONS = {"created", "updated", "deleted", "completed", "archived"}
+
+def _encode(task) -> bytes:
+    """
+    Serializes a task (ORM object or snapshot) as the API returns it.
+    """
+    return TaskSnapshot.model_validate(task).model_dump_json().encode()
+
+class _Page:
+    """
+    One owner's newest live tasks, already serialized, and their total
+    count as of the owner's change `seq`.
+    """
+    __slots__ = ("seq", "total", "ids", "created", "rows", "size")
+
+    def __init__(self, seq: int, total: int, tasks: Sequence):
+        self.seq = seq
+        self.total = total
+        self.ids = [task.id for task in tasks]
+        self.created = [task.created_at for task in tasks]
+        self.rows = [_encode(task) for task in tasks]
+        self.size = sum(map(len, self.rows))
+
+    def serves(self, limit: int) -> bool:
+        return len(self.rows) >= min(limit, self.total)
+
+    def render(self, limit: int) -> bytes:
+        """
+        The PaginatedResponse body for the first `limit` tasks.
+        """
+        return b'{"total":%d,"limit":%d,"offset":0,"data":[%b]}' % (
+            self.total, limit, b",".join(self.rows[:limit])
+        )
+
+    def insert(self, task_id: int, created_at, row: bytes, capacity: int) -> None:
+        self.total += 1
+        # Newest first, ties broken by id as in the listing query; a task
+        # older than every cached row on a partial page belongs to a later page
+        key = (created_at, task_id)
+        index = next(
+            (i for i, cached in enumerate(zip(self.created, self.ids)) if cached < key), len(self.rows)
+        )
+        if index == len(self.rows) and len(self.rows) < self.total - 1:
+            return
+        self.ids.insert(index, task_id)
+        self.created.insert(index, created_at)
+        self.rows.insert(index, row)
+        self.size += len(row)
+        if len(self.rows) > capacity:
+            self.ids.pop()
+            self.created.pop()
+            self.size -= len(self.rows.pop())
+
+    def replace(self, task_id: int, row: bytes) -> None:
+        if task_id in self.ids:
+            index = self.ids.index(task_id)
+            self.size += len(row) - len(self.rows[index])
+            self.rows[index] = row
+
+    def remove(self, task_id: int) -> None:
+        self.total -= 1
+        if task_id in self.ids:
+            index = self.ids.index(task_id)
+            del self.ids[index], self.created[index]
+            self.size -= len(self.rows.pop(index))
+
+class _Load:
+    __slots__ = ("valid",)
+
+    def __init__(self):
+        self.valid = True
+
+class FirstPageCache:
+    """
+    Keeps each owner's default first page (live tasks, newest first) as
+    serialized rows, within a worker process. Owners are evicted least
+    recently used first once the rows exceed `max_bytes`.
+
+    A page is served only for the change_seq it reflects, which the
+    caller passes in from the user row it authenticated with, so changes
+    made by any worker that advance change_seq are never served stale.
+    This worker's creates, updates and deletes patch the page in place;
+    changes that don't advance change_seq (claims, lease renewals)
+    invalidate it, from other workers through their task events.
+    """
+    def __init__(self, name: str, capacity: int, max_bytes: int):
+        self.name = name
+        self.capacity = capacity
+        self.max_bytes = max_bytes
+        self._pages: "OrderedDict[int, _Page]" = OrderedDict()
+        self._bytes = 0
+        # Loads in flight per owner; an invalidation voids them
+        self._loads: Dict[int, Set[_Load]] = defaultdict(set)
+        self._lock = threading.Lock()
+        metrics.register_gauge(f"{name}.hit_ratio", ratio(f"{name}.hits", f"{name}.reads"))
+        metrics.register_gauge(f"{name}.owners", lambda: len(self._pages))
+        metrics.register_gauge(f"{name}.bytes", lambda: self._bytes)
+
+    def get(self, owner_id: int, seq: int, limit: int,
+            load: Callable[[], Tuple[int, Sequence, int]]) -> bytes:
+        """
+        Returns the body for the owner's first `limit` tasks as of change
+        `seq`. On a miss, load() returns (total, newest tasks, change_seq
+        read after them); the page is kept only if that is still `seq`.
+        """
+        metrics.inc(f"{self.name}.reads")
+        with self._lock:
+            page = self._pages.get(owner_id)
+            if page is not None and page.seq == seq and page.serves(limit):
+                self._pages.move_to_end(owner_id)
+                metrics.inc(f"{self.name}.hits")
+                return page.render(limit)
+            ticket = _Load()
+            self._loads[owner_id].add(ticket)
+
+        try:
+            total, tasks, loaded_seq = load()
+        finally:
+            with self._lock:
+                self._loads[owner_id].discard(ticket)
+                if not self._loads[owner_id]:
+                    del self._loads[owner_id]
+        page = _Page(loaded_seq, total, tasks[:self.capacity])
+        body = page.render(limit)
+
+        with self._lock:
+            current = self._pages.get(owner_id)
+            if ticket.valid and loaded_seq == seq and (current is None or current.seq <= seq):
+                self._store(owner_id, page)
+        return body
+
+    def created(self, owner_id: int, tasks: Sequence, first_seq: int, last_seq: int) -> None:
+        """
+        Applies tasks created by changes first_seq..last_seq (some of the
+        numbers may have gone unused).
+        """
+        def apply(page: _Page, rows: list) -> None:
+            for task_id, created_at, row in rows:
+                page.insert(task_id, created_at, row, self.capacity)
+        self._patch(
+            owner_id, first_seq, last_seq,
+            lambda: [(task.id, task.created_at, _encode(task)) for task in tasks], apply
+        )
+
+    def updated(self, owner_id: int, task) -> None:
+        self._patch(
+            owner_id, task.change_seq, task.change_seq,
+            lambda: _encode(task), lambda page, row: page.replace(task.id, row)
+        )
+
+    def deleted(self, owner_id: int, task_id: int, seq: int) -> None:
+        self._patch(owner_id, seq, seq, lambda: None, lambda page, _: page.remove(task_id))
+
+    def invalidate(self, owner_id: int) -> None:
+        with self._lock:
+            self._drop(owner_id)
+            for ticket in self._loads.get(owner_id, ()):
+                ticket.valid = False
+
+    def clear(self) -> None:
+        with self._lock:
+            self._pages.clear()
+            self._bytes = 0
+            for tickets in self._loads.values():
+                for ticket in tickets:
+                    ticket.valid = False
+
+    def on_event(self, event: dict) -> None:
+        """
+        Task event callback (see TaskEventBroadcaster.watch).
+        """
+        if event.get("action") not in _SEQUENCED_ACTIONS:
+            self.invalidate(int(event["owner_id"]))
+
+    def _patch(self, owner_id: int, first_seq: int, last_seq: int,
+               encode: Callable[[], object], apply: Callable[[_Page, object], None]) -> None:
+        """
+        Applies a change if the page reflects every change before it, and
+        drops the page otherwise (a change in between was made by another
+        worker, or is being patched out of order): the next read rebuilds it.
+        encode() runs outside the lock, as it may load ORM attributes.
+        """
+        with self._lock:
+            page = self._pages.get(owner_id)
+            if page is None:
+                return
+            if page.seq != first_seq - 1:
+                self._drop(owner_id)
+                return
+        data = encode()
+        with self._lock:
+            page = self._pages.get(owner_id)
+            if page is None or page.seq != first_seq - 1:
+                self._drop(owner_id)
+                return
+            before = page.size
+            apply(page, data)
+            page.seq = last_seq
+            self._bytes += page.size - before
+        metrics.inc(f"{self.name}.patches")
+
+    def _store(self, owner_id: int, page: _Page) -> None:
+        self._drop(owner_id)
+        self._pages[owner_id] = page
+        self._bytes += page.size
+        while self._bytes > self.max_bytes and self._pages:
+            _, evicted = self._pages.popitem(last=False)
+            self._bytes -= evicted.size
+            metrics.inc(f"{self.name}.evictions")
+
+    def _drop(self, owner_id: int) -> None:
+        page = self._pages.pop(owner_id, None)
+        if page is not None:
+            self._bytes -= page.size
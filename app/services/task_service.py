@@ -1,11 +1,164 @@
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import select, func, text, column
-from typing import List, Optional
+from sqlalchemy import select, func, text, column, update, case, false, true, bindparam, join, or_, and_
+from sqlalchemy.exc import IntegrityError, OperationalError
+from collections import Counter, defaultdict
+from typing import List, Optional, Sequence, Tuple
+from datetime import datetime
 from loguru import logger
 
+from app.core.config import settings
+from app.core.group_commit import GroupCommitter
+from app.core.single_flight import SingleFlight
+from app.db.dialect import IS_SQLITE, now_plus, upsert
+from app.db.session import QueryCancelled, shard_router
+
 from app.models.task import Task
+from app.models.task_tombstone import TaskTombstone
 from app.models.user import User
-from app.schemas.task import TaskCreate, TaskUpdate
+from app.schemas.task import TaskCreate, TaskUpdate, Task as TaskSnapshot
+from app.services import task_stats_service, task_events
+from app.services.task_pages import FirstPageCache
+
+# Whitelisted sort fields and the composite (owner_id, <field>) index that
+# returns an owner's tasks already ordered by that field.
+SORTABLE_FIELDS = {
+    "created_at": "ix_tasks_owner_id_created_at",
+    "title": "ix_tasks_owner_id_title",
+    "id": "ix_tasks_owner_id_id",
+}
+MAX_SORT_KEYS = 3
+
+# Hot read-path statements, built once at import time. Their cache keys are
+# memoized on the statement objects and the compiled SQL lives in the
+# engine's compiled cache, so each call only binds new parameter values.
+_OWNED_BY = Task.owner_id == bindparam("owner_id")
+_NOT_ARCHIVED = Task.archived == false()
+
+_TASK_BY_ID = (
+    select(Task)
+    .where(Task.id == bindparam("task_id"), _OWNED_BY, _NOT_ARCHIVED)
+    .limit(1)
+)
+_TASK_PAGE = select(Task).options(joinedload(Task.owner)).where(_OWNED_BY)
+_TASK_COUNT = select(func.count()).select_from(Task).where(_OWNED_BY)
+
+# The default listing (live tasks, newest first, no filters); tasks
+# created in one transaction share created_at, so id breaks the tie
+_DEFAULT_SORT = [("created_at", True)]
+_DEFAULT_TASK_PAGE = (
+    _TASK_PAGE.where(_NOT_ARCHIVED)
+    .order_by(Task.created_at.desc(), Task.id.desc())
+    .limit(bindparam("limit"))
+    .offset(bindparam("offset"))
+)
+_DEFAULT_TASK_COUNT = _TASK_COUNT.where(_NOT_ARCHIVED)
+_CHANGE_SEQ = select(User.change_seq).where(User.id == bindparam("owner_id"))
+
+_ORDER_BY = {
+    (field, descending): getattr(Task, field).desc() if descending else getattr(Task, field).asc()
+    for field in SORTABLE_FIELDS
+    for descending in (True, False)
+}
+
+def _order_by(sort_keys: List[Tuple[str, bool]]) -> list:
+    """
+    ORDER BY clauses for a listing. Unless id is already a key it breaks
+    the remaining ties, so pages never overlap or skip tied rows.
+    """
+    clauses = [_ORDER_BY[key] for key in sort_keys]
+    if "id" not in (field for field, _ in sort_keys):
+        clauses.append(_ORDER_BY[("id", sort_keys[0][1])])
+    return clauses
+
+# Tasks a worker may claim: never claimed, or claimed with a lapsed lease
+_CLAIMABLE = or_(
+    Task.status == "pending",
+    and_(Task.status == "claimed", Task.lease_expires_at < func.now()),
+)
+
+# Coalesces identical concurrent API reads; keys start with the owner ID
+_read_flights = SingleFlight(
+    "task_reads", share_error=lambda e: not isinstance(e, QueryCancelled)
+)
+
+# Batches concurrent creates (TASK_GROUP_COMMIT); keys are shard IDs
+_create_batches = GroupCommitter(
+    "task_creates",
+    window=settings.TASK_GROUP_COMMIT_WINDOW_MS / 1000,
+    max_batch=settings.TASK_GROUP_COMMIT_MAX_BATCH,
+    share_error=lambda e: not isinstance(e, QueryCancelled),
+)
+
+# Serialized default first pages (TASK_FIRST_PAGE_CACHE); other workers'
+# claims and lease renewals reach it through their task events
+_first_pages = FirstPageCache(
+    "task_pages",
+    capacity=settings.TASK_FIRST_PAGE_ROWS,
+    max_bytes=int(settings.TASK_FIRST_PAGE_CACHE_MB * 1024 * 1024),
+)
+task_events.broadcaster.watch(_first_pages.on_event, _first_pages.clear)
+
+def _cancellable(db: Session, load):
+    """
+    Runs a coalesced read or batched write, reporting a disconnect-triggered
+    cancel as QueryCancelled so followers retry instead of failing with it.
+    """
+    try:
+        return load()
+    except OperationalError as e:
+        if db.info.get("cancelled"):
+            raise QueryCancelled() from e
+        raise
+
+def _reads_changed(owner_id: int) -> None:
+    """
+    Called after an owner's tasks change: reads that start from now on
+    must not join a query that began before the change.
+    """
+    _read_flights.forget(lambda key: key[0] == owner_id)
+
+class InvalidTaskQuery(ValueError):
+    """
+    Raised when a task listing asks for an unsupported sort or
+    filter combination.
+    """
+    pass
+
+class DuplicateTaskTitle(Exception):
+    """
+    Raised when a new task's title is already taken.
+    """
+    def __init__(self, title: str):
+        super().__init__(f"A task titled '{title}' already exists")
+
+def _is_unique_violation(error: IntegrityError) -> bool:
+    return (
+        "23505" in (getattr(error.orig, "pgcode", None), getattr(error.orig, "sqlstate", None))
+        or getattr(error.orig, "sqlite_errorname", None) == "SQLITE_CONSTRAINT_UNIQUE"
+    )
+
+class TaskLeaseLost(Exception):
+    """
+    Raised when a worker renews or completes a task it no longer holds.
+    """
+    pass
+
+def _next_change_seq(db: Session, owner_id: int, count: int = 1) -> int:
+    """
+    Hands out the owner's next change sequence number (reserves `count`
+    numbers and returns the last). The row lock
+    taken on the user is held until the caller commits, so concurrent
+    writers for one owner commit in sequence order and a delta-sync
+    client never skips over a change that commits late.
+    """
+    return db.execute(
+        update(User)
+        .where(User.id == owner_id)
+        .values(change_seq=User.change_seq + count)
+        .returning(User.change_seq)
+        .execution_options(synchronize_session=False),
+        bind_arguments=shard_router.bind_args(owner_id)
+    ).scalar_one()
 
 def create_task(db: Session, task_in: TaskCreate, owner_id: int) -> Task:
     """
@@ -16,24 +169,219 @@ def create_task(db: Session, task_in: TaskCreate, owner_id: int) -> Task:
     db_task = Task(**task_in.model_dump(), owner_id=owner_id)
     
     try:
+        db_task.change_seq = _next_change_seq(db, owner_id)
         db.add(db_task)
+        db.flush()
+        task_stats_service.record_task_created(db, owner_id, db_task.created_at)
+        task_events.publish_task_event(db, owner_id, db_task.id, "created")
         db.commit()
+        _reads_changed(owner_id)
         db.refresh(db_task)
+        _first_pages.created(owner_id, [db_task], db_task.change_seq, db_task.change_seq)
         logger.info(f"Task created with ID: {db_task.id}")
         return db_task
     except Exception as e:
         logger.error(f"Transaction failed for task creation: {e}")
         db.rollback()
+        if isinstance(e, IntegrityError) and _is_unique_violation(e):
+            raise DuplicateTaskTitle(task_in.title) from e
         raise
 
+def create_task_grouped(db: Session, task_in: TaskCreate, owner_id: int) -> TaskSnapshot:
+    """
+    create_task for the API when TASK_GROUP_COMMIT is on: concurrent
+    creates for the same shard are inserted by one multi-row INSERT and
+    share one commit. Returns an immutable snapshot. A taken title raises
+    DuplicateTaskTitle for that request only.
+    """
+    return _create_batches.submit(
+        shard_router.bind_args(owner_id).get("shard_id"),
+        (task_in, owner_id),
+        lambda items: _cancellable(db, lambda: _insert_tasks(db, items)),
+    )
+
+def _insert_tasks(db: Session, items: List[Tuple[TaskCreate, int]]) -> list:
+    """
+    Inserts a batch of (task_in, owner_id) in one transaction. Returns a
+    TaskSnapshot or a DuplicateTaskTitle per item, in order. If the batch
+    fails for another reason, each item is retried on its own so one bad
+    task can't fail the others.
+    """
+    per_owner = Counter(owner_id for _, owner_id in items)
+    shard = shard_router.bind_args(items[0][1])
+    try:
+        # Owners are locked in ID order, so concurrent batches can't deadlock
+        next_seq, reserved = {}, {}
+        for owner_id in sorted(per_owner):
+            last_seq = _next_change_seq(db, owner_id, per_owner[owner_id])
+            next_seq[owner_id] = last_seq - per_owner[owner_id] + 1
+            reserved[owner_id] = (next_seq[owner_id], last_seq)
+        rows = []
+        for task_in, owner_id in items:
+            rows.append({**task_in.model_dump(), "owner_id": owner_id, "change_seq": next_seq[owner_id]})
+            next_seq[owner_id] += 1
+
+        # Rows whose title is taken (also by an earlier row of this batch)
+        # are skipped rather than failing the statement
+        tasks = db.execute(
+            upsert(Task).on_conflict_do_nothing().returning(Task), rows, bind_arguments=shard
+        ).scalars().all()
+        # Loads the owners into the session for the snapshots' Task.owner
+        db.execute(select(User).where(User.id.in_(per_owner)), bind_arguments=shard).all()
+
+        for owner_id, count in Counter(task.owner_id for task in tasks).items():
+            task_stats_service.record_task_created(db, owner_id, tasks[0].created_at, count=count)
+        for task in tasks:
+            task_events.publish_task_event(db, task.owner_id, task.id, "created")
+        created = {(task.owner_id, task.change_seq): TaskSnapshot.model_validate(task) for task in tasks}
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        if len(items) == 1 or db.info.get("cancelled"):
+            logger.error(f"Transaction failed for task creation: {e}")
+            raise
+        logger.warning(f"Group insert of {len(items)} tasks failed, retrying one by one: {e}")
+        outcomes = []
+        for item in items:
+            try:
+                outcomes.extend(_insert_tasks(db, [item]))
+            except Exception as item_error:
+                outcomes.append(item_error)
+        return outcomes
+
+    for owner_id in per_owner:
+        _reads_changed(owner_id)
+        owned = sorted(
+            (task for task in created.values() if task.owner_id == owner_id), key=lambda task: task.change_seq
+        )
+        _first_pages.created(owner_id, owned, *reserved[owner_id])
+    logger.info(f"Group-committed {len(tasks)} of {len(items)} tasks")
+    return [
+        created.get((owner_id, row["change_seq"])) or DuplicateTaskTitle(task_in.title)
+        for (task_in, owner_id), row in zip(items, rows)
+    ]
+
 def get_task_by_id(db: Session, task_id: int, owner_id: int) -> Task | None:
     """
     Retrieves a single task by its ID, ensuring it belongs to the owner.
+    Archived tasks are not returned (and so cannot be updated or deleted).
+    """
+    return db.execute(
+        _TASK_BY_ID, {"task_id": task_id, "owner_id": owner_id},
+        bind_arguments=shard_router.bind_args(owner_id)
+    ).scalars().first()
+
+def read_task(db: Session, task_id: int, owner_id: int) -> TaskSnapshot | None:
+    """
+    Read-only get_task_by_id for the API. Concurrent identical calls
+    in this worker share one query and receive the same immutable
+    snapshot. Write paths must use get_task_by_id.
+    """
+    def load() -> TaskSnapshot | None:
+        db_task = get_task_by_id(db, task_id=task_id, owner_id=owner_id)
+        return TaskSnapshot.model_validate(db_task) if db_task is not None else None
+
+    if not settings.TASK_READ_COALESCING:
+        return load()
+    return _read_flights.do((owner_id, "task", task_id), lambda: _cancellable(db, load))
+
+def parse_sort(sort: str) -> List[Tuple[str, bool]]:
+    """
+    Parses a sort spec like "-created_at,title" into
+    [(field, descending), ...]. Only whitelisted fields are accepted.
+    """
+    keys = []
+    for part in sort.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        field = part.lstrip("+-")
+        if field not in SORTABLE_FIELDS:
+            raise InvalidTaskQuery(
+                f"Cannot sort by '{field}'. Allowed fields: {', '.join(SORTABLE_FIELDS)}"
+            )
+        if field in (existing for existing, _ in keys):
+            raise InvalidTaskQuery(f"Duplicate sort field '{field}'")
+        keys.append((field, part.startswith("-")))
+
+    if not keys:
+        raise InvalidTaskQuery("Empty sort specification")
+    if len(keys) > MAX_SORT_KEYS:
+        raise InvalidTaskQuery(f"At most {MAX_SORT_KEYS} sort fields are allowed")
+    return keys
+
+def choose_index(
+    sort_keys: List[Tuple[str, bool]],
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    title: Optional[str] = None
+) -> Tuple[str, bool]:
+    """
+    Maps a listing's filters and sort to the declared index that serves it.
+    Returns (index name, needs_sort): needs_sort is True when the index
+    can't deliver rows in the requested order, so every matching row has
+    to be sorted before the page can be cut.
+    """
+    if title is not None:
+        # Exact title matches at most one live task
+        return SORTABLE_FIELDS["title"], False
+    if created_after is not None or created_before is not None:
+        return SORTABLE_FIELDS["created_at"], sort_keys[0][0] != "created_at"
+    # Secondary keys only break ties (incremental sort), so the leading
+    # key decides the index
+    return SORTABLE_FIELDS[sort_keys[0][0]], False
+
+def normalize_labels(labels: Optional[Sequence[str]]) -> List[str]:
+    """
+    Trims, lowercases and de-duplicates label filters, as labels are stored.
+    """
+    return sorted({label.strip().lower() for label in labels or () if label.strip()})
+
+def _label_filter(labels: List[str], label_match: str):
+    """
+    Tasks carrying all (label_match="all") or any of the labels.
+    """
+    if not IS_SQLITE:
+        # @> / && on the GIN-indexed array
+        return Task.labels.overlap(labels) if label_match == "any" else Task.labels.contains(labels)
+    each = func.json_each(Task.labels).table_valued("value")
+    matches = select(func.count()).select_from(each).where(each.c.value.in_(labels)).scalar_subquery()
+    return matches > 0 if label_match == "any" else matches == len(labels)
+
+def _text_search(filter_query: str):
+    """
+    Case-insensitive substring match on title or description.
+    """
+    if IS_SQLITE and len(filter_query) >= 3:
+        # Trigram full-text index (see app/db/sqlite.py)
+        phrase = '"' + filter_query.replace('"', '""') + '"'
+        return Task.id.in_(
+            text("SELECT rowid FROM tasks_fts WHERE tasks_fts MATCH :phrase")
+            .bindparams(phrase=phrase)
+            .columns(column("rowid"))
+        )
+    search_term = f"%{filter_query}%"
+    return Task.title.ilike(search_term) | Task.description.ilike(search_term)
+
+def _listing_sort(sort: Optional[str], sort_by: str, sort_order: str) -> List[Tuple[str, bool]]:
+    if sort:
+        return parse_sort(sort)
+    sort_keys = parse_sort(sort_by)
+    sort_keys[0] = (sort_keys[0][0], sort_order.lower() == "desc")
+    return sort_keys
+
+def _is_default_listing(
+    sort_keys, include_archived=False, filter_query=None, title=None,
+    created_after=None, created_before=None, labels=None, label_match="all"
+) -> bool:
+    """
+    The listing nearly every client asks for: live tasks, newest first,
+    unfiltered (label_match only matters with labels).
     """
     return (
-        db.query(Task)
-        .filter(Task.id == task_id, Task.owner_id == owner_id)
-        .first()
+        sort_keys == _DEFAULT_SORT and not include_archived and not filter_query
+        and title is None and created_after is None and created_before is None
+        and not normalize_labels(labels)
     )
 
 def get_all_tasks(
@@ -43,42 +391,144 @@ def get_all_tasks(
     offset: int = 0,
     sort_by: str = "created_at",
     sort_order: str = "desc",
-    filter_query: Optional[str] = None
+    filter_query: Optional[str] = None,
+    include_archived: bool = False,
+    sort: Optional[str] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    title: Optional[str] = None,
+    labels: Optional[Sequence[str]] = None,
+    label_match: str = "all"
 ) -> (int, List[Task]):
     """
     Retrieves a paginated list of tasks for a user.
     - Implements pagination and sorting. [cite: 49]
     - Implements a custom SQL filter query. 
+    - Only reads the hot partition unless include_archived is set.
+    - `sort` ("-created_at,title") takes precedence over sort_by/sort_order.
+    - `labels` keeps tasks carrying all (or, with label_match="any", any)
+      of the labels; served by the GIN index on labels.
+    - Raises InvalidTaskQuery for non-whitelisted sorts, and for sorts
+      that would need a full sort of more than TASK_UNINDEXED_SORT_MAX_ROWS rows.
     """
-    
-    # Base query
-    query = (
-        db.query(Task)
-        .filter(Task.owner_id == owner_id)
-        .options(joinedload(Task.owner))
-    )
+    sort_keys = _listing_sort(sort, sort_by, sort_order)
+    index_name, needs_sort = choose_index(sort_keys, created_after, created_before, title)
+    params = {"owner_id": owner_id, "limit": limit, "offset": offset}
+    shard = shard_router.bind_args(owner_id)
+
+    labels = normalize_labels(labels)
+    if _is_default_listing(
+        sort_keys, include_archived, filter_query, title, created_after, created_before, labels
+    ):
+        total_count = db.execute(_DEFAULT_TASK_COUNT, params, bind_arguments=shard).scalar_one()
+        tasks = db.execute(_DEFAULT_TASK_PAGE, params, bind_arguments=shard).scalars().all()
+        return total_count, tasks
 
+    criteria = []
+    if not include_archived:
+        criteria.append(_NOT_ARCHIVED)
+    if title is not None:
+        criteria.append(Task.title == title)
+    if created_after is not None:
+        criteria.append(Task.created_at >= created_after)
+    if created_before is not None:
+        criteria.append(Task.created_at < created_before)
+    if labels:
+        criteria.append(_label_filter(labels, label_match))
     if filter_query:
-        search_term = f"%{filter_query}%"
-        query = query.filter(
-            Task.title.ilike(search_term) | Task.description.ilike(search_term)
-        )
+        criteria.append(_text_search(filter_query))
 
-    total_count = query.count()
+    total_count = db.execute(
+        _TASK_COUNT.where(*criteria), params, bind_arguments=shard
+    ).scalar_one()
 
-    # Apply sorting
-    if hasattr(Task, sort_by):
-        sort_column = getattr(Task, sort_by)
-        if sort_order.lower() == "desc":
-            query = query.order_by(sort_column.desc())
-        else:
-            query = query.order_by(sort_column.asc())
+    if needs_sort and total_count > settings.TASK_UNINDEXED_SORT_MAX_ROWS:
+        logger.warning(
+            f"Rejected unindexed sort for user {owner_id}: {sort_keys} over {total_count} rows"
+        )
+        raise InvalidTaskQuery(
+            f"Sorting {total_count} tasks by '{sort_keys[0][0]}' within a created_at range "
+            f"is not supported; sort by created_at or narrow the range"
+        )
+    logger.debug(f"Task listing for user {owner_id} served by {index_name}")
 
-    # Apply pagination
-    tasks = query.limit(limit).offset(offset).all()
+    # Apply sorting and pagination
+    query = (
+        _TASK_PAGE.where(*criteria)
+        .order_by(*_order_by(sort_keys))
+        .limit(bindparam("limit"))
+        .offset(bindparam("offset"))
+    )
+    tasks = db.execute(query, params, bind_arguments=shard).scalars().all()
 
     return total_count, tasks
 
+def read_tasks(db: Session, owner_id: int, **filters) -> Tuple[int, List[TaskSnapshot]]:
+    """
+    Read-only get_all_tasks for the API. Concurrent calls with the same
+    owner and exactly the same parameters share one count + select and
+    receive the same immutable snapshots.
+    """
+    def load() -> Tuple[int, List[TaskSnapshot]]:
+        total, tasks = get_all_tasks(db, owner_id=owner_id, **filters)
+        return total, [TaskSnapshot.model_validate(task) for task in tasks]
+
+    if not settings.TASK_READ_COALESCING:
+        return load()
+    key = tuple(sorted(
+        (name, tuple(value) if isinstance(value, list) else value)
+        for name, value in filters.items()
+    ))
+    return _read_flights.do((owner_id, "tasks", key), lambda: _cancellable(db, load))
+
+def read_first_page(
+    db: Session, owner: User, limit: int = 10, offset: int = 0,
+    sort_by: str = "created_at", sort_order: str = "desc", sort: Optional[str] = None, **filters
+) -> Optional[bytes]:
+    """
+    Serves the default listing's first page (see _is_default_listing) as
+    a ready PaginatedResponse body, from the owner's cached page while it
+    is current for the change_seq `owner` was loaded with. Returns None
+    for any other listing, or when the page can't be cached; use
+    read_tasks then.
+    """
+    if (
+        not settings.TASK_FIRST_PAGE_CACHE or offset or limit > settings.TASK_FIRST_PAGE_ROWS
+        or not _is_default_listing(_listing_sort(sort, sort_by, sort_order), **filters)
+        # Other workers' claims would go unnoticed
+        or not task_events.broadcaster.ensure_listening()
+    ):
+        return None
+
+    def load() -> Tuple[int, List[TaskSnapshot], int]:
+        total, tasks = read_tasks(db, owner_id=owner.id, limit=settings.TASK_FIRST_PAGE_ROWS)
+        seq = db.execute(
+            _CHANGE_SEQ, {"owner_id": owner.id}, bind_arguments=shard_router.bind_args(owner.id)
+        ).scalar_one()
+        return total, tasks, seq
+
+    return _first_pages.get(owner.id, owner.change_seq, limit, load)
+
+def get_label_counts(db: Session, owner_id: int) -> List[Tuple[str, int]]:
+    """
+    Counts the owner's live tasks per label, most used first.
+    """
+    if IS_SQLITE:
+        each = func.json_each(Task.labels).table_valued("value")
+        label, source = each.c.value, join(Task, each, true())
+    else:
+        # Task comes first in FROM so the unnest can refer to it (lateral)
+        label, source = func.unnest(Task.labels).column_valued("label"), Task
+    count = func.count().label("count")
+    stmt = (
+        select(label, count)
+        .select_from(source)
+        .where(Task.owner_id == owner_id, _NOT_ARCHIVED)
+        .group_by(label)
+        .order_by(count.desc(), label)
+    )
+    return db.execute(stmt, bind_arguments=shard_router.bind_args(owner_id)).all()
+
 def update_task(
     db: Session, task_id: int, task_in: TaskUpdate, owner_id: int
 ) -> Task | None:
@@ -96,9 +546,13 @@ def update_task(
         setattr(db_task, key, value)
 
     try:
+        db_task.change_seq = _next_change_seq(db, owner_id)
         db.add(db_task)
+        task_events.publish_task_event(db, owner_id, task_id, "updated")
         db.commit()
+        _reads_changed(owner_id)
         db.refresh(db_task)
+        _first_pages.updated(owner_id, db_task)
         logger.info(f"Task updated: {task_id}")
         return db_task
     except Exception as e:
@@ -117,11 +571,229 @@ def delete_task(db: Session, task_id: int, owner_id: int) -> bool:
         return False
 
     try:
+        seq = _next_change_seq(db, owner_id)
+        db.add(TaskTombstone(owner_id=owner_id, change_seq=seq, task_id=task_id))
         db.delete(db_task)
+        task_stats_service.record_task_deleted(db, owner_id, db_task.created_at)
+        task_events.publish_task_event(db, owner_id, task_id, "deleted")
         db.commit()
+        _reads_changed(owner_id)
+        _first_pages.deleted(owner_id, task_id, seq)
         logger.info(f"Task deleted: {task_id}")
         return True
     except Exception as e:
         logger.error(f"Transaction failed for task deletion: {e}")
         db.rollback()
-        raise
\ No newline at end of file
+        raise
+
+def archive_tasks(db: Session, older_than: datetime, batch_size: int = 1000) -> int:
+    """
+    Moves tasks created before `older_than` to the cold partition.
+    Works in small committed batches so row locks stay short-lived.
+    With sharding enabled, run it once per shard (see iter_shard_sessions).
+    Returns the number of archived tasks.
+    """
+    logger.info(f"Archiving tasks created before {older_than.isoformat()}")
+    archived_total = 0
+
+    while True:
+        candidates = db.execute(
+            select(Task.id, Task.owner_id)
+            .where(Task.archived == false(), Task.created_at < older_than)
+            .order_by(Task.created_at)
+            .limit(batch_size)
+        ).all()
+        by_owner = defaultdict(list)
+        for task_id, owner_id in candidates:
+            by_owner[owner_id].append(task_id)
+
+        try:
+            # Archiving is a change for delta sync. Owners are locked
+            # (by bumping their sequence) before their tasks, in the same
+            # order as the request write paths, so the two can't deadlock.
+            for owner_id in sorted(by_owner, key=lambda owner: (owner is None, owner or 0)):
+                owner_task_ids = by_owner[owner_id]
+                values = {"archived": True}
+                if owner_id is not None:
+                    # One sequence number per task, as delta sync pages
+                    # can end between any two changes
+                    last_seq = _next_change_seq(db, owner_id, len(owner_task_ids))
+                    first_seq = last_seq - len(owner_task_ids) + 1
+                    values["change_seq"] = case(
+                        {task_id: first_seq + i for i, task_id in enumerate(owner_task_ids)},
+                        value=Task.id,
+                    )
+                task_ids = db.execute(
+                    update(Task)
+                    .where(Task.archived == false(), Task.id.in_(owner_task_ids))
+                    .values(**values)
+                    .returning(Task.id)
+                    .execution_options(synchronize_session=False)
+                ).scalars().all()
+                for task_id in task_ids:
+                    task_events.publish_task_event(db, owner_id, task_id, "archived")
+                archived_total += len(task_ids)
+            db.commit()
+            for owner_id in by_owner:
+                _reads_changed(owner_id)
+                _first_pages.invalidate(owner_id)
+        except Exception as e:
+            logger.error(f"Transaction failed for task archival: {e}")
+            db.rollback()
+            raise
+
+        if len(candidates) < batch_size:
+            break
+
+    logger.info(f"Archived {archived_total} tasks")
+    return archived_total
+
+def claim_tasks(
+    db: Session, owner_id: int, worker_id: str, n: int = 1, lease_seconds: int = 300
+) -> List[Task]:
+    """
+    Atomically leases up to `n` of the owner's oldest claimable tasks
+    to a worker. Candidate rows are locked with FOR UPDATE SKIP LOCKED,
+    so concurrent workers each get different tasks without waiting on
+    one another. Returns the claimed tasks, oldest first.
+    """
+    candidates = (
+        select(Task.id)
+        .where(Task.owner_id == owner_id, _NOT_ARCHIVED, _CLAIMABLE)
+        # id breaks ties between tasks created in the same transaction
+        .order_by(Task.created_at, Task.id)
+        .limit(n)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    stmt = (
+        update(Task)
+        .where(Task.id.in_(candidates), _NOT_ARCHIVED)
+        .values(
+            status="claimed",
+            claimed_by=worker_id,
+            lease_expires_at=now_plus(lease_seconds),
+        )
+        .returning(Task)
+        .execution_options(synchronize_session=False, populate_existing=True)
+    )
+    try:
+        tasks = db.execute(stmt, bind_arguments=shard_router.bind_args(owner_id)).scalars().all()
+        for task in tasks:
+            task_events.publish_task_event(db, owner_id, task.id, "claimed")
+        db.commit()
+        _reads_changed(owner_id)
+        _first_pages.invalidate(owner_id)
+    except Exception as e:
+        logger.error(f"Transaction failed for task claim: {e}")
+        db.rollback()
+        raise
+
+    logger.info(f"Worker '{worker_id}' claimed {len(tasks)} tasks for user {owner_id}")
+    return sorted(tasks, key=lambda task: (task.created_at, task.id))
+
+def _update_leased_task(
+    db: Session, task_id: int, owner_id: int, worker_id: str, action: str,
+    track_change: bool = False, **values
+) -> Task | None:
+    """
+    Applies `values` to a task only if `worker_id` still holds it.
+    Returns None if the task doesn't exist; raises TaskLeaseLost if
+    it isn't claimed by this worker.
+    """
+    stmt = (
+        update(Task)
+        .where(
+            Task.id == task_id,
+            Task.owner_id == owner_id,
+            _NOT_ARCHIVED,
+            Task.status == "claimed",
+            Task.claimed_by == worker_id,
+        )
+        .values(**values)
+        .returning(Task)
+        .execution_options(synchronize_session=False, populate_existing=True)
+    )
+    try:
+        if track_change:
+            stmt = stmt.values(change_seq=_next_change_seq(db, owner_id))
+        db_task = db.execute(
+            stmt, bind_arguments=shard_router.bind_args(owner_id)
+        ).scalars().first()
+        if db_task is not None:
+            task_events.publish_task_event(db, owner_id, task_id, action)
+        db.commit()
+        _reads_changed(owner_id)
+        _first_pages.invalidate(owner_id)
+    except Exception as e:
+        logger.error(f"Transaction failed for task {action}: {e}")
+        db.rollback()
+        raise
+
+    if db_task is None:
+        if get_task_by_id(db, task_id=task_id, owner_id=owner_id) is None:
+            return None
+        raise TaskLeaseLost(f"Task {task_id} is not claimed by worker '{worker_id}'")
+    return db_task
+
+def renew_task_lease(
+    db: Session, task_id: int, owner_id: int, worker_id: str, lease_seconds: int = 300
+) -> Task | None:
+    """
+    Extends a worker's lease on a claimed task. A lapsed lease can still
+    be renewed as long as no other worker has claimed the task since.
+    """
+    return _update_leased_task(
+        db, task_id, owner_id, worker_id, "lease_renewed",
+        lease_expires_at=now_plus(lease_seconds),
+    )
+
+def complete_task(db: Session, task_id: int, owner_id: int, worker_id: str) -> Task | None:
+    """
+    Marks a claimed task as done and releases its lease.
+    Unlike claims and lease renewals (transient worker state, kept off
+    the owner's change sequence so claims don't serialize on the user
+    row), completion is reported to delta-sync clients.
+    """
+    return _update_leased_task(
+        db, task_id, owner_id, worker_id, "completed", track_change=True,
+        status="done", lease_expires_at=None,
+    )
+
+def get_task_changes(
+    db: Session, owner_id: int, since: int = 0, limit: int = 100
+) -> Tuple[List[Task], List[int], int, bool]:
+    """
+    Returns the owner's changes after change sequence `since`, oldest
+    first: (changed tasks, deleted task IDs, next since, has more).
+    Both reads are range scans on (owner_id, change_seq), so the cost
+    depends on the number of changes, not on the size of the account.
+    Archived tasks are included (with archived=true).
+    """
+    shard = shard_router.bind_args(owner_id)
+    # limit + 1 from each source is enough to take the first `limit` overall
+    tasks = db.execute(
+        select(Task).options(joinedload(Task.owner))
+        .where(Task.owner_id == owner_id, Task.change_seq > since)
+        .order_by(Task.change_seq)
+        .limit(limit + 1),
+        bind_arguments=shard
+    ).scalars().all()
+    tombstones = db.execute(
+        select(TaskTombstone.change_seq, TaskTombstone.task_id)
+        .where(TaskTombstone.owner_id == owner_id, TaskTombstone.change_seq > since)
+        .order_by(TaskTombstone.change_seq)
+        .limit(limit + 1),
+        bind_arguments=shard
+    ).all()
+
+    merged = sorted(
+        [(task.change_seq, task, None) for task in tasks]
+        + [(seq, None, task_id) for seq, task_id in tombstones],
+        key=lambda change: change[0],
+    )
+    page = merged[:limit]
+    changed = [task for _, task, _ in page if task is not None]
+    deleted = [task_id for _, _, task_id in page if task_id is not None]
+    next_since = page[-1][0] if page else since
+    return changed, deleted, next_since, len(merged) > limit
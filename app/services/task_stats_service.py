@@ -0,0 +1,116 @@
+from datetime import date, datetime, timezone
+from typing import List, Optional, Tuple
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.orm import Session
+from loguru import logger
+
+from app.db.dialect import upsert, utc_date
+from app.db.session import shard_router
+from app.models.task import Task
+from app.models.task_stats import TaskDailyStat
+
+def _utc_day(created_at: Optional[datetime]) -> date:
+    """
+    Returns the UTC calendar day a task was created on.
+    Naive timestamps are treated as UTC.
+    """
+    if created_at is None:
+        return datetime.now(timezone.utc).date()
+    if created_at.tzinfo is None:
+        return created_at.date()
+    return created_at.astimezone(timezone.utc).date()
+
+def record_task_created(
+    db: Session, owner_id: int, created_at: Optional[datetime], count: int = 1
+) -> None:
+    """
+    Increments the rollup row for the task's creation day by `count`.
+    Runs inside the caller's transaction; the caller commits.
+    """
+    stmt = upsert(TaskDailyStat).values(
+        owner_id=owner_id, day=_utc_day(created_at), task_count=count
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[TaskDailyStat.owner_id, TaskDailyStat.day],
+        set_={"task_count": TaskDailyStat.task_count + count},
+    )
+    db.execute(stmt, bind_arguments=shard_router.bind_args(owner_id))
+
+def record_task_deleted(db: Session, owner_id: int, created_at: Optional[datetime]) -> None:
+    """
+    Decrements the rollup row for the task's creation day.
+    Runs inside the caller's transaction; the caller commits.
+    """
+    db.execute(
+        update(TaskDailyStat)
+        .where(
+            TaskDailyStat.owner_id == owner_id,
+            TaskDailyStat.day == _utc_day(created_at),
+        )
+        .values(task_count=TaskDailyStat.task_count - 1),
+        bind_arguments=shard_router.bind_args(owner_id)
+    )
+
+def get_task_stats(
+    db: Session,
+    owner_id: int,
+    start: Optional[date] = None,
+    end: Optional[date] = None
+) -> Tuple[int, List[TaskDailyStat]]:
+    """
+    Returns the owner's total task count and the per-day creation
+    counts, optionally limited to the [start, end] day range.
+    Cost is proportional to the number of days, not tasks.
+    """
+    shard = shard_router.bind_args(owner_id)
+    total = db.execute(
+        select(func.coalesce(func.sum(TaskDailyStat.task_count), 0))
+        .where(TaskDailyStat.owner_id == owner_id),
+        bind_arguments=shard
+    ).scalar_one()
+
+    query = select(TaskDailyStat).where(
+        TaskDailyStat.owner_id == owner_id, TaskDailyStat.task_count > 0
+    )
+    if start is not None:
+        query = query.where(TaskDailyStat.day >= start)
+    if end is not None:
+        query = query.where(TaskDailyStat.day <= end)
+
+    days = db.execute(query.order_by(TaskDailyStat.day), bind_arguments=shard).scalars().all()
+    return int(total), days
+
+def rebuild_task_stats(db: Session, owner_id: Optional[int] = None) -> int:
+    """
+    Recomputes the rollup from the tasks table, for one owner or for
+    everybody. Used for backfills and to repair drift.
+    With sharding enabled, run it once per shard (see iter_shard_sessions).
+    Returns the number of rollup rows written.
+    """
+    logger.info(f"Rebuilding task stats for owner {owner_id if owner_id is not None else 'ALL'}")
+    day = utc_date(Task.created_at)
+    source = (
+        select(Task.owner_id, day.label("day"), func.count().label("task_count"))
+        .where(Task.owner_id.is_not(None))
+        .group_by(Task.owner_id, day)
+    )
+    clear = delete(TaskDailyStat)
+    if owner_id is not None:
+        source = source.where(Task.owner_id == owner_id)
+        clear = clear.where(TaskDailyStat.owner_id == owner_id)
+
+    try:
+        db.execute(clear)
+        result = db.execute(
+            insert(TaskDailyStat).from_select(
+                ["owner_id", "day", "task_count"], source
+            )
+        )
+        db.commit()
+    except Exception as e:
+        logger.error(f"Transaction failed for task stats rebuild: {e}")
+        db.rollback()
+        raise
+
+    logger.info(f"Task stats rebuilt: {result.rowcount} rows")
+    return result.rowcount
@@ -0,0 +1,126 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+from sqlalchemy import delete, func, select
+from loguru import logger
+
+from app.core.config import settings
+from app.db.dialect import as_utc, upsert
+from app.db.session import engine
+from app.models.revoked_token import RevokedToken
+
+# Re-read revocations this far back on every sync, so rows whose
+# transaction committed after the previous sync aren't missed
+_SYNC_OVERLAP = timedelta(seconds=60)
+
+class RevocationCache:
+    """
+    Per-worker set of revoked token IDs (jti), so checking a token is a
+    hash lookup instead of a database round trip.
+
+    The revoked_tokens table is the durable record. Each worker loads it
+    on first use and then picks up new rows every
+    TOKEN_REVOCATION_REFRESH_SECONDS in a background thread; revocations
+    made by this worker apply immediately. Entries are dropped once the
+    token has expired anyway.
+    """
+    def __init__(self, refresh_seconds: float):
+        self.refresh_seconds = refresh_seconds
+        self._revoked: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._synced_until: Optional[datetime] = None
+        self._last_purge = 0.0
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def is_revoked(self, jti: str) -> bool:
+        if self._thread is None:
+            self._start()
+        return jti in self._revoked
+
+    def add(self, jti: str, expires_at: float) -> None:
+        with self._lock:
+            self._revoked[jti] = expires_at
+
+    def __len__(self) -> int:
+        return len(self._revoked)
+
+    def sync(self) -> None:
+        """
+        Loads revocations recorded since the last sync and prunes
+        expired entries.
+        """
+        with engine.connect() as conn:
+            now = conn.execute(select(func.now())).scalar_one()
+            query = select(RevokedToken.jti, RevokedToken.expires_at).where(
+                RevokedToken.expires_at > now
+            )
+            if self._synced_until is not None:
+                query = query.where(RevokedToken.revoked_at > self._synced_until - _SYNC_OVERLAP)
+            rows = conn.execute(query).all()
+
+        cutoff = time.time()
+        with self._lock:
+            revoked = {jti: exp for jti, exp in self._revoked.items() if exp > cutoff}
+            revoked.update((jti, as_utc(expires_at).timestamp()) for jti, expires_at in rows)
+            # Swap in a new dict so lock-free readers never see it mid-update
+            self._revoked = revoked
+        self._synced_until = now
+
+    def purge(self) -> int:
+        """
+        Deletes revocations of tokens that have expired.
+        """
+        with engine.begin() as conn:
+            result = conn.execute(delete(RevokedToken).where(RevokedToken.expires_at < func.now()))
+        if result.rowcount:
+            logger.info(f"Purged {result.rowcount} expired token revocations")
+        return result.rowcount
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is not None:
+                return
+        # The first check in a worker waits for a full load
+        self.sync()
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._sync_forever, name="token-revocation-sync", daemon=True
+            )
+            self._thread.start()
+
+    def _sync_forever(self) -> None:
+        while not self._stop.wait(self.refresh_seconds):
+            try:
+                self.sync()
+                if time.monotonic() - self._last_purge > settings.TOKEN_REVOCATION_PURGE_SECONDS:
+                    self._last_purge = time.monotonic()
+                    self.purge()
+            except Exception as e:
+                logger.error(f"Token revocation sync failed: {e}")
+
+revocations = RevocationCache(settings.TOKEN_REVOCATION_REFRESH_SECONDS)
+
+def revoke_token(jti: str, user_id: int, expires_at: datetime) -> None:
+    """
+    Durably revokes one access token. Takes effect immediately in this
+    worker and within TOKEN_REVOCATION_REFRESH_SECONDS in the others.
+    """
+    with engine.begin() as conn:
+        conn.execute(
+            upsert(RevokedToken)
+            .values(jti=jti, user_id=user_id, expires_at=expires_at)
+            .on_conflict_do_nothing(index_elements=[RevokedToken.jti])
+        )
+    revocations.add(jti, as_utc(expires_at).timestamp())
+    logger.info(f"Revoked token {jti} of user {user_id}")
@@ -1,14 +1,51 @@
+from datetime import datetime, timezone
+from sqlalchemy import select, bindparam, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
+from app.db.session import shard_router
 from app.models.user import User
 from app.schemas.user import UserCreate
 from app.services.security import get_password_hash
 from loguru import logger
 
+# Built once; runs on every authenticated request via get_current_user
+_USER_BY_EMAIL = select(User).where(User.email == bindparam("email")).limit(1)
+
 def get_user_by_email(db: Session, email: str) -> User | None:
     """
     Retrieves a user from the database by their email.
+    With sharding enabled the directory says which shard to read; a miss
+    on a cached placement (the user was moved) re-reads the directory once.
+    """
+    if not shard_router.enabled:
+        return db.execute(_USER_BY_EMAIL, {"email": email}).scalars().first()
+
+    for refresh in (False, True):
+        shard_id = shard_router.shard_for_email(email, refresh=refresh)
+        if shard_id is None:
+            return None
+        user = db.execute(
+            _USER_BY_EMAIL, {"email": email}, bind_arguments={"shard_id": shard_id}
+        ).scalars().first()
+        if user is not None:
+            return user
+    return None
+
+def get_user_by_id(db: Session, user_id: int) -> User | None:
+    """
+    Retrieves a user from the database by their ID.
     """
-    return db.query(User).filter(User.email == email).first()
+    return db.get(User, user_id)
+
+def revoke_all_tokens(db: Session, user: User) -> None:
+    """
+    Invalidates every token issued to the user so far. Checked against
+    the user row get_current_user loads anyway, so it costs no extra query.
+    """
+    user.tokens_valid_after = datetime.now(timezone.utc)
+    db.add(user)
+    db.commit()
+    logger.info(f"Revoked all tokens of user {user.id}")
 
 def create_user(db: Session, user_in: UserCreate) -> User:
     """
@@ -29,9 +66,23 @@ def create_user(db: Session, user_in: UserCreate) -> User:
         email=user_in.email,
         hashed_password=hashed_password
     )
-    
-    db.add(db_user)
-    db.commit() # Commit the transaction
+
+    if shard_router.enabled:
+        # The directory allocates the ID and enforces global email uniqueness
+        try:
+            db_user.id, _ = shard_router.register_user(user_in.email)
+        except IntegrityError:
+            logger.warning(f"User already exists: {user_in.email}")
+            return None
+
+    try:
+        db.add(db_user)
+        db.commit() # Commit the transaction
+    except Exception:
+        db.rollback()
+        if shard_router.enabled:
+            shard_router.unregister_user(db_user.id, user_in.email)
+        raise
     db.refresh(db_user) # Refresh to get the ID from the DB
     
     logger.info(f"Successfully created user with ID: {db_user.id}")
@@ -0,0 +1,173 @@
+import asyncio
+import json
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional
+from jose import jwt, JWTError
+from loguru import logger
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+class AdmissionRejected(Exception):
+    """
+    Raised when a request can't be admitted in time (or at all).
+    """
+    pass
+
+class Lane:
+    """
+    A concurrency limit with a bounded, per-owner fair wait queue.
+    Waiting owners are served round-robin, so one account with many
+    queued requests can't starve the others. Used from one event loop.
+    """
+    def __init__(self, name: str, limit: int, queue_size: int, queue_per_owner: int):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.queue_per_owner = queue_per_owner
+        self.active = 0
+        self.queued = 0
+        # owner -> that owner's waiters, in round-robin order
+        self._waiting: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+        metrics.register_gauge(f"admission.{name}.active", lambda: self.active)
+        metrics.register_gauge(f"admission.{name}.queued", lambda: self.queued)
+
+    async def acquire(self, owner: str, timeout: float) -> None:
+        if self.active < self.limit and self.queued == 0:
+            self.active += 1
+            return
+        waiters = self._waiting.get(owner)
+        if self.queued >= self.queue_size or (waiters is not None and len(waiters) >= self.queue_per_owner):
+            metrics.inc(f"admission.{self.name}.rejected")
+            raise AdmissionRejected(f"Queue full for lane '{self.name}'")
+
+        future = asyncio.get_running_loop().create_future()
+        if waiters is None:
+            waiters = self._waiting[owner] = deque()
+        waiters.append(future)
+        self.queued += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            if future.done():
+                # Admitted at the last moment
+                return
+            future.cancel()
+            self._remove(owner, future)
+            metrics.inc(f"admission.{self.name}.timed_out")
+            raise AdmissionRejected(f"Timed out waiting in lane '{self.name}'")
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()
+            else:
+                future.cancel()
+                self._remove(owner, future)
+            raise
+
+    def release(self) -> None:
+        self.active -= 1
+        while self.active < self.limit and self._waiting:
+            owner, waiters = self._waiting.popitem(last=False)
+            future = waiters.popleft()
+            self.queued -= 1
+            if waiters:
+                # Owner goes to the back of the round-robin
+                self._waiting[owner] = waiters
+            if not future.cancelled():
+                self.active += 1
+                future.set_result(None)
+
+    def _remove(self, owner: str, future: asyncio.Future) -> None:
+        waiters = self._waiting.get(owner)
+        if waiters is not None and future in waiters:
+            waiters.remove(future)
+            self.queued -= 1
+            if not waiters:
+                del self._waiting[owner]
+
+def _owner_key(scope) -> str:
+    """
+    Who a request is queued for: the subject of a correctly signed
+    token, else the client address. The signature must be checked, or
+    forged tokens could fill another account's queue share or dodge the
+    per-owner bound with made-up subjects. Revocation is left to
+    authentication later on.
+    """
+    headers = dict(scope["headers"])
+    scheme, _, token = headers.get(b"authorization", b"").decode().partition(" ")
+    if scheme.lower() == "bearer" and token:
+        try:
+            subject = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]).get("sub")
+            if subject:
+                return f"user:{subject}"
+        except JWTError:
+            pass
+    forwarded = headers.get(b"x-forwarded-for")
+    if forwarded:
+        return f"ip:{forwarded.decode().split(',')[0].strip()}"
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+class AdmissionControlMiddleware:
+    """
+    Load shedding in front of the app. Each request is admitted into
+    a lane (the longest matching ADMISSION_ROUTE_LIMITS prefix, else the
+    default lane sized to the worker's DB pool). Requests that can't be
+    admitted within ADMISSION_QUEUE_TIMEOUT_SECONDS, or find the queue
+    full, get an immediate 503 with Retry-After instead of piling up in
+    the threadpool and the connection pool.
+    """
+    def __init__(self, app):
+        self.app = app
+        default_limit = settings.ADMISSION_MAX_CONCURRENCY or (
+            settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW
+        )
+        self.default_lane = self._lane("default", default_limit)
+        self.route_lanes: List = sorted(
+            ((prefix, self._lane(prefix.strip("/").replace("/", "."), limit))
+             for prefix, limit in settings.ADMISSION_ROUTE_LIMITS.items()),
+            key=lambda item: len(item[0]), reverse=True,
+        )
+
+    @staticmethod
+    def _lane(name: str, limit: int) -> Lane:
+        return Lane(name, limit, settings.ADMISSION_QUEUE_SIZE, settings.ADMISSION_QUEUE_PER_OWNER)
+
+    def lane_for(self, path: str) -> Optional[Lane]:
+        if any(path == exempt or path.startswith(exempt + "/") for exempt in settings.ADMISSION_EXEMPT_PATHS):
+            return None
+        for prefix, lane in self.route_lanes:
+            if path.startswith(prefix):
+                return lane
+        return self.default_lane
+
+    async def __call__(self, scope, receive, send):
+        lane = self.lane_for(scope["path"]) if scope["type"] == "http" else None
+        if lane is None:
+            return await self.app(scope, receive, send)
+
+        try:
+            await lane.acquire(_owner_key(scope), settings.ADMISSION_QUEUE_TIMEOUT_SECONDS)
+        except AdmissionRejected as e:
+            logger.warning(f"Shedding {scope['method']} {scope['path']}: {e}")
+            return await self._reject(send)
+
+        metrics.inc(f"admission.{lane.name}.admitted")
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            lane.release()
+
+    @staticmethod
+    async def _reject(send) -> None:
+        body = json.dumps({"detail": "Server busy, please retry"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(settings.ADMISSION_RETRY_AFTER_SECONDS).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,130 @@
+import asyncio
+import threading
+from typing import List
+from fastapi import Request, status
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import OperationalError, TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import Session
+from loguru import logger
+
+from app.core.metrics import metrics
+from app.db.session import QueryCancelled, cancel_session_queries
+
+# SQLSTATE query_canceled (statement_timeout or a cancel request)
+_QUERY_CANCELED = "57014"
+
+class QueryCanceller:
+    """
+    Collects the sessions opened for one request (including batch
+    sub-requests) so their running queries can be cancelled together.
+    """
+    def __init__(self):
+        self._sessions: List[Session] = []
+        self._lock = threading.Lock()
+
+    def register(self, db: Session) -> None:
+        with self._lock:
+            self._sessions.append(db)
+
+    def cancel(self) -> None:
+        with self._lock:
+            sessions = list(self._sessions)
+        for db in sessions:
+            cancel_session_queries(db)
+
+class CancelOnDisconnectMiddleware:
+    """
+    Cancels a request's in-flight queries when its client disconnects,
+    so abandoned requests stop holding pooled connections.
+
+    It is the only reader of the ASGI receive channel: request body
+    messages are handed on to the app, and a disconnect triggers the
+    cancellation.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        canceller = QueryCanceller()
+        scope.setdefault("state", {})["query_canceller"] = canceller
+        messages: asyncio.Queue = asyncio.Queue()
+        disconnected = False
+        response_complete = False
+
+        async def watch():
+            nonlocal disconnected
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    disconnected = True
+                    await messages.put(message)
+                    # Servers also report a disconnect once the response
+                    # has been sent; nothing is abandoned then
+                    if response_complete:
+                        return
+                    metrics.inc("db.cancelled_on_disconnect")
+                    logger.info(f"Client disconnected; cancelling queries for {scope['path']}")
+                    # psycopg's cancel() blocks on a network round trip
+                    await asyncio.get_running_loop().run_in_executor(None, canceller.cancel)
+                    return
+                await messages.put(message)
+
+        async def app_receive():
+            if disconnected and messages.empty():
+                return {"type": "http.disconnect"}
+            return await messages.get()
+
+        async def app_send(message):
+            nonlocal response_complete
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                response_complete = True
+            await send(message)
+
+        watcher = asyncio.create_task(watch())
+        try:
+            await self.app(scope, app_receive, app_send)
+        finally:
+            watcher.cancel()
+
+def _sqlstate(error: OperationalError):
+    return getattr(error.orig, "pgcode", None) or getattr(error.orig, "sqlstate", None)
+
+async def db_operational_error_handler(request: Request, exc: OperationalError) -> JSONResponse:
+    """
+    504 for statements cut off by statement_timeout, 503 when the
+    database can't be reached.
+    """
+    if _sqlstate(exc) == _QUERY_CANCELED:
+        metrics.inc("db.statement_timeouts")
+        logger.warning(f"Statement timeout on {request.method} {request.url.path}")
+        return JSONResponse(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            content={"detail": "The request took too long and was cancelled"},
+        )
+    logger.error(f"Database error on {request.method} {request.url.path}: {exc.orig}")
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Database unavailable"},
+        headers={"Retry-After": "1"},
+    )
+
+async def db_pool_timeout_handler(request: Request, exc: PoolTimeoutError) -> JSONResponse:
+    """
+    503 when no pooled connection freed up within DB_POOL_TIMEOUT_SECONDS.
+    """
+    metrics.inc("db.pool_timeouts")
+    logger.warning(f"Connection pool exhausted on {request.method} {request.url.path}")
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Server busy, please retry"},
+        headers={"Retry-After": "1"},
+    )
+
+async def query_cancelled_handler(request: Request, exc: QueryCancelled) -> JSONResponse:
+    """
+    The client is gone; the status only shows up in logs (nginx's 499).
+    """
+    return JSONResponse(status_code=499, content={"detail": "Client closed request"})
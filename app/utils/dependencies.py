@@ -1,10 +1,15 @@
+import secrets
+from typing import Optional
 from fastapi import Request, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from loguru import logger
 
+from app.db.dialect import as_utc
 from app.db.session import get_db
+from app.core.config import settings
 from app.services import user_service, security
+from app.services.token_revocation import revocations
 from app.models.user import User
 from app.schemas.token import TokenData
 
@@ -22,29 +27,81 @@ def get_rate_limit_key(request: Request) -> str:
     
     return request.client.host
 
-def get_current_user(
-    db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)
-) -> User:
+def authenticate_token(db: Session, token: str) -> Optional[User]:
     """
-    Dependency to get the current authenticated user.
-    - Decodes the JWT token.
-    - Fetches the user from the database.
-    - Raises 401 exception if invalid.
+    The user a bearer token authenticates, or None if the token is
+    invalid, revoked (logout) or issued before the user's tokens were
+    revoked.
     """
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    
     token_data = security.decode_access_token(token)
     if token_data is None:
         logger.warning("Token decoding failed or token is invalid.")
-        raise credentials_exception
+        return None
+
+    if token_data.jti is not None and revocations.is_revoked(token_data.jti):
+        logger.warning(f"Rejected revoked token for {token_data.email}")
+        return None
     
     user = user_service.get_user_by_email(db, email=token_data.email)
     if user is None:
         logger.warning(f"User not found for email in token: {token_data.email}")
-        raise credentials_exception
-        
-    return user
\ No newline at end of file
+        return None
+
+    if user.tokens_valid_after is not None and (
+        token_data.issued_at is None
+        or token_data.issued_at < as_utc(user.tokens_valid_after).timestamp()
+    ):
+        logger.warning(f"Rejected token issued before revoke-all for {token_data.email}")
+        return None
+
+    return user
+
+def get_current_user(
+    request: Request,
+    db: Session = Depends(get_db),
+    token: str = Depends(oauth2_scheme)
+) -> User:
+    """
+    Dependency to get the current authenticated user.
+    - Decodes the JWT token.
+    - Fetches the user from the database.
+    - Raises 401 exception if invalid, revoked (logout) or issued
+      before the user's tokens were revoked.
+    - Sub-requests of a batch reuse the user the batch authenticated.
+    """
+    batch_user = getattr(request.state, "batch_user", None)
+    if batch_user is not None:
+        return batch_user
+
+    user = authenticate_token(db, token)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user
+
+def get_current_admin(current_user: User = Depends(get_current_user)) -> User:
+    """
+    Dependency for operator endpoints: the user must be in ADMIN_EMAILS.
+    """
+    if current_user.email not in settings.ADMIN_EMAILS:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin privileges required",
+        )
+    return current_user
+
+def require_metrics_access(
+    request: Request,
+    db: Session = Depends(get_db),
+    token: str = Depends(oauth2_scheme)
+) -> None:
+    """
+    Dependency for GET /metrics: the bearer token must be METRICS_TOKEN
+    (for scrapers) or an admin's access token.
+    """
+    if settings.METRICS_TOKEN and secrets.compare_digest(token.encode(), settings.METRICS_TOKEN.encode()):
+        return
+    get_current_admin(get_current_user(request, db, token))
@@ -0,0 +1,169 @@
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Optional
+from loguru import logger
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.db.session import SessionLocal
+from app.utils.dependencies import authenticate_token
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_ID_HEADER = b"x-profile-id"
+
+# Leaf frames of threads that are parked, not working
+_IDLE_LEAVES = {
+    ("threading.py", "wait"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+}
+
+class StackSampler:
+    """
+    Wall-clock sampling profiler. A background thread snapshots the
+    stacks of every busy thread in the process and counts them in
+    collapsed-stack format ("frame;frame;frame count"), which
+    flamegraph.pl and speedscope read directly.
+
+    Async handlers and the threadpool running sync endpoints and
+    dependencies are both covered; requests running concurrently in
+    the same worker show up in the profile too.
+    """
+    def __init__(self, interval: float, max_seconds: float):
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        own_ident = threading.get_ident()
+        names = {}
+        deadline = time.monotonic() + self.max_seconds
+        while not self._stop.wait(self.interval) and time.monotonic() < deadline:
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                leaf = (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name)
+                if leaf in _IDLE_LEAVES:
+                    continue
+                if ident not in names:
+                    names = {thread.ident: thread.name for thread in threading.enumerate()}
+                self.stacks[self._collapse(names.get(ident, str(ident)), frame)] += 1
+            self.samples += 1
+
+    @staticmethod
+    def _collapse(thread_name: str, frame) -> str:
+        frames = []
+        while frame is not None:
+            code = frame.f_code
+            frames.append(
+                f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+            )
+            frame = frame.f_back
+        frames.append(thread_name)
+        return ";".join(reversed(frames))
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+def _write_profile(profile_id: str, method: str, path: str, sampler: StackSampler) -> None:
+    """
+    Writes one profile and prunes the directory to PROFILE_MAX_FILES.
+    """
+    os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+    filename = os.path.join(settings.PROFILE_DIR, f"{profile_id}.collapsed")
+    with open(filename, "w") as f:
+        f.write(f"# {method} {path} samples={sampler.samples} interval={sampler.interval}s\n")
+        f.write(sampler.collapsed())
+
+    profiles = sorted(
+        (os.path.join(settings.PROFILE_DIR, name) for name in os.listdir(settings.PROFILE_DIR)
+         if name.endswith(".collapsed")),
+        key=os.path.getmtime,
+    )
+    for old in profiles[:-settings.PROFILE_MAX_FILES]:
+        os.remove(old)
+    metrics.inc("profiles.written")
+    logger.info(f"Wrote request profile {filename} for {method} {path}")
+
+def _is_admin(token: str) -> bool:
+    """
+    True if the token authenticates an ADMIN_EMAILS account, checked as
+    get_current_user checks it (revoked and revoked-all tokens fail).
+    """
+    if not settings.ADMIN_EMAILS:
+        return False
+    with SessionLocal() as db:
+        user = authenticate_token(db, token)
+        return user is not None and user.email in settings.ADMIN_EMAILS
+
+def _wants_profile(headers: dict) -> bool:
+    """
+    Blocks on the database when the X-Profile header is present.
+    """
+    if PROFILE_HEADER in headers:
+        authorization = headers.get(b"authorization", b"").decode()
+        scheme, _, token = authorization.partition(" ")
+        if scheme.lower() == "bearer" and _is_admin(token):
+            return True
+        logger.warning("Ignoring X-Profile header from a non-admin caller")
+    return settings.PROFILE_SAMPLE_RATE > 0 and random.random() < settings.PROFILE_SAMPLE_RATE
+
+class ProfilingMiddleware:
+    """
+    Profiles requests that ask for it (admin `X-Profile` header) or are
+    picked by PROFILE_SAMPLE_RATE. The profile ID is returned in the
+    `X-Profile-Id` response header. Requests that aren't profiled only
+    pay for one header lookup; one request is profiled at a time per worker.
+    """
+    def __init__(self, app):
+        self.app = app
+        self._busy = threading.Lock()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        headers = dict(scope["headers"])
+        if PROFILE_HEADER in headers:
+            wanted = await run_in_threadpool(_wants_profile, headers)
+        else:
+            wanted = _wants_profile(headers)
+        if not wanted or not self._busy.acquire(blocking=False):
+            return await self.app(scope, receive, send)
+
+        profile_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [
+                    *message.get("headers", []), (PROFILE_ID_HEADER, profile_id.encode())
+                ]}
+            await send(message)
+
+        sampler = StackSampler(settings.PROFILE_INTERVAL_SECONDS, settings.PROFILE_MAX_SECONDS)
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            sampler.stop()
+            self._busy.release()
+            try:
+                # File writes and pruning stay off the event loop
+                await run_in_threadpool(_write_profile, profile_id, scope["method"], scope["path"], sampler)
+            except OSError as e:
+                logger.error(f"Could not write request profile {profile_id}: {e}")
@@ -0,0 +1,114 @@
+"""
+Measures how throughput scales with the number of Gunicorn workers.
+
+Starts the production server (gunicorn.conf.py) once per worker count,
+drives it with a multi-process closed-loop load generator and prints
+requests/second and latency percentiles for each run.
+
+Usage:
+    python benchmarks/serving_scaling.py --workers 1 2 4 8 --path /health
+    python benchmarks/serving_scaling.py --path /api/v1/tasks/ \\
+        --header "Authorization: Bearer $TOKEN"
+
+Run it on a machine with at least as many free cores as the largest
+worker count plus the load generator's processes; otherwise the numbers
+measure CPU contention, not scaling.
+"""
+import argparse
+import multiprocessing
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _client(url: str, headers: dict, duration: float, results) -> None:
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+    with httpx.Client(headers=headers, timeout=10) as client:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                response = client.get(url)
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+    results.put((latencies, errors))
+
+def _wait_until_up(base_url: str, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{base_url}/health", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("Server did not become healthy in time")
+
+def run(workers: int, args) -> dict:
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers), BIND=f"127.0.0.1:{args.port}")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app.main:app"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        _wait_until_up(base_url)
+        headers = dict(h.split(": ", 1) for h in args.header)
+        results = multiprocessing.Queue()
+        clients = [
+            multiprocessing.Process(
+                target=_client, args=(base_url + args.path, headers, args.duration, results)
+            )
+            for _ in range(args.concurrency)
+        ]
+        for client in clients:
+            client.start()
+        collected = [results.get() for _ in clients]
+        for client in clients:
+            client.join()
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=60)
+
+    latencies = sorted(l for batch, _ in collected for l in batch)
+    errors = sum(e for _, e in collected)
+    return {
+        "workers": workers,
+        "rps": len(latencies) / args.duration,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "errors": errors,
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--path", default="/health")
+    parser.add_argument("--header", action="append", default=[], help="'Name: value'")
+    parser.add_argument("--concurrency", type=int, default=16, help="Load generator processes")
+    parser.add_argument("--duration", type=float, default=15.0, help="Seconds per run")
+    parser.add_argument("--port", type=int, default=8099)
+    args = parser.parse_args()
+
+    print(f"{'workers':>8} {'req/s':>10} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    baseline = None
+    for workers in args.workers:
+        result = run(workers, args)
+        baseline = baseline or result["rps"]
+        print(
+            f"{result['workers']:>8} {result['rps']:>10.1f} {result['p50_ms']:>8.2f} "
+            f"{result['p99_ms']:>8.2f} {result['errors']:>7}  (x{result['rps'] / baseline:.2f})"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Compares the Python-side cost of the service read queries built per call
+with db.query(...) chains against the prebuilt, cached statements now
+used by task_service / user_service.
+
+Runs against an in-memory SQLite database so the numbers are dominated
+by SQLAlchemy's statement construction, cache-key generation and result
+processing rather than by network or server time.
+
+Usage:
+    python benchmarks/statement_cache.py [--iterations N]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# The app engine is never connected to; the benchmark uses its own SQLite engine
+os.environ.setdefault("DATABASE_URL", "postgresql+psycopg2://bench@localhost/bench")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+from sqlalchemy import create_engine, false
+from sqlalchemy.orm import Session, joinedload
+
+from app.db.base import Base
+from app.models.task import Task
+from app.models.user import User
+from app.services import task_service, user_service
+
+def legacy_get_task_by_id(db, task_id, owner_id):
+    return (
+        db.query(Task)
+        .filter(Task.id == task_id, Task.owner_id == owner_id, Task.archived == false())
+        .first()
+    )
+
+def legacy_get_user_by_email(db, email):
+    return db.query(User).filter(User.email == email).first()
+
+def legacy_get_all_tasks(db, owner_id, limit=10, offset=0):
+    query = (
+        db.query(Task)
+        .filter(Task.owner_id == owner_id)
+        .options(joinedload(Task.owner))
+        .filter(Task.archived == false())
+    )
+    total = query.count()
+    return total, query.order_by(Task.created_at.desc()).limit(limit).offset(offset).all()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Statement cache micro-benchmark.")
+    parser.add_argument("--iterations", type=int, default=3000)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        user = User(email="bench@example.com", hashed_password="x")
+        db.add(user)
+        db.flush()
+        db.add_all(Task(title=f"task {i}", owner_id=user.id) for i in range(50))
+        db.commit()
+        user_id = user.id
+
+    cases = [
+        ("get_task_by_id",
+         lambda db: legacy_get_task_by_id(db, 1, user_id),
+         lambda db: task_service.get_task_by_id(db, task_id=1, owner_id=user_id)),
+        ("get_user_by_email",
+         lambda db: legacy_get_user_by_email(db, "bench@example.com"),
+         lambda db: user_service.get_user_by_email(db, email="bench@example.com")),
+        ("get_all_tasks",
+         lambda db: legacy_get_all_tasks(db, user_id),
+         lambda db: task_service.get_all_tasks(db, owner_id=user_id)),
+    ]
+
+    print(f"{'query':<20} {'db.query() us':>14} {'cached us':>10} {'saved':>7}")
+    for name, legacy, cached in cases:
+        timings = []
+        for func in (legacy, cached):
+            with Session(engine) as db:
+                func(db)  # warm the compiled cache
+                seconds = timeit.timeit(lambda: (func(db), db.expunge_all()), number=args.iterations)
+            timings.append(seconds / args.iterations * 1e6)
+        print(f"{name:<20} {timings[0]:>14.1f} {timings[1]:>10.1f} {1 - timings[1] / timings[0]:>7.0%}")
+
+if __name__ == "__main__":
+    main()
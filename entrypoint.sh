@@ -15,9 +15,12 @@ echo "Waiting for test database (test_db:5432)..."
 
 echo "Databases are ready."
 
-# Run database migrations
-echo "Running database migrations..."
-alembic upgrade head
+# Migrations normally run as a separate step (python -m app.scripts.migrate,
+# the `migrate` service in docker-compose) so app containers never wait on DDL.
+if [ "${RUN_MIGRATIONS:-false}" = "true" ]; then
+    echo "Running database migrations..."
+    python -m app.scripts.migrate
+fi
 
 # Start the main application
 # "$@" is used to pass arguments (like the CMD from Dockerfile)
@@ -2,7 +2,7 @@ import os
 from logging.config import fileConfig
 
 from alembic import context
-from sqlalchemy import engine_from_config, pool
+from sqlalchemy import engine_from_config, pool, text
 
 # Import our application's Base model and settings
 from app.db.base import Base
@@ -11,6 +11,10 @@ from app.core.config import settings
 # Import models so Base metadata registers them
 from app.models.task import Task
 from app.models.user import User
+from app.models.task_stats import TaskDailyStat
+from app.models.user_directory import UserDirectoryEntry
+from app.models.task_tombstone import TaskTombstone
+from app.models.revoked_token import RevokedToken
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -22,7 +26,11 @@ if config.config_file_name is not None:
     fileConfig(config.config_file_name)
 
 # This ensures Alembic and the pytest app are looking at the same database.
-config.set_main_option('sqlalchemy.url', settings.get_database_url())
+# `alembic -x db_url=...` targets another database (e.g. one shard).
+config.set_main_option(
+    'sqlalchemy.url',
+    context.get_x_argument(as_dictionary=True).get('db_url', settings.get_database_url())
+)
 
 # add your model's MetaData object here
 # for 'autogenerate' support
@@ -72,8 +80,15 @@ def run_migrations_online() -> None:
     )
 
     with connectable.connect() as connection:
+        # Fail fast instead of queueing every query behind a DDL lock;
+        # app.scripts.migrate retries migrations that time out
+        connection.execute(text(f"SET lock_timeout = {settings.MIGRATION_LOCK_TIMEOUT_MS}"))
+        connection.commit()
+
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection, target_metadata=target_metadata,
+            # A lock timeout only rolls back the migration that hit it
+            transaction_per_migration=True
         )
 
         with context.begin_transaction():
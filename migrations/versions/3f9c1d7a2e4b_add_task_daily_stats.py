@@ -0,0 +1,43 @@
+"""Add task daily stats rollup
+
+Revision ID: 3f9c1d7a2e4b
+Revises: b43d3a04e9a8
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9c1d7a2e4b'
+down_revision: Union[str, None] = 'b43d3a04e9a8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('task_daily_stats',
+    sa.Column('owner_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('task_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['owner_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('owner_id', 'day')
+    )
+
+    # Backfill the rollup from existing tasks
+    op.execute(
+        """
+        INSERT INTO task_daily_stats (owner_id, day, task_count)
+        SELECT owner_id, (created_at AT TIME ZONE 'UTC')::date, count(*)
+        FROM tasks
+        WHERE owner_id IS NOT NULL
+        GROUP BY owner_id, (created_at AT TIME ZONE 'UTC')::date
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('task_daily_stats')
@@ -0,0 +1,38 @@
+"""Add work-queue claim columns to tasks
+
+Revision ID: 5b9e3f7c2a18
+Revises: e4d82b6f19c5
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.db.migration_helpers import create_index_concurrently, drop_index_concurrently
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b9e3f7c2a18'
+down_revision: Union[str, None] = 'e4d82b6f19c5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Added on the partitioned parent, so both partitions get the columns
+    op.add_column('tasks', sa.Column('status', sa.String(length=16), server_default='pending', nullable=False))
+    op.add_column('tasks', sa.Column('claimed_by', sa.String(length=100), nullable=True))
+    op.add_column('tasks', sa.Column('lease_expires_at', sa.DateTime(timezone=True), nullable=True))
+    create_index_concurrently(
+        'ix_tasks_owner_id_claimable', 'tasks', ['owner_id', 'created_at'],
+        where="status IN ('pending', 'claimed')",
+    )
+
+
+def downgrade() -> None:
+    drop_index_concurrently('ix_tasks_owner_id_claimable', 'tasks')
+    op.drop_column('tasks', 'lease_expires_at')
+    op.drop_column('tasks', 'claimed_by')
+    op.drop_column('tasks', 'status')
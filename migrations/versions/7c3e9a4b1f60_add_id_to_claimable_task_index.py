@@ -0,0 +1,35 @@
+"""Add id to the claimable task index
+
+Revision ID: 7c3e9a4b1f60
+Revises: f2c8a5d1b736
+Create Date: 2026-10-20 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from app.db.migration_helpers import create_index_concurrently, drop_index_concurrently
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c3e9a4b1f60'
+down_revision: Union[str, None] = 'f2c8a5d1b736'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Claims order by (created_at, id); until the new index is built they
+    # fall back to ix_tasks_owner_id_created_at
+    drop_index_concurrently('ix_tasks_owner_id_claimable', 'tasks')
+    create_index_concurrently(
+        'ix_tasks_owner_id_claimable', 'tasks', ['owner_id', 'created_at', 'id'],
+        where="status IN ('pending', 'claimed')",
+    )
+
+
+def downgrade() -> None:
+    drop_index_concurrently('ix_tasks_owner_id_claimable', 'tasks')
+    create_index_concurrently(
+        'ix_tasks_owner_id_claimable', 'tasks', ['owner_id', 'created_at'],
+        where="status IN ('pending', 'claimed')",
+    )
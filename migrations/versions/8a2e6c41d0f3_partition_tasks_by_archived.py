@@ -0,0 +1,89 @@
+"""Partition tasks into hot and cold partitions by archived flag
+
+Revision ID: 8a2e6c41d0f3
+Revises: 3f9c1d7a2e4b
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8a2e6c41d0f3'
+down_revision: Union[str, None] = '3f9c1d7a2e4b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Move the existing heap out of the way
+    op.execute("ALTER TABLE tasks RENAME TO tasks_legacy")
+    op.execute("ALTER INDEX ix_tasks_id RENAME TO ix_tasks_legacy_id")
+    op.execute("ALTER INDEX ix_tasks_title RENAME TO ix_tasks_legacy_title")
+    op.execute("ALTER TABLE tasks_legacy RENAME CONSTRAINT tasks_pkey TO tasks_legacy_pkey")
+
+    # Partitioned parent. The partition key must be part of the primary key.
+    op.execute(
+        """
+        CREATE TABLE tasks (
+            id INTEGER NOT NULL DEFAULT nextval('tasks_id_seq'),
+            title VARCHAR(100) NOT NULL,
+            description TEXT,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+            owner_id INTEGER REFERENCES users (id),
+            archived BOOLEAN NOT NULL DEFAULT false,
+            PRIMARY KEY (id, archived)
+        ) PARTITION BY LIST (archived)
+        """
+    )
+    op.execute("CREATE TABLE tasks_hot PARTITION OF tasks FOR VALUES IN (false)")
+    op.execute("CREATE TABLE tasks_cold PARTITION OF tasks FOR VALUES IN (true)")
+
+    op.create_index(op.f('ix_tasks_id'), 'tasks', ['id'], unique=False)
+    # Titles stay unique among live tasks; archived ones may repeat
+    op.create_index('ix_tasks_hot_title', 'tasks_hot', ['title'], unique=True)
+    # Lets the archival job find old tasks without scanning the hot partition
+    op.create_index('ix_tasks_hot_created_at', 'tasks_hot', ['created_at'], unique=False)
+
+    op.execute(
+        """
+        INSERT INTO tasks (id, title, description, created_at, owner_id)
+        SELECT id, title, description, created_at, owner_id FROM tasks_legacy
+        """
+    )
+    # Keep the id sequence alive when the legacy table is dropped
+    op.execute("ALTER SEQUENCE tasks_id_seq OWNED BY tasks.id")
+    op.execute("DROP TABLE tasks_legacy")
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE tasks RENAME TO tasks_partitioned")
+    op.execute("ALTER INDEX ix_tasks_id RENAME TO ix_tasks_partitioned_id")
+    op.execute("ALTER TABLE tasks_partitioned RENAME CONSTRAINT tasks_pkey TO tasks_partitioned_pkey")
+
+    op.create_table('tasks',
+    sa.Column('id', sa.Integer(), server_default=sa.text("nextval('tasks_id_seq')"), nullable=False),
+    sa.Column('title', sa.String(length=100), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('owner_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['owner_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_tasks_id'), 'tasks', ['id'], unique=False)
+
+    # Archived titles may collide with live ones; keep the live task
+    op.execute(
+        """
+        INSERT INTO tasks (id, title, description, created_at, owner_id)
+        SELECT DISTINCT ON (title) id, title, description, created_at, owner_id
+        FROM tasks_partitioned
+        ORDER BY title, archived, id
+        """
+    )
+    op.create_index(op.f('ix_tasks_title'), 'tasks', ['title'], unique=True)
+    op.execute("ALTER SEQUENCE tasks_id_seq OWNED BY tasks.id")
+    op.execute("DROP TABLE tasks_partitioned")
@@ -0,0 +1,68 @@
+"""Add per-owner change sequence and task tombstones for delta sync
+
+Revision ID: 9d4a7e21c6b0
+Revises: 5b9e3f7c2a18
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.db.migration_helpers import create_index_concurrently, drop_index_concurrently, run_in_batches
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d4a7e21c6b0'
+down_revision: Union[str, None] = '5b9e3f7c2a18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('change_seq', sa.BigInteger(), server_default='0', nullable=False))
+    op.add_column('tasks', sa.Column('change_seq', sa.BigInteger(), server_default='0', nullable=False))
+
+    op.create_table('task_tombstones',
+    sa.Column('owner_id', sa.Integer(), nullable=False),
+    sa.Column('change_seq', sa.BigInteger(), nullable=False),
+    sa.Column('task_id', sa.Integer(), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['owner_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('owner_id', 'change_seq')
+    )
+
+    # Number existing tasks per owner so a first sync (since=0) sees them.
+    # Batches of owners, each committed on its own; an owner is done once
+    # their change_seq is set.
+    run_in_batches("""
+        WITH owners AS (
+            SELECT id FROM users
+            WHERE change_seq = 0
+              AND EXISTS (SELECT 1 FROM tasks WHERE tasks.owner_id = users.id)
+            ORDER BY id
+            LIMIT :batch_size
+        ), numbered AS (
+            SELECT id, archived, row_number() OVER (PARTITION BY owner_id ORDER BY id) AS seq
+            FROM tasks
+            WHERE owner_id IN (SELECT id FROM owners)
+        ), renumbered AS (
+            UPDATE tasks SET change_seq = numbered.seq
+            FROM numbered
+            WHERE tasks.id = numbered.id AND tasks.archived = numbered.archived
+            RETURNING tasks.owner_id, tasks.change_seq
+        )
+        UPDATE users SET change_seq = latest.seq
+        FROM (SELECT owner_id, MAX(change_seq) AS seq FROM renumbered GROUP BY owner_id) AS latest
+        WHERE users.id = latest.owner_id
+    """, batch_size=500)
+
+    create_index_concurrently('ix_tasks_owner_id_change_seq', 'tasks', ['owner_id', 'change_seq'])
+
+
+def downgrade() -> None:
+    op.drop_table('task_tombstones')
+    drop_index_concurrently('ix_tasks_owner_id_change_seq', 'tasks')
+    op.drop_column('tasks', 'change_seq')
+    op.drop_column('users', 'change_seq')
@@ -0,0 +1,33 @@
+"""Add owner-scoped composite indexes for task listing
+
+Revision ID: c71b5e09a3d2
+Revises: 8a2e6c41d0f3
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.db.migration_helpers import create_index_concurrently, drop_index_concurrently
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c71b5e09a3d2'
+down_revision: Union[str, None] = '8a2e6c41d0f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Built per partition without blocking writes, then attached to the parent
+    create_index_concurrently('ix_tasks_owner_id_created_at', 'tasks', ['owner_id', 'created_at'])
+    create_index_concurrently('ix_tasks_owner_id_title', 'tasks', ['owner_id', 'title'])
+    create_index_concurrently('ix_tasks_owner_id_id', 'tasks', ['owner_id', 'id'])
+
+
+def downgrade() -> None:
+    drop_index_concurrently('ix_tasks_owner_id_id', 'tasks')
+    drop_index_concurrently('ix_tasks_owner_id_title', 'tasks')
+    drop_index_concurrently('ix_tasks_owner_id_created_at', 'tasks')
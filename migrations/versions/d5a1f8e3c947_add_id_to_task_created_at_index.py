@@ -0,0 +1,34 @@
+"""Add id to the owner/created_at task index
+
+Revision ID: d5a1f8e3c947
+Revises: 7c3e9a4b1f60
+Create Date: 2026-10-20 11:00:00.000000
+
+"""
+from typing import List, Sequence, Union
+
+from app.db.migration_helpers import create_index_concurrently, drop_index_concurrently, rename_index
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5a1f8e3c947'
+down_revision: Union[str, None] = '7c3e9a4b1f60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _replace_index(columns: List[str]) -> None:
+    # The default listing reads this index on every request, so the new
+    # one is built before the old one goes
+    create_index_concurrently('ix_tasks_owner_id_created_at_new', 'tasks', columns)
+    drop_index_concurrently('ix_tasks_owner_id_created_at', 'tasks')
+    rename_index('ix_tasks_owner_id_created_at_new', 'ix_tasks_owner_id_created_at', 'tasks')
+
+
+def upgrade() -> None:
+    # Listings order by (created_at, id) so tied timestamps page stably
+    _replace_index(['owner_id', 'created_at', 'id'])
+
+
+def downgrade() -> None:
+    _replace_index(['owner_id', 'created_at'])
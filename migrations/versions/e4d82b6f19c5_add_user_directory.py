@@ -0,0 +1,35 @@
+"""Add user directory for horizontal sharding
+
+Revision ID: e4d82b6f19c5
+Revises: c71b5e09a3d2
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4d82b6f19c5'
+down_revision: Union[str, None] = 'c71b5e09a3d2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Only populated in the directory database; its serial sequence
+    # (user_directory_user_id_seq) allocates user IDs for every shard
+    op.create_table('user_directory',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('email', sa.String(), nullable=False),
+    sa.Column('shard_id', sa.String(length=64), nullable=False),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    op.create_index(op.f('ix_user_directory_email'), 'user_directory', ['email'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_user_directory_email'), table_name='user_directory')
+    op.drop_table('user_directory')
@@ -0,0 +1,32 @@
+"""Add labels to tasks
+
+Revision ID: f2c8a5d1b736
+Revises: a6f0c3d95e27
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from app.db.migration_helpers import create_index_concurrently, drop_index_concurrently
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2c8a5d1b736'
+down_revision: Union[str, None] = 'a6f0c3d95e27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # A constant default is stored in the catalog, so this doesn't rewrite the table
+    op.add_column('tasks', sa.Column('labels', postgresql.ARRAY(sa.Text()), server_default='{}', nullable=False))
+    create_index_concurrently('ix_tasks_labels', 'tasks', ['labels'], using='gin')
+
+
+def downgrade() -> None:
+    drop_index_concurrently('ix_tasks_labels', 'tasks')
+    op.drop_column('tasks', 'labels')
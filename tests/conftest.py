@@ -8,11 +8,12 @@ import os
 
 from app.main import app
 from app.db.base import Base
-from app.db.session import get_db
+from app.db import sqlite
+from app.db.session import engine as app_engine, get_db
 from app.core.config import settings
 from app.models.user import User
 from app.schemas.user import UserCreate
-from app.services import user_service
+from app.services import task_service, user_service
 
 # --- Database Fixture ---
 
@@ -27,6 +28,13 @@ def test_db_engine():
     
     # Get the test database URL
     db_url = settings.get_database_url()
+    if settings.is_sqlite():
+        # The single-node backend builds its schema from the models
+        sqlite.drop_schema(app_engine)
+        sqlite.create_schema(app_engine)
+        yield app_engine
+        sqlite.drop_schema(app_engine)
+        return
     engine = create_engine(db_url)
 
     # Find alembic.ini
@@ -53,11 +61,30 @@ def db_session(test_db_engine):
     Provides a clean database session for each test.
     This has 'function' scope, so it runs for every single test.
     """
+    if settings.is_sqlite():
+        # SQLite has one writer at a time: a test transaction held open
+        # would block every write the app makes on its own connections
+        # (e.g. token revocation). So tests commit, and the rows are
+        # deleted afterwards instead.
+        session = sessionmaker(autocommit=False, autoflush=False, bind=test_db_engine)()
+        yield session
+        session.close()
+        with test_db_engine.begin() as conn:
+            for table in reversed(Base.metadata.sorted_tables):
+                conn.execute(table.delete())
+        # Deleted row IDs are reused; drop pages cached under them
+        task_service._first_pages.clear()
+        return
+
     connection = test_db_engine.connect()
     transaction = connection.begin()
     
-    # Create a session
-    SessionTesting = sessionmaker(autocommit=False, autoflush=False, bind=connection)
+    # Create a session. Its commits and rollbacks act on a savepoint, so
+    # a service rolling back a failed write keeps the test's earlier rows
+    SessionTesting = sessionmaker(
+        autocommit=False, autoflush=False, bind=connection,
+        join_transaction_mode="create_savepoint"
+    )
     session = SessionTesting()
 
     yield session
@@ -1,3 +1,4 @@
+import pytest
 from fastapi.testclient import TestClient
 from app.core.config import settings
 
@@ -119,4 +120,96 @@ def test_task_crud_workflow(client: TestClient, auth_token_header: dict):
         f"{settings.API_V1_STR}/tasks/{task_id}",
         headers=auth_token_header
     )
-    assert response.status_code == 404 # Not Found
\ No newline at end of file
+    assert response.status_code == 404 # Not Found
+
+def test_batch_runs_operations_with_one_login(client: TestClient, auth_token_header: dict, monkeypatch):
+    """
+    Tests that a batch runs reads and writes in order and reports
+    a status per operation.
+    """
+    # The test client shares a single DB session; keep sub-requests sequential
+    monkeypatch.setattr(settings, "BATCH_MAX_CONCURRENCY", 1)
+
+    response = client.post(
+        f"{settings.API_V1_STR}/batch/",
+        json={"operations": [
+            {"id": "create", "method": "POST", "path": "/tasks/", "body": {"title": "Batch Task"}},
+            {"id": "list", "path": "/tasks/?limit=5"},
+            {"id": "missing", "path": "/tasks/999999"},
+        ]},
+        headers=auth_token_header
+    )
+    assert response.status_code == 200
+    results = {r["id"]: r for r in response.json()["results"]}
+    assert results["create"]["status"] == 201
+    assert results["list"]["status"] == 200
+    assert results["list"]["body"]["total"] == 1
+    assert results["missing"]["status"] == 404
+
+def test_work_queue_claims_are_exclusive(client: TestClient, auth_token_header: dict):
+    """
+    Tests that concurrent workers never claim the same task and that
+    only the lease holder can renew or complete it.
+    """
+    tasks_url = f"{settings.API_V1_STR}/tasks"
+    for i in range(3):
+        client.post(f"{tasks_url}/", headers=auth_token_header, json={"title": f"Job {i}"})
+
+    first = client.post(f"{tasks_url}/claim?n=2&workerId=w1", headers=auth_token_header)
+    assert first.status_code == 200
+    assert [task["title"] for task in first.json()] == ["Job 0", "Job 1"]
+    assert all(task["claimed_by"] == "w1" for task in first.json())
+
+    second = client.post(f"{tasks_url}/claim?n=2&workerId=w2", headers=auth_token_header)
+    assert [task["title"] for task in second.json()] == ["Job 2"]
+
+    task_id = first.json()[0]["id"]
+    response = client.post(f"{tasks_url}/{task_id}/lease?workerId=w2", headers=auth_token_header)
+    assert response.status_code == 409
+
+    response = client.post(f"{tasks_url}/{task_id}/complete?workerId=w1", headers=auth_token_header)
+    assert response.status_code == 200
+    assert response.json()["status"] == "done"
+
+    third = client.post(f"{tasks_url}/claim?workerId=w3", headers=auth_token_header)
+    assert third.json() == []
+
+def test_logout_revokes_the_token(client: TestClient, auth_token_header: dict):
+    """
+    Tests that a token stops working after logout.
+    """
+    response = client.get(f"{settings.API_V1_STR}/tasks/", headers=auth_token_header)
+    assert response.status_code == 200
+
+    response = client.post(f"{settings.API_V1_STR}/auth/logout", headers=auth_token_header)
+    assert response.status_code == 204
+
+    response = client.get(f"{settings.API_V1_STR}/tasks/", headers=auth_token_header)
+    assert response.status_code == 401
+
+@pytest.mark.parametrize("group_commit", [False, True])
+def test_duplicate_task_title_conflicts(client: TestClient, auth_token_header: dict, monkeypatch, group_commit):
+    """
+    Tests that creating a task with a title already in use returns 409,
+    also when creates are group-committed.
+    """
+    monkeypatch.setattr(settings, "TASK_GROUP_COMMIT", group_commit)
+    tasks_url = f"{settings.API_V1_STR}/tasks/"
+    response = client.post(tasks_url, headers=auth_token_header, json={"title": "Only once"})
+    assert response.status_code == 201
+    response = client.post(tasks_url, headers=auth_token_header, json={"title": "Only once"})
+    assert response.status_code == 409
+
+def test_metrics_require_admin_or_metrics_token(client: TestClient, auth_token_header: dict, monkeypatch):
+    """
+    Tests that /metrics is refused without credentials and to regular
+    users, and served for METRICS_TOKEN and for admins.
+    """
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "scrape-secret")
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers=auth_token_header).status_code == 403
+    response = client.get("/metrics", headers={"Authorization": "Bearer scrape-secret"})
+    assert response.status_code == 200 and isinstance(response.json(), dict)
+
+    monkeypatch.setattr(settings, "ADMIN_EMAILS", ["test@example.com"])
+    assert client.get("/metrics", headers=auth_token_header).status_code == 200
@@ -0,0 +1,245 @@
+"""
+Query-plan regression harness.
+
+Seeds a realistically sized dataset, drives the API endpoints while
+recording every statement the services send to Postgres, then runs
+EXPLAIN (FORMAT JSON) on each one. The test fails when a plan contains
+a sequential scan or a full sort over a big table, and prints a
+matrix of which indexes each endpoint used.
+"""
+import json
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, List, Set, Tuple
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.dialect import IS_SQLITE
+from app.models.user import User
+
+SEED_USERS = 2_000
+SEED_TASKS = 50_000
+# The test user's share of the tasks: enough that an owner-scoped scan
+# without an index is clearly visible in the plan
+SEED_OWN_TASKS = 2_000
+
+# Relations (tables or partitions) with at least this many rows must be
+# reached through an index, and sorts of at least this many rows from
+# them must be served in index order instead
+SEQ_SCAN_MIN_ROWS = 1_000
+SORT_MIN_ROWS = 1_000
+
+_EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+
+class StatementRecorder:
+    """
+    Records the statements executed on a connection, tagged with the
+    endpoint being exercised.
+    """
+    def __init__(self, connection: Connection):
+        self.connection = connection
+        self.endpoint = None
+        self.statements: List[Tuple[str, str, object]] = []
+
+    def __enter__(self):
+        event.listen(self.connection, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.connection, "before_cursor_execute", self._record)
+
+    @contextmanager
+    def calling(self, endpoint: str):
+        self.endpoint = endpoint
+        try:
+            yield
+        finally:
+            self.endpoint = None
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        if self.endpoint is None or not statement.lstrip().upper().startswith(_EXPLAINABLE):
+            return
+        if executemany:
+            parameters = parameters[0]
+        self.statements.append((self.endpoint, statement, parameters))
+
+def _seed(db: Session, owner: User) -> None:
+    db.execute(text("""
+        INSERT INTO users (email, hashed_password)
+        SELECT 'plan-seed-' || g || '@example.com', 'x' FROM generate_series(1, :users) g
+    """), {"users": SEED_USERS})
+    # Every tenth task is archived (cold partition), every third is done
+    # and every fifth has two of 50 labels
+    db.execute(text("""
+        INSERT INTO tasks (title, description, owner_id, archived, status, change_seq, created_at, labels)
+        SELECT 'plan seed ' || g, 'seeded for plan checks', o.ids[1 + g % o.n],
+               g % 10 = 0, CASE WHEN g % 3 = 0 THEN 'done' ELSE 'pending' END,
+               g, now() - g * interval '1 minute',
+               CASE WHEN g % 5 = 0 THEN ARRAY['l' || g % 50, 'l' || g % 7] ELSE '{}' END
+        FROM generate_series(1, :tasks) g,
+             (SELECT array_agg(id) AS ids, count(*)::int AS n FROM users
+              WHERE email LIKE 'plan-seed-%') o
+    """), {"tasks": SEED_TASKS - SEED_OWN_TASKS})
+    db.execute(text("""
+        INSERT INTO tasks (title, description, owner_id, archived, status, change_seq, created_at, labels)
+        SELECT 'plan own ' || g, 'seeded for plan checks', :owner_id,
+               g % 10 = 0, CASE WHEN g % 3 = 0 THEN 'done' ELSE 'pending' END,
+               g, now() - g * interval '1 minute',
+               CASE WHEN g % 5 = 0 THEN ARRAY['l' || g % 50, 'l' || g % 7] ELSE '{}' END
+        FROM generate_series(1, :tasks) g
+    """), {"tasks": SEED_OWN_TASKS, "owner_id": owner.id})
+    db.execute(
+        text("UPDATE users SET change_seq = :seq WHERE id = :owner_id"),
+        {"seq": SEED_OWN_TASKS + SEED_OWN_TASKS // 2, "owner_id": owner.id}
+    )
+    db.execute(text("""
+        INSERT INTO task_tombstones (owner_id, change_seq, task_id)
+        SELECT owner_id, change_seq + :tasks, id FROM tasks WHERE id % 4 = 0
+    """), {"tasks": SEED_TASKS})
+    db.execute(text("""
+        INSERT INTO task_daily_stats (owner_id, day, task_count)
+        SELECT owner_id, (created_at AT TIME ZONE 'UTC')::date, count(*)
+        FROM tasks GROUP BY 1, 2
+    """))
+    for table in ("users", "tasks", "task_tombstones", "task_daily_stats"):
+        db.execute(text(f"ANALYZE {table}"))
+
+def _explain(connection: Connection, statement: str, parameters) -> dict:
+    # A savepoint keeps a failing EXPLAIN from aborting the test transaction
+    with connection.begin_nested():
+        plan = connection.exec_driver_sql(
+            "EXPLAIN (FORMAT JSON) " + statement, parameters or ()
+        ).scalar_one()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]["Plan"]
+
+def _nodes(plan: dict):
+    yield plan
+    for child in plan.get("Plans", ()):
+        yield from _nodes(child)
+
+def _check_plan(plan: dict, relation_rows: Dict[str, float]) -> List[str]:
+    """
+    Returns the problems found in one plan.
+    """
+    problems = []
+    for node in _nodes(plan):
+        relation = node.get("Relation Name")
+        if node["Node Type"] == "Seq Scan" and relation_rows.get(relation, 0) >= SEQ_SCAN_MIN_ROWS:
+            problems.append(f"Seq Scan on {relation} (~{relation_rows[relation]:.0f} rows)")
+        if node["Node Type"] == "Sort" and node["Plan Rows"] >= SORT_MIN_ROWS:
+            sources = {
+                child.get("Relation Name") for child in _nodes(node)
+                if relation_rows.get(child.get("Relation Name"), 0) >= SEQ_SCAN_MIN_ROWS
+            }
+            if sources:
+                problems.append(
+                    f"Sort of ~{node['Plan Rows']} rows from {', '.join(sorted(sources))} "
+                    f"by {', '.join(node.get('Sort Key', []))}"
+                )
+    return problems
+
+def _coverage_matrix(used: Dict[str, Set[str]], declared: List[str]) -> str:
+    """
+    Renders endpoints (rows) against indexes (numbered columns).
+    """
+    indexes = sorted(set(declared) | {name for names in used.values() for name in names})
+    width = max(len(endpoint) for endpoint in used)
+    lines = [" " * width + "  " + " ".join(f"{i:>2}" for i in range(1, len(indexes) + 1))]
+    for endpoint, names in used.items():
+        marks = " ".join(f"{'x' if name in names else '.':>2}" for name in indexes)
+        lines.append(f"{endpoint:<{width}}  {marks}")
+    lines.append("")
+    for i, name in enumerate(indexes, 1):
+        unused = "" if any(name in names for names in used.values()) else "  (unused)"
+        lines.append(f"{i:>3}. {name}{unused}")
+    return "\n".join(lines)
+
+@pytest.mark.skipif(IS_SQLITE, reason="Postgres plans only")
+def test_endpoint_queries_use_indexes(client: TestClient, db_session: Session, test_user: User, capsys):
+    """
+    Tests that no statement issued by the task and user endpoints scans
+    or sorts a big table, and reports the index coverage per endpoint.
+    """
+    _seed(db_session, test_user)
+    connection = db_session.connection()
+    own_task_id = db_session.execute(
+        text("SELECT id FROM tasks WHERE owner_id = :owner_id AND NOT archived AND status = 'pending' LIMIT 1"),
+        {"owner_id": test_user.id}
+    ).scalar_one()
+
+    tasks_url = f"{settings.API_V1_STR}/tasks"
+    with StatementRecorder(connection) as recorder:
+        with recorder.calling("POST /auth/login"):
+            response = client.post(
+                f"{settings.API_V1_STR}/auth/login",
+                data={"username": test_user.email, "password": "testpassword123"}
+            )
+            assert response.status_code == 200
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        def call(method: str, path: str, **kwargs):
+            with recorder.calling(f"{method} /tasks{path}"):
+                response = client.request(method, tasks_url + path, headers=headers, **kwargs)
+            assert response.status_code < 400, (method, path, response.text)
+            return response
+
+        call("POST", "/", json={"title": "plan new task"})
+        call("GET", "/")
+        call("GET", "/?sort=title")
+        call("GET", "/?sort=-created_at,title")
+        call("GET", "/?filter=seed&limit=20")
+        call("GET", "/?createdAfter=2020-01-01T00:00:00Z&limit=20")
+        call("GET", "/?title=plan%20own%2010")
+        call("GET", "/?includeArchived=true&offset=100")
+        call("GET", "/?label=l5")
+        call("GET", "/?label=l5&label=l3&labelMatch=any")
+        call("GET", "/labels")
+        call("GET", f"/{own_task_id}")
+        call("PUT", f"/{own_task_id}", json={"description": "updated"})
+        claimed = call("POST", "/claim?n=5&workerId=plan").json()
+        call("POST", f"/{claimed[0]['id']}/lease?workerId=plan")
+        call("POST", f"/{claimed[0]['id']}/complete?workerId=plan")
+        call("GET", "/changes?since=0")
+        call("GET", f"/changes?since={SEED_OWN_TASKS // 2}")
+        call("GET", "/stats")
+        call("DELETE", f"/{own_task_id}")
+
+    assert recorder.statements, "No statements were captured"
+
+    relation_rows = dict(connection.execute(text(
+        "SELECT relname, reltuples FROM pg_class WHERE relkind = 'r'"
+    )).all())
+    # Plans name the partition's index; report the parent index instead
+    parent_index = dict(connection.execute(text("""
+        SELECT child.relname, parent.relname
+        FROM pg_inherits
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        WHERE child.relkind = 'i'
+    """)).all())
+    declared = connection.execute(text(
+        "SELECT indexname FROM pg_indexes WHERE tablename IN ('users', 'tasks', 'task_tombstones')"
+    )).scalars().all()
+
+    used: Dict[str, Set[str]] = defaultdict(set)
+    failures = []
+    for endpoint, statement, parameters in recorder.statements:
+        plan = _explain(connection, statement, parameters)
+        used[endpoint].update(
+            parent_index.get(node["Index Name"], node["Index Name"])
+            for node in _nodes(plan) if "Index Name" in node
+        )
+        for problem in _check_plan(plan, relation_rows):
+            failures.append(f"{endpoint}: {problem}\n    {' '.join(statement.split())}")
+
+    with capsys.disabled():
+        print("\nIndex coverage per endpoint:\n" + _coverage_matrix(used, declared))
+
+    assert not failures, "Plans that scan or sort big tables:\n" + "\n".join(failures)
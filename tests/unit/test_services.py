@@ -1,6 +1,9 @@
+import time
 import pytest
+from app.core.config import settings
 from app.services import security
 from app.services import task_service
+from app.services import task_stats_service
 from app.schemas.task import TaskCreate
 
 # Fixture for password testing
@@ -48,8 +51,9 @@ def test_task_service_custom_filter(db_session, test_user):
     
     assert total == 2
     assert len(tasks) == 2
-    assert tasks[0].title == "Find Python bug"
-    assert tasks[1].title == "Write report"
+    # Newest first
+    assert tasks[0].title == "Write report"
+    assert tasks[1].title == "Find Python bug"
 
     # 3. Test filter for "chore"
     total, tasks = task_service.get_all_tasks(
@@ -60,4 +64,914 @@ def test_task_service_custom_filter(db_session, test_user):
     
     assert total == 1
     assert len(tasks) == 1
-    assert tasks[0].title == "Do laundry"
\ No newline at end of file
+    assert tasks[0].title == "Do laundry"
+
+def test_task_stats_rollup_tracks_writes(db_session, test_user):
+    """
+    Tests that create/delete keep the stats rollup in sync
+    and that a rebuild produces the same numbers.
+    """
+    first = task_service.create_task(
+        db_session, TaskCreate(title="Stats task 1"), test_user.id
+    )
+    task_service.create_task(
+        db_session, TaskCreate(title="Stats task 2"), test_user.id
+    )
+
+    total, days = task_stats_service.get_task_stats(db_session, owner_id=test_user.id)
+    assert total == 2
+    assert len(days) == 1
+    assert days[0].task_count == 2
+
+    task_service.delete_task(db_session, task_id=first.id, owner_id=test_user.id)
+    total, days = task_stats_service.get_task_stats(db_session, owner_id=test_user.id)
+    assert total == 1
+    assert days[0].task_count == 1
+
+    task_stats_service.rebuild_task_stats(db_session, owner_id=test_user.id)
+    assert task_stats_service.get_task_stats(db_session, owner_id=test_user.id)[0] == 1
+
+@pytest.mark.skipif(not settings.is_sqlite(), reason="SQLite writer lock")
+def test_sqlite_failed_write_releases_writer_lock(test_db_engine):
+    """
+    Tests that a transaction whose first write fails doesn't keep other
+    writers waiting until it rolls back.
+    """
+    from sqlalchemy import text
+    from sqlalchemy.exc import IntegrityError
+    from app.db import sqlite
+
+    with test_db_engine.connect() as conn:
+        with pytest.raises(IntegrityError):
+            conn.execute(text("INSERT INTO revoked_tokens (user_id, expires_at) VALUES (1, '2030-01-01')"))
+        assert sqlite._writer_lock.acquire(blocking=False)
+        sqlite._writer_lock.release()
+        # The transaction is still usable, and can write again
+        conn.execute(text(
+            "INSERT INTO revoked_tokens (jti, user_id, expires_at) VALUES ('t', 1, '2030-01-01')"
+        ))
+        revoked_at = conn.execute(text("SELECT revoked_at FROM revoked_tokens")).scalar_one()
+        conn.rollback()
+    # Stored with milliseconds, so rows written within a second keep their order
+    assert "." in revoked_at
+
+def test_task_event_broadcaster_fanout_and_backpressure(monkeypatch):
+    """
+    Tests that NOTIFY payloads reach only the owner's subscribers and
+    that an overflowing subscriber is told to resync.
+    """
+    import asyncio
+    import json
+    from app.services import task_events
+
+    monkeypatch.setattr(task_events.settings, "TASK_EVENTS_QUEUE_SIZE", 2)
+    broadcaster = task_events.TaskEventBroadcaster()
+    # Don't open a LISTEN connection; feed payloads directly
+    monkeypatch.setattr(broadcaster, "_ensure_listener", lambda: None)
+
+    async def scenario():
+        mine = broadcaster.subscribe(owner_id=1)
+        other = broadcaster.subscribe(owner_id=2)
+        for task_id in range(3):
+            broadcaster.dispatch(json.dumps({"owner_id": 1, "task_id": task_id, "action": "created"}))
+        await asyncio.sleep(0)
+
+        assert other.queue.empty()
+        events = [mine.queue.get_nowait() for _ in range(mine.queue.qsize())]
+        assert events == [task_events.RESYNC_EVENT]
+
+        broadcaster.unsubscribe(mine)
+        broadcaster.unsubscribe(other)
+
+    asyncio.run(scenario())
+
+@pytest.mark.skipif(settings.is_sqlite(), reason="LISTEN/NOTIFY is Postgres only")
+@pytest.mark.parametrize("driver", ["psycopg2", "psycopg"])
+def test_task_event_listener_receives_notify(test_db_engine, driver):
+    """
+    Tests that a NOTIFY committed on another connection reaches the
+    broadcaster's LISTEN connection, with either Postgres driver.
+    """
+    import json
+    import threading
+    from sqlalchemy import create_engine, select, func
+    from sqlalchemy.engine import make_url
+    from app.services import task_events
+
+    url = make_url(settings.get_database_url()).set(drivername=f"postgresql+{driver}")
+    engine = create_engine(url)
+    channel = f"task_events_test_{driver}"
+    broadcaster = task_events.TaskEventBroadcaster(channel=channel, engines=lambda: [engine])
+    received = []
+    arrived = threading.Event()
+    def on_event(event):
+        received.append(event)
+        arrived.set()
+    broadcaster.watch(on_event, lambda: None)
+
+    try:
+        deadline = time.monotonic() + 10
+        while not broadcaster.ensure_listening():
+            assert time.monotonic() < deadline, "Listener did not connect"
+            time.sleep(0.05)
+        payload = {"owner_id": 7, "task_id": 1, "action": "claimed"}
+        with engine.begin() as conn:
+            conn.execute(select(func.pg_notify(channel, json.dumps(payload))))
+        assert arrived.wait(10)
+        assert received == [payload]
+    finally:
+        broadcaster.stop()
+        engine.dispose()
+
+def test_archive_tasks_hides_them_by_default(db_session, test_user):
+    """
+    Tests that archived tasks move out of the default listing but
+    can still be read with include_archived.
+    """
+    from datetime import datetime, timedelta, timezone
+
+    old = task_service.create_task(
+        db_session, TaskCreate(title="Old task"), test_user.id
+    )
+
+    archived = task_service.archive_tasks(
+        db_session, older_than=datetime.now(timezone.utc) + timedelta(days=1)
+    )
+    assert archived >= 1
+
+    total, _ = task_service.get_all_tasks(db_session, owner_id=test_user.id)
+    assert total == 0
+    assert task_service.get_task_by_id(db_session, task_id=old.id, owner_id=test_user.id) is None
+
+    total, tasks = task_service.get_all_tasks(
+        db_session, owner_id=test_user.id, include_archived=True
+    )
+    assert total == 1
+    assert tasks[0].archived is True
+
+def test_task_changes_report_updates_and_deletes(db_session, test_user):
+    """
+    Tests that delta sync returns only what changed after the token,
+    including deletes.
+    """
+    from app.schemas.task import TaskUpdate
+
+    first = task_service.create_task(db_session, TaskCreate(title="Sync A"), test_user.id)
+    second = task_service.create_task(db_session, TaskCreate(title="Sync B"), test_user.id)
+
+    changed, deleted, since, has_more = task_service.get_task_changes(
+        db_session, owner_id=test_user.id, since=0
+    )
+    assert [task.id for task in changed] == [first.id, second.id]
+    assert deleted == [] and not has_more
+
+    task_service.update_task(db_session, first.id, TaskUpdate(title="Sync A2"), test_user.id)
+    task_service.delete_task(db_session, second.id, test_user.id)
+
+    changed, deleted, next_since, _ = task_service.get_task_changes(
+        db_session, owner_id=test_user.id, since=since
+    )
+    assert [task.title for task in changed] == ["Sync A2"]
+    assert deleted == [second.id]
+    assert next_since > since
+
+def test_task_changes_page_through_an_archive_batch(db_session, test_user):
+    """
+    Tests that tasks archived in one batch can be paged through one
+    change at a time.
+    """
+    from datetime import datetime, timedelta, timezone
+
+    created = [
+        task_service.create_task(db_session, TaskCreate(title=f"Archive {i}"), test_user.id)
+        for i in range(3)
+    ]
+    _, _, since, _ = task_service.get_task_changes(db_session, owner_id=test_user.id, since=0)
+    task_service.archive_tasks(
+        db_session, older_than=datetime.now(timezone.utc) + timedelta(days=1)
+    )
+
+    archived, has_more = [], True
+    while has_more:
+        changed, _, since, has_more = task_service.get_task_changes(
+            db_session, owner_id=test_user.id, since=since, limit=1
+        )
+        archived.extend(task.id for task in changed if task.archived)
+    assert sorted(archived) == sorted(task.id for task in created)
+
+def test_task_sort_whitelist_and_index_mapping():
+    """
+    Tests sort parsing and the mapping of sort/filter combinations
+    to the composite indexes that serve them.
+    """
+    from datetime import datetime, timezone
+
+    assert task_service.parse_sort("-created_at,title") == [("created_at", True), ("title", False)]
+    for bad in ("owner", "description", "title,title", ""):
+        with pytest.raises(task_service.InvalidTaskQuery):
+            task_service.parse_sort(bad)
+
+    since = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    assert task_service.choose_index([("title", False)]) == ("ix_tasks_owner_id_title", False)
+    assert task_service.choose_index(
+        [("created_at", True)], created_after=since
+    ) == ("ix_tasks_owner_id_created_at", False)
+    # A range on created_at ordered by title has to sort the whole range
+    assert task_service.choose_index(
+        [("title", False)], created_after=since
+    ) == ("ix_tasks_owner_id_created_at", True)
+
+def test_hash_ring_placement_is_balanced_and_stable():
+    """
+    Users spread evenly over the shards, and adding a shard only moves
+    users onto the new shard.
+    """
+    from app.db.sharding import HashRing
+
+    before = HashRing(["a", "b", "c"])
+    placements = {user_id: before.shard_for(user_id) for user_id in range(3000)}
+    for shard_id in ("a", "b", "c"):
+        assert 600 < list(placements.values()).count(shard_id) < 1400
+
+    after = HashRing(["a", "b", "c", "d"])
+    moved = [u for u in placements if after.shard_for(u) != placements[u]]
+    assert all(after.shard_for(u) == "d" for u in moved)
+    assert len(moved) < 1500
+
+@pytest.fixture
+def two_shards(test_db_engine):
+    """
+    A directory and two shard databases, migrated, on the test server.
+    Yields (directory engine, {shard_id: engine}) and drops them afterwards.
+    """
+    from sqlalchemy import create_engine, text
+    from app.scripts import migrate
+
+    base = test_db_engine.url
+    names = {name: f"{base.database}_{name}" for name in ("directory", "s1", "s2")}
+    admin = create_engine(base, isolation_level="AUTOCOMMIT")
+    with admin.connect() as conn:
+        # Same encoding and locale as the test database, whatever template1 has
+        encoding, collate, ctype = conn.execute(text(
+            "SELECT pg_encoding_to_char(encoding), datcollate, datctype "
+            "FROM pg_database WHERE datname = current_database()"
+        )).one()
+        for database in names.values():
+            conn.execute(text(f'DROP DATABASE IF EXISTS "{database}" WITH (FORCE)'))
+            conn.execute(text(
+                f'CREATE DATABASE "{database}" TEMPLATE template0 '
+                f"ENCODING '{encoding}' LC_COLLATE '{collate}' LC_CTYPE '{ctype}'"
+            ))
+    engines = {}
+    try:
+        for name, database in names.items():
+            url = base.set(database=database)
+            migrate.upgrade(url.render_as_string(hide_password=False))
+            engines[name] = create_engine(url)
+        yield engines["directory"], {name: engines[name] for name in ("s1", "s2")}
+    finally:
+        for engine in engines.values():
+            engine.dispose()
+        with admin.connect() as conn:
+            for database in names.values():
+                conn.execute(text(f'DROP DATABASE IF EXISTS "{database}" WITH (FORCE)'))
+        admin.dispose()
+
+@pytest.mark.skipif(settings.is_sqlite(), reason="Sharding is Postgres only")
+def test_owner_reads_and_writes_stay_on_its_shard(two_shards, monkeypatch):
+    """
+    Tests that bind_args routes each owner's writes to the shard the
+    directory placed them on, and the reads back to that same shard.
+    """
+    from sqlalchemy import event, func, select
+    from sqlalchemy.ext.horizontal_shard import ShardedSession
+    from sqlalchemy.orm import sessionmaker
+    from app.db.sharding import ShardRouter
+    from app.models.task import Task
+    from app.models.user import User
+    from app.schemas.user import UserCreate
+    from app.services import task_events, user_service
+
+    directory, shards = two_shards
+    router = ShardRouter(shards, directory_engine=directory)
+    for module in (user_service, task_service, task_stats_service, task_events):
+        monkeypatch.setattr(module, "shard_router", router)
+    SessionSharded = sessionmaker(
+        class_=ShardedSession, autoflush=False, shards=router.engines,
+        shard_chooser=router.shard_chooser, identity_chooser=router.identity_chooser,
+        execute_chooser=router.execute_chooser
+    )
+
+    statements = []
+    def recorder(shard_id):
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(shard_id)
+        return record
+    for shard_id, engine in shards.items():
+        event.listen(engine, "before_cursor_execute", recorder(shard_id))
+
+    # The ring places consecutive user IDs on both shards
+    placed, emails = {}, {}
+    with SessionSharded() as db:
+        for i in range(8):
+            user = user_service.create_user(
+                db, UserCreate(email=f"shard{i}@example.com", password="password123")
+            )
+            placed[user.id] = router.shard_for_owner(user.id)
+            emails[user.id] = user.email
+            task_service.create_task(db, TaskCreate(title=f"Task of {user.id}"), user.id)
+    assert set(placed.values()) == {"s1", "s2"}
+
+    for shard_id, engine in shards.items():
+        with engine.connect() as conn:
+            users = set(conn.execute(select(User.id)).scalars())
+            owners = set(conn.execute(select(Task.owner_id)).scalars())
+        expected = {user_id for user_id, placed_on in placed.items() if placed_on == shard_id}
+        assert users == expected
+        assert owners == expected
+
+    for user_id, shard_id in placed.items():
+        with SessionSharded() as db:
+            statements.clear()
+            user = user_service.get_user_by_email(db, emails[user_id])
+            total, tasks = task_service.get_all_tasks(db, owner_id=user_id)
+            task = task_service.get_task_by_id(db, tasks[0].id, owner_id=user_id)
+        assert user.id == user_id
+        assert total == 1 and task.title == f"Task of {user_id}"
+        assert statements and set(statements) == {shard_id}
+
+def test_stack_sampler_records_busy_threads():
+    """
+    The request profiler captures the stacks of threads doing work.
+    """
+    import threading
+    import time
+    from app.utils.profiling import StackSampler
+
+    def busy_loop(deadline):
+        while time.monotonic() < deadline:
+            sum(range(1000))
+
+    sampler = StackSampler(interval=0.001, max_seconds=5)
+    sampler.start()
+    worker = threading.Thread(target=busy_loop, args=(time.monotonic() + 0.2,))
+    worker.start()
+    worker.join()
+    sampler.stop()
+
+    assert sampler.samples > 0
+    assert "busy_loop (test_services.py:" in sampler.collapsed()
+
+def test_profile_header_needs_a_current_admin_token(db_session, test_user, monkeypatch):
+    """
+    X-Profile is honoured only for ADMIN_EMAILS accounts whose token
+    get_current_user would still accept.
+    """
+    from contextlib import nullcontext
+    from app.services import user_service
+    from app.services.token_revocation import revoke_token
+    from app.utils import profiling
+
+    monkeypatch.setattr(profiling, "SessionLocal", lambda: nullcontext(db_session))
+    monkeypatch.setattr(settings, "PROFILE_SAMPLE_RATE", 0.0)
+
+    def wants_profile(token):
+        return profiling._wants_profile({
+            b"x-profile": b"1", b"authorization": f"Bearer {token}".encode(),
+        })
+
+    token = security.create_access_token(data={"sub": test_user.email})
+    monkeypatch.setattr(settings, "ADMIN_EMAILS", ["admin@example.com"])
+    assert not wants_profile(token)
+    monkeypatch.setattr(settings, "ADMIN_EMAILS", [test_user.email])
+    assert wants_profile(token)
+    assert not wants_profile("not-a-token")
+
+    # Logged out
+    token_data = security.decode_access_token(token)
+    revoke_token(token_data.jti, test_user.id, token_data.expires_at)
+    assert not wants_profile(token)
+
+    # Every token revoked
+    fresh_token = security.create_access_token(data={"sub": test_user.email})
+    assert wants_profile(fresh_token)
+    time.sleep(0.01)
+    user_service.revoke_all_tokens(db_session, test_user)
+    assert not wants_profile(fresh_token)
+
+def test_request_profiles_are_pruned_to_max_files(tmp_path, monkeypatch):
+    """
+    Profiling keeps only the newest PROFILE_MAX_FILES profiles.
+    """
+    import asyncio
+    import os
+    from app.utils import profiling
+
+    monkeypatch.setattr(settings, "PROFILE_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "PROFILE_MAX_FILES", 3)
+    sampler = profiling.StackSampler(interval=0.001, max_seconds=1)
+    for i in range(5):
+        profiling._write_profile(f"profile-{i}", "GET", "/api/v1/tasks/", sampler)
+        os.utime(tmp_path / f"profile-{i}.collapsed", (1000 + i, 1000 + i))
+    assert sorted(os.listdir(tmp_path)) == [f"profile-{i}.collapsed" for i in (2, 3, 4)]
+
+    # Sampled requests write their profiles through the same pruning
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def request():
+        messages = []
+        async def send(message):
+            messages.append(message)
+        scope = {"type": "http", "method": "GET", "path": "/api/v1/tasks/", "headers": []}
+        await middleware(scope, None, send)
+        return dict(messages[0]["headers"])[profiling.PROFILE_ID_HEADER].decode()
+
+    monkeypatch.setattr(settings, "PROFILE_SAMPLE_RATE", 1.0)
+    middleware = profiling.ProfilingMiddleware(app)
+    profile_id = asyncio.run(request())
+    assert f"{profile_id}.collapsed" in os.listdir(tmp_path)
+    assert len(os.listdir(tmp_path)) == 3
+
+def test_single_flight_runs_concurrent_identical_calls_once():
+    """
+    N concurrent calls with the same key share one execution; a
+    different key is not coalesced.
+    """
+    import threading
+    import time
+    from app.core.single_flight import SingleFlight
+
+    flight = SingleFlight("test_reads")
+    executions = []
+    start = threading.Barrier(10)
+
+    def query(key):
+        executions.append(key)
+        time.sleep(0.2)
+        return {"key": key}
+
+    results = []
+    def caller(key):
+        start.wait()
+        results.append(flight.do(key, lambda: query(key)))
+
+    threads = [threading.Thread(target=caller, args=((1, "tasks"),)) for _ in range(9)]
+    threads.append(threading.Thread(target=caller, args=((2, "tasks"),)))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(executions) == [(1, "tasks"), (2, "tasks")]
+    assert len(results) == 10
+    shared = [result for result in results if result["key"] == (1, "tasks")]
+    assert len(shared) == 9
+    assert all(result is shared[0] for result in shared)
+
+def test_concurrent_service_reads_share_queries_only_when_identical(test_db_engine, monkeypatch):
+    """
+    Tests that concurrent identical read_tasks/read_task calls run one
+    set of statements, while calls for another owner or with other
+    arguments run their own and get only their own owner's tasks.
+    """
+    import threading
+    from sqlalchemy import delete, event
+    from sqlalchemy.orm import Session
+    from app.models.task import Task
+    from app.models.user import User
+
+    monkeypatch.setattr(settings, "TASK_READ_COALESCING", True)
+    with Session(bind=test_db_engine) as setup:
+        owners = [User(email=f"flight{i}@example.com", hashed_password="x") for i in range(2)]
+        setup.add_all(owners)
+        setup.flush()
+        setup.add_all([
+            Task(title=f"Flight {owner.id}-{i}", owner_id=owner.id, change_seq=i + 1)
+            for owner in owners for i in range(3)
+        ])
+        setup.commit()
+        a, b = (owner.id for owner in owners)
+        task_a = setup.query(Task.id).filter(Task.owner_id == a).order_by(Task.id).first()[0]
+
+    statements = []
+    def slow_task_queries(conn, cursor, statement, parameters, context, executemany):
+        if "tasks" in statement:
+            statements.append(statement)
+            # Keeps the leader's query running while the others arrive
+            time.sleep(0.2)
+    event.listen(test_db_engine, "before_cursor_execute", slow_task_queries)
+
+    def run_concurrently(calls):
+        statements.clear()
+        start = threading.Barrier(len(calls))
+        results = [None] * len(calls)
+        def caller(index, call):
+            with Session(bind=test_db_engine) as db:
+                start.wait()
+                results[index] = call(db)
+        threads = [threading.Thread(target=caller, args=item) for item in enumerate(calls)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    try:
+        # Identical listings: one count and one select between them
+        results = run_concurrently([lambda db: task_service.read_tasks(db, owner_id=a, limit=10)] * 6)
+        assert len(statements) == 2
+        assert all(result is results[0] for result in results)
+        assert results[0][0] == 3
+
+        # Another owner or other arguments: a query each
+        calls = [
+            lambda db: task_service.read_tasks(db, owner_id=a, limit=10),
+            lambda db: task_service.read_tasks(db, owner_id=b, limit=10),
+            lambda db: task_service.read_tasks(db, owner_id=a, limit=2),
+            lambda db: task_service.read_tasks(db, owner_id=a, limit=10, sort="title"),
+            lambda db: task_service.read_tasks(db, owner_id=a, limit=10, filter_query="Flight"),
+        ]
+        results = run_concurrently(calls)
+        assert len(statements) == 2 * len(calls)
+        assert {task.owner_id for _, tasks in results for task in tasks} == {a, b}
+        assert all(task.owner_id == b for task in results[1][1])
+        assert all(task.owner_id == a for index in (0, 2, 3, 4) for task in results[index][1])
+        assert len(results[2][1]) == 2
+
+        # Single tasks: identical reads share, another owner's read doesn't
+        results = run_concurrently(
+            [lambda db: task_service.read_task(db, task_a, owner_id=a)] * 4
+            + [lambda db: task_service.read_task(db, task_a, owner_id=b)]
+        )
+        assert len(statements) == 2
+        assert all(result is results[0] and result.id == task_a for result in results[:4])
+        assert results[4] is None
+    finally:
+        event.remove(test_db_engine, "before_cursor_execute", slow_task_queries)
+        with Session(bind=test_db_engine) as cleanup:
+            cleanup.execute(delete(Task).where(Task.owner_id.in_([a, b])))
+            cleanup.execute(delete(User).where(User.id.in_([a, b])))
+            cleanup.commit()
+
+def test_client_disconnect_cancels_request_queries(monkeypatch):
+    """
+    A client disconnect cancels the queries of the sessions registered
+    for that request, while the app still receives the request body.
+    """
+    import asyncio
+    from app.utils import cancellation
+
+    cancelled = []
+    monkeypatch.setattr(cancellation, "cancel_session_queries", cancelled.append)
+
+    async def app(scope, receive, send):
+        scope["state"]["query_canceller"].register("session")
+        assert (await receive())["type"] == "http.request"
+        # A long-running query; returns once the client is gone
+        assert (await receive())["type"] == "http.disconnect"
+
+    async def run():
+        incoming = [
+            {"type": "http.request", "body": b"", "more_body": False},
+            {"type": "http.disconnect"},
+        ]
+        async def receive():
+            await asyncio.sleep(0.01)
+            return incoming.pop(0)
+        async def send(message):
+            pass
+        middleware = cancellation.CancelOnDisconnectMiddleware(app)
+        await middleware({"type": "http", "path": "/api/v1/tasks/"}, receive, send)
+        await asyncio.sleep(0.05)
+
+    asyncio.run(run())
+    assert cancelled == ["session"]
+
+def test_cancel_skips_connections_returned_to_the_pool(test_db_engine):
+    """
+    Tests that a cancel issued after a session's connection went back to
+    the pool, but before its transaction finished ending, doesn't reach
+    the request that checked the connection out next.
+    """
+    import threading
+    from sqlalchemy import create_engine, event, text
+    from sqlalchemy.orm import Session
+    from app.db.session import cancel_session_queries
+
+    engine = create_engine(test_db_engine.url, pool_size=1, max_overflow=0)
+    slow = (
+        "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < 2000000) "
+        "SELECT count(*) FROM c"
+    ) if settings.is_sqlite() else "SELECT pg_sleep(0.5)"
+    db = Session(bind=engine)
+    db.execute(text("SELECT 1"))
+    mine = next(iter(db.info["dbapi_connections"]))
+    outcomes = []
+
+    def in_window(session, transaction):
+        if session is not db or transaction.parent is not None:
+            return
+        # The connection is back in the pool: another request takes it
+        with engine.connect() as other:
+            outcomes.append(other.connection.dbapi_connection is mine)
+            def run():
+                try:
+                    other.execute(text(slow))
+                    outcomes.append("completed")
+                except Exception as e:
+                    outcomes.append(type(e).__name__)
+            worker = threading.Thread(target=run)
+            worker.start()
+            time.sleep(0.1)
+            cancel_session_queries(db)
+            worker.join()
+
+    # Runs before any other after_transaction_end listener
+    event.listen(Session, "after_transaction_end", in_window, insert=True)
+    try:
+        db.commit()
+    finally:
+        event.remove(Session, "after_transaction_end", in_window)
+        db.close()
+        engine.dispose()
+    assert outcomes == [True, "completed"]
+
+def test_admission_lane_is_fair_and_sheds_load():
+    """
+    Waiting owners are admitted round-robin, and requests beyond the
+    queue bound or deadline are rejected.
+    """
+    import asyncio
+    from app.utils.admission import AdmissionRejected, Lane
+
+    async def run():
+        lane = Lane("test", limit=1, queue_size=4, queue_per_owner=3)
+        admitted = []
+
+        async def request(owner, name, timeout=1.0):
+            await lane.acquire(owner, timeout)
+            admitted.append(name)
+
+        await lane.acquire("heavy", 1.0)  # occupies the only slot
+        waiting = [
+            asyncio.create_task(request("heavy", "heavy-1")),
+            asyncio.create_task(request("heavy", "heavy-2")),
+            asyncio.create_task(request("heavy", "heavy-3")),
+        ]
+        await asyncio.sleep(0)
+        waiting.append(asyncio.create_task(request("light", "light-1")))
+        await asyncio.sleep(0)
+
+        try:
+            await lane.acquire("heavy", 1.0)
+            assert False, "per-owner queue bound not enforced"
+        except AdmissionRejected:
+            pass
+
+        for _ in range(4):
+            lane.release()
+            await asyncio.sleep(0)
+        await asyncio.gather(*waiting)
+        assert admitted == ["heavy-1", "light-1", "heavy-2", "heavy-3"]
+
+        try:
+            await lane.acquire("other", 0.01)
+            assert False, "deadline not enforced"
+        except AdmissionRejected:
+            assert lane.queued == 0
+
+    asyncio.run(run())
+
+def test_admission_owner_key_needs_a_valid_signature():
+    """
+    Tests that only a correctly signed token queues a request under its
+    subject; a forged one queues under the client address.
+    """
+    from jose import jwt
+    from app.utils.admission import _owner_key
+
+    def scope(token):
+        return {
+            "headers": [(b"authorization", f"Bearer {token}".encode())],
+            "client": ("203.0.113.7", 4000),
+        }
+
+    valid = security.create_access_token({"sub": "victim@example.com"})
+    forged = jwt.encode({"sub": "victim@example.com"}, "not-the-secret", algorithm=settings.ALGORITHM)
+    assert _owner_key(scope(valid)) == "user:victim@example.com"
+    assert _owner_key(scope(forged)) == "ip:203.0.113.7"
+    assert _owner_key(scope("garbage")) == "ip:203.0.113.7"
+
+def test_task_label_filters_and_counts(db_session, test_user):
+    """
+    Tests label normalization, all/any label filters and per-label counts.
+    """
+    task_service.create_task(db_session, TaskCreate(title="Fix login", labels=["Bug", " urgent", "bug"]), test_user.id)
+    task_service.create_task(db_session, TaskCreate(title="Fix logout", labels=["bug"]), test_user.id)
+    task_service.create_task(db_session, TaskCreate(title="Write docs", labels=["docs"]), test_user.id)
+
+    total, tasks = task_service.get_all_tasks(db_session, owner_id=test_user.id, labels=["BUG", "urgent"])
+    assert total == 1
+    assert tasks[0].labels == ["bug", "urgent"]
+
+    total, _ = task_service.get_all_tasks(
+        db_session, owner_id=test_user.id, labels=["urgent", "docs"], label_match="any"
+    )
+    assert total == 2
+
+    counts = task_service.get_label_counts(db_session, owner_id=test_user.id)
+    assert [tuple(row) for row in counts] == [("bug", 2), ("docs", 1), ("urgent", 1)]
+
+def test_group_committer_batches_concurrent_submissions():
+    """
+    Tests that concurrent submissions are flushed once, together, and
+    that each submitter gets only its own result or error.
+    """
+    import threading
+    from app.core.group_commit import GroupCommitter
+
+    committer = GroupCommitter("test_group_commit", window=0.5, max_batch=4)
+    flushed = []
+
+    def flush(items):
+        flushed.append(list(items))
+        return [ValueError(item) if item == "bad" else item.upper() for item in items]
+
+    outcomes = {}
+    def submit(item):
+        try:
+            outcomes[item] = committer.submit("shard", item, flush)
+        except ValueError as e:
+            outcomes[item] = e
+
+    threads = [threading.Thread(target=submit, args=(item,)) for item in ("a", "b", "bad", "c")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # The batch filled up, so it was flushed before the window ran out
+    assert len(flushed) == 1 and sorted(flushed[0]) == ["a", "b", "bad", "c"]
+    assert [outcomes[item] for item in ("a", "b", "c")] == ["A", "B", "C"]
+    assert isinstance(outcomes["bad"], ValueError)
+
+def _create_grouped_concurrently(db_session, monkeypatch, items):
+    """
+    Runs create_task_grouped for each (title, owner_id) in its own thread,
+    all in one batch. Returns the outcomes in order and the commit count.
+    """
+    import threading
+    from sqlalchemy import event
+    from app.core.group_commit import GroupCommitter
+
+    monkeypatch.setattr(settings, "TASK_GROUP_COMMIT", True)
+    monkeypatch.setattr(task_service, "_create_batches", GroupCommitter(
+        "test_task_creates", window=5, max_batch=len(items)
+    ))
+    commits = []
+    def on_commit(session):
+        commits.append(session)
+    event.listen(db_session, "after_commit", on_commit)
+
+    outcomes = [None] * len(items)
+    def create(index, title, owner_id):
+        try:
+            outcomes[index] = task_service.create_task_grouped(db_session, TaskCreate(title=title), owner_id)
+        except Exception as e:
+            outcomes[index] = e
+    threads = [
+        threading.Thread(target=create, args=(index, title, owner_id))
+        for index, (title, owner_id) in enumerate(items)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    event.remove(db_session, "after_commit", on_commit)
+    return outcomes, len(commits)
+
+def test_group_commit_inserts_concurrent_creates_together(db_session, test_user, monkeypatch):
+    """
+    Tests that concurrent grouped creates share one multi-row insert and
+    commit, that each caller gets its own task or DuplicateTaskTitle,
+    and that change_seq and the stats count every created task.
+    """
+    from app.models.user import User
+    from app.schemas.task import Task as TaskSnapshot
+
+    task_service.create_task(db_session, TaskCreate(title="Taken"), test_user.id)
+    seq_before = db_session.get(User, test_user.id).change_seq
+
+    titles = ["Group A", "Group B", "Taken", "Group C", "Group A"]
+    outcomes, commits = _create_grouped_concurrently(
+        db_session, monkeypatch, [(title, test_user.id) for title in titles]
+    )
+
+    assert commits == 1
+    for title, outcome in zip(titles, outcomes):
+        if isinstance(outcome, TaskSnapshot):
+            assert outcome.title == title and outcome.owner_id == test_user.id
+        else:
+            assert isinstance(outcome, task_service.DuplicateTaskTitle) and title in str(outcome)
+    assert isinstance(outcomes[2], task_service.DuplicateTaskTitle)
+    # Only one of the two "Group A" creates wins
+    assert sum(isinstance(outcomes[i], TaskSnapshot) for i in (0, 4)) == 1
+    created = [outcome for outcome in outcomes if isinstance(outcome, TaskSnapshot)]
+    assert len(created) == 3
+
+    # One change_seq reserved per item, each created task has its own
+    db_session.expire_all()
+    assert db_session.get(User, test_user.id).change_seq == seq_before + len(titles)
+    assert len({task.change_seq for task in created}) == 3
+    assert all(seq_before < task.change_seq <= seq_before + len(titles) for task in created)
+    assert task_stats_service.get_task_stats(db_session, owner_id=test_user.id)[0] == 4
+    total, tasks = task_service.get_all_tasks(db_session, owner_id=test_user.id)
+    assert total == 4 and {task.id for task in created} <= {task.id for task in tasks}
+
+def test_group_commit_retries_a_failed_batch_one_by_one(db_session, test_user, monkeypatch):
+    """
+    Tests that a batch failing for another reason than a taken title is
+    retried item by item, so only the bad item fails.
+    """
+    from app.schemas.task import Task as TaskSnapshot
+
+    missing_owner = test_user.id + 1000
+    outcomes, commits = _create_grouped_concurrently(db_session, monkeypatch, [
+        ("Retry A", test_user.id), ("Orphan", missing_owner), ("Retry B", test_user.id)
+    ])
+
+    assert [outcome.title for outcome in (outcomes[0], outcomes[2])] == ["Retry A", "Retry B"]
+    assert all(isinstance(outcomes[i], TaskSnapshot) for i in (0, 2))
+    assert not isinstance(outcomes[1], (TaskSnapshot, task_service.DuplicateTaskTitle))
+    # The batch rolled back; each good item then committed on its own
+    assert commits == 2
+    assert task_service.get_all_tasks(db_session, owner_id=test_user.id)[0] == 2
+
+def test_first_page_cache_patches_and_invalidates():
+    """
+    Tests that a cached first page is served for its change_seq, patched
+    by in-order creates and deletes, and dropped or not stored when a
+    change was missed.
+    """
+    import json
+    from datetime import datetime, timedelta, timezone
+    from app.schemas.task import Task as TaskSnapshot
+    from app.services.task_pages import FirstPageCache
+
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    def task(task_id, seq):
+        return TaskSnapshot(
+            id=task_id, title=f"t{task_id}", created_at=start + timedelta(minutes=task_id),
+            owner_id=1, change_seq=seq, owner={"id": 1, "email": "owner@example.com"}
+        )
+
+    cache = FirstPageCache("test_task_pages", capacity=3, max_bytes=10_000)
+    loads = []
+    def load(total, tasks, seq):
+        def run():
+            loads.append(seq)
+            return total, tasks, seq
+        return run
+
+    def page(seq, limit=10, loader=None):
+        body = cache.get(1, seq, limit, loader or load(0, [], seq))
+        return json.loads(body)
+
+    # Five tasks; the page keeps the newest three
+    first = page(5, loader=load(5, [task(i, i) for i in (5, 4, 3, 2, 1)], 5))
+    assert first["total"] == 5 and [t["id"] for t in first["data"]] == [5, 4, 3]
+    assert page(5, limit=2)["data"] == first["data"][:2]
+    assert loads == [5]
+
+    cache.created(1, [task(6, 6)], 6, 6)
+    cache.deleted(1, 4, 7)
+    patched = page(7, limit=2)
+    assert patched["total"] == 5 and [t["id"] for t in patched["data"]] == [6, 5]
+    assert loads == [5]
+    # Only two rows are left; a longer page is reloaded
+    page(7, limit=3, loader=load(5, [task(i, i) for i in (6, 5, 3)], 7))
+    assert loads == [5, 7]
+
+    # Change 8 happened elsewhere: patching change 9 drops the page
+    cache.updated(1, task(3, 9))
+    page(9, loader=load(5, [task(6, 6)], 9))
+    assert loads == [5, 7, 9]
+
+    # An invalidation during a load keeps its result out of the cache
+    def invalidated_load():
+        cache.invalidate(1)
+        return 5, [task(6, 6)], 10
+    page(10, loader=invalidated_load)
+    page(10, loader=load(5, [task(6, 6)], 10))
+    assert loads == [5, 7, 9, 10]
+
+    # Tasks created in one transaction share created_at; id orders them,
+    # as in the listing query, whatever order the patch lists them in
+    def tied(task_id, seq):
+        return task(task_id, seq).model_copy(update={"created_at": start})
+    page(11, loader=load(2, [tied(12, 11), tied(11, 10)], 11))
+    cache.created(1, [tied(14, 12), tied(13, 13)], 12, 13)
+    assert [t["id"] for t in page(13, limit=3)["data"]] == [14, 13, 12]
+    assert loads == [5, 7, 9, 10, 11]